@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# The allocations of the jitted kernels are counted only if the statistics are enabled before numba is imported
+os.environ.setdefault('NUMBA_NRT_STATS', '1')
+
+import numba
+import numpy as np
+from numba.core.runtime import rtsys
+
+from classes.System import System
+
+# Number of the matrix elements of radius_differences which are still benchmarked
+MAX_MATRIX_ELEMENTS = 2 ** 26
+
+
+def measure(function, repeat: int, before=None) -> float:
+    """
+    This function measures the best time of the function, the first call compiles the kernels and is not measured
+    :param function: Function without arguments
+    :param repeat: Number of the measured calls
+    :param before: Function called before every call and not measured (invalidation of the caches)
+    :return: Best time of the call in seconds
+    """
+
+    if before is not None:
+        before()
+    function()
+    best = np.inf
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_steps(system: System, steps: int, delta_time: float) -> dict:
+    """
+    This function measures the time steps of the system together with the memory they take
+    :param system: Benchmarked system
+    :param steps: Number of the measured steps
+    :param delta_time: Time step
+    :return: Dictionary with the steps per second, the peak memory and the allocations per step
+    """
+
+    system.next_time_turn(delta_time)
+    tracemalloc.start()
+    current, _ = tracemalloc.get_traced_memory()
+    native = rtsys.get_allocation_stats().alloc
+    start = time.perf_counter()
+    for _ in range(steps):
+        system.next_time_turn(delta_time)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': seconds / steps,
+        'per_second': steps / seconds,
+        'peak_bytes': peak - current,
+        # The arrays allocated inside of the jitted kernels
+        'native_allocations_per_step': (rtsys.get_allocation_stats().alloc - native) / steps,
+    }
+
+
+def benchmark_system(backend: str, number_of_particles: int, spacing: float, cutoff: float, pair_mode: str,
+                     integrator: str, repeat: int, steps: int, delta_time: float, kernels: bool = True) -> list:
+    """
+    This function benchmarks one backend and one number of particles.
+    The pair sweep and the time steps run the numba kernels of ParticleState for every backend, so they are
+    measured only if kernels is True, the vector backend is measured by the dense radius differences
+    :param kernels: Are the pair sweep and the time steps measured
+    :return: List of the results
+    """
+
+    from classes import Integrator
+
+    cube_length = round(number_of_particles ** (1 / 3)) * spacing
+    system = System.create_default_3D_system(number_of_particles, cube_length, 300, cutoff=cutoff, backend=backend,
+                                             pair_mode=pair_mode, integrator=getattr(Integrator, integrator)(),
+                                             placement='sc')
+    case = {'backend': backend, 'N': number_of_particles, 'cutoff': cutoff, 'pair_mode': pair_mode}
+    results = []
+
+    if kernels:
+        # The forces, the potential energy and the virial come from one fused sweep
+        seconds = measure(lambda: system.interactions, repeat, system.positions_changed)
+        results.append(dict(case, benchmark='interactions', seconds=seconds, per_second=1 / seconds))
+    if number_of_particles ** 2 * system.state.dimension <= MAX_MATRIX_ELEMENTS:
+        seconds = measure(lambda: system.radius_differences, repeat, system.positions_changed)
+        results.append(dict(case, benchmark='radius_differences', seconds=seconds, per_second=1 / seconds))
+    if kernels:
+        results.append(dict(case, benchmark='next_time_turn', **measure_steps(system, steps, delta_time)))
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    This function compares the results with the baseline
+    :param results: Current results
+    :param baseline: Stored results
+    :param tolerance: Allowed relative slowdown
+    :return: List of the regressions
+    """
+
+    key = ('backend', 'N', 'cutoff', 'pair_mode', 'benchmark')
+    stored = {tuple(result.get(name) for name in key): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = stored.get(tuple(result.get(name) for name in key))
+        if reference is None:
+            continue
+        ratio = result['seconds'] / reference['seconds']
+        result['baseline_ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(), 'numpy': np.__version__, 'numba': numba.__version__,
+        'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+        'threads': numba.get_num_threads(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the force evaluation and the time steps')
+    parser.add_argument('--powers', type=int, nargs='+', default=list(range(8, 19)),
+                        help='Numbers of the particles as the powers of 2')
+    parser.add_argument('--backends', nargs='+', default=['cpu', 'numpy'],
+                        help='Vector backends, the pair sweep and the time steps are measured for the first one only')
+    parser.add_argument('--cutoff', type=float, default=2.5 * 3.4e-10,
+                        help='Cutoff radius of the neighbor list, 0 evaluates all pairs')
+    parser.add_argument('--pair-mode', default='half')
+    parser.add_argument('--integrator', default='VelocityVerlet')
+    parser.add_argument('--spacing', type=float, default=4e-10, help='Lattice spacing of the initial positions')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--delta-time', type=float, default=1e-14)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='Stored JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative slowdown')
+    arguments = parser.parse_args()
+
+    cutoff = arguments.cutoff or None
+    results = []
+    for backend in arguments.backends:
+        # The numba kernels of the state do not depend on the backend
+        kernels = backend == arguments.backends[0]
+        for power in arguments.powers:
+            number_of_particles = 2 ** power
+            if not kernels and number_of_particles ** 2 * 3 > MAX_MATRIX_ELEMENTS:
+                continue
+            try:
+                case_results = benchmark_system(backend, number_of_particles, arguments.spacing, cutoff,
+                                                arguments.pair_mode, arguments.integrator, arguments.repeat,
+                                                arguments.steps, arguments.delta_time, kernels)
+            except Exception as error:
+                print(f'{backend} N={number_of_particles}: skipped ({error})', file=sys.stderr)
+                continue
+            for result in case_results:
+                print(f'{backend:>6} N={number_of_particles:<7} {result["benchmark"]:<20} '
+                      f'{result["per_second"]:12.2f} /s')
+            results += case_results
+
+    regressions = []
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], arguments.tolerance)
+        for result in regressions:
+            print(f'Regression: {result["backend"]} N={result["N"]} {result["benchmark"]} is '
+                  f'{round((result["baseline_ratio"] - 1) * 100, 1)} % slower', file=sys.stderr)
+
+    with open(arguments.output, 'w') as file:
+        json.dump({'environment': environment(), 'results': results}, file, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import importlib
+import os
+
+# The modules are imported only when the backend is selected, so the CPU nodes never touch numba.cuda
+BACKENDS = {
+    'gpu': ('classes.GpuVector', 'GpuVector'),
+    'cpu': ('classes.CpuVector', 'CpuVector'),
+    'numpy': ('classes.Vector', 'Vector'),
+}
+
+
+def default_backend() -> str:
+    """
+    This function chooses the backend from the LJ_BACKEND environment variable or from the available hardware
+    :return: Name of the backend
+    """
+
+    backend = os.environ.get('LJ_BACKEND')
+    if backend:
+        return backend.lower()
+    try:
+        from numba import cuda
+        return 'gpu' if cuda.is_available() else 'cpu'
+    except ImportError:
+        return 'cpu'
+
+
+def get_vector_class(backend: str = None):
+    """
+    This function returns the vector class of the backend
+    :param backend: Name of the backend ('gpu', 'cpu' or 'numpy'), the default backend is used if it is None
+    :return: Vector class with the create_vector_from_dict method
+    """
+
+    backend = default_backend() if backend is None else backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend}, use one of {", ".join(BACKENDS)}')
+    module, name = BACKENDS[backend]
+    return getattr(importlib.import_module(module), name)
+
+
+def get_backend_name(vector_class) -> str:
+    """
+    This function returns the name of the backend of the vector class
+    :param vector_class: Vector class of the backend
+    :return: Name of the backend
+    """
+
+    for backend, (module, name) in BACKENDS.items():
+        if vector_class.__module__ == module and vector_class.__name__ == name:
+            return backend
+    raise ValueError(f'{vector_class.__name__} is not the vector class of any backend')
+
+
+if __name__ == '__main__':
+    print(get_vector_class())
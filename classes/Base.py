@@ -1,26 +1,76 @@
-from classes.GpuVector import GpuVector
+from typing import TYPE_CHECKING
+
+from classes.ParticleState import ParticleState
+from classes.StateCache import StateCache
+
+if TYPE_CHECKING:
+    from classes.GpuVector import GpuVector
 
 
 class Base(object):
-    """This superclass consists the radiuses, velocities and methods to work with them"""
+    """
+    This superclass consists the radiuses, velocities and methods to work with them.
+    The particles are kept in the ParticleState arrays, the radiuses and velocities are the vectors viewing them.
+    The derived quantities are cached for the versions of positions and velocities, the versions are bumped
+    by the assignments and by positions_changed / velocities_changed after the arrays are changed in place
+    """
 
-    def __init__(self, radiuses: GpuVector, velocities: GpuVector, mass: float) -> None:
-        self.radiuses = radiuses
-        self.velocities = velocities
+    def __init__(self, radiuses: 'GpuVector', velocities: 'GpuVector', mass: float) -> None:
+        self.cache = StateCache()
+        self.positions_version = 0
+        self.velocities_version = 0
+        self.vector_class = type(radiuses)
+        self.state = ParticleState.create_state_from_vectors(radiuses, velocities)
         self.mass = mass
-        self.number_of_particles = len(radiuses)
-        self.basis = radiuses.get_keys()
+        self.number_of_particles = len(self.state)
+        self.basis = self.state.basis
+        self.deferred = False
+
+    @property
+    def radiuses(self) -> 'GpuVector':
+        """Radiuses of the particles as the vector viewing the state positions"""
+        return self.vector_class.create_vector_from_views(self.state.axes('positions'))
+
+    @radiuses.setter
+    def radiuses(self, radiuses: 'GpuVector') -> None:
+        self.state.positions[...] = radiuses.to_array()
+        self.positions_changed()
+
+    @property
+    def velocities(self) -> 'GpuVector':
+        """Velocities of the particles as the vector viewing the state velocities"""
+        return self.vector_class.create_vector_from_views(self.state.axes('velocities'))
+
+    @velocities.setter
+    def velocities(self, velocities: 'GpuVector') -> None:
+        self.state.velocities[...] = velocities.to_array()
+        self.velocities_changed()
+
+    def positions_changed(self) -> None:
+        """This method outdates the quantities derived from the positions, it is called after the positions change"""
+        self.positions_version += 1
+
+    def velocities_changed(self) -> None:
+        """This method outdates the quantities derived from the velocities, it is called after the velocities change"""
+        self.velocities_version += 1
 
     @property
-    def radius_differences(self) -> GpuVector:
+    def radius_differences(self) -> 'GpuVector':
         """
-        This method realise the calculation of radius differences
+        This method realise the calculation of radius differences.
+        In the deferred mode the differences are the LazyVector and the N x N matrices are never allocated
 
         :return: Dictionary with radius differences (dict)
         """
 
-        differences = self.radiuses.differences()
-        return differences
+        if self.deferred:
+            return self.radiuses.lazy().differences()
+        return self.cache.get('radius_differences', self.positions_version, lambda: self.radiuses.differences())
+
+    @property
+    def distances(self):
+        """Matrix of the distances between the particles"""
+        return self.cache.get('distances', self.positions_version, lambda: abs(self.radius_differences))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from classes.Profiler import profiler
+
+
+class BufferPool(object):
+    """
+    This class keeps the released arrays by shape and dtype and gives them back instead of the new allocations.
+    The least recently released arrays are evicted when the free arrays take more than max_bytes
+    """
+
+    def __init__(self, allocate, max_bytes: int = 2 ** 30) -> None:
+        """
+        :param allocate: Function allocating the array from shape and dtype (np.empty, cuda.device_array)
+        :param max_bytes: Maximum size of the free arrays
+        """
+        self.allocate = allocate
+        self.max_bytes = max_bytes
+        self.free = OrderedDict()
+        self.free_bytes = 0
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: tuple, dtype=np.float64):
+        """
+        This method returns the free array or allocates the new one
+
+        :param shape: Shape of the array
+        :param dtype: Type of the array
+        :return: Array with undefined values
+        """
+
+        key = (tuple(shape), np.dtype(dtype).str)
+        arrays = self.free.get(key)
+        if arrays:
+            array = arrays.pop()
+            if not arrays:
+                del self.free[key]
+            self.free_bytes -= array.nbytes
+            self.reuses += 1
+            return array
+
+        self.allocations += 1
+        if profiler.enabled:
+            profiler.count('allocated_bytes', int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return self.allocate(tuple(shape), dtype)
+
+    def release(self, array) -> None:
+        """
+        This method returns the array to the pool, the array must not be used after it
+
+        :param array: Released array
+        """
+
+        key = (tuple(array.shape), np.dtype(array.dtype).str)
+        self.free.setdefault(key, []).append(array)
+        self.free.move_to_end(key)
+        self.free_bytes += array.nbytes
+
+        while self.free_bytes > self.max_bytes:
+            key, arrays = next(iter(self.free.items()))
+            self.free_bytes -= arrays.pop(0).nbytes
+            if not arrays:
+                del self.free[key]
+
+    def clear(self) -> None:
+        self.free.clear()
+        self.free_bytes = 0
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,81 @@
+import json
+import os
+import struct
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+MAGIC = b'LJCHKP01'
+# The arrays start at the aligned offsets, so they are mapped without the copies
+ALIGNMENT = 64
+ARRAYS = ('positions', 'velocities')
+
+
+class Checkpoint(object):
+    """
+    This class realise the checkpoint file of the system.
+    The file is the magic, the length of the JSON header, the header and the raw little-endian float64 arrays
+    (positions, velocities) with shape (N, dimension), so the arrays are memory-mapped on reading
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{path} is not the checkpoint file')
+            length, = struct.unpack('<Q', file.read(8))
+            self.header = json.loads(file.read(length))
+
+        shape = (self.header['number_of_particles'], self.header['dimension'])
+        offset = self.header['offset']
+        self.arrays = {}
+        for name in ARRAYS:
+            self.arrays[name] = np.memmap(path, dtype='<f8', mode='r', offset=offset, shape=shape)
+            offset += self.arrays[name].nbytes
+
+    @staticmethod
+    def write(path: str, system: 'System', header: dict) -> None:
+        """
+        This method writes the state of the system to the checkpoint file.
+        The file is written next to the old one and replaces it at the end, so the killed write
+        never spoils the previous checkpoint
+
+        :param path: Path of the checkpoint file
+        :param system: Saved system
+        :param header: Parameters of the system
+        """
+
+        state = system.state
+        header = dict(header, number_of_particles=len(state), dimension=state.dimension, offset=0)
+        # The offset is in the header, so the header is encoded until its length is stable
+        while True:
+            data = json.dumps(header).encode()
+            offset = -(-(len(MAGIC) + 8 + len(data)) // ALIGNMENT) * ALIGNMENT
+            if header['offset'] == offset:
+                break
+            header['offset'] = offset
+
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(MAGIC + struct.pack('<Q', len(data)) + data)
+            file.write(bytes(offset - file.tell()))
+            for name in ARRAYS:
+                file.write(np.ascontiguousarray(getattr(state, name), dtype='<f8').data)
+        os.replace(temporary, path)
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Positions with shape (N, dimension), the view of the file"""
+        return self.arrays['positions']
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Velocities with shape (N, dimension), the view of the file"""
+        return self.arrays['velocities']
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,296 @@
+import numpy as np
+from numba import njit, prange
+
+from classes.ParticleState import floating_dtype
+
+
+def types(func):
+    """
+    This decorator looking for types and wraps the numbers and arrays to the CpuVector broadcasted by the kernels
+    :param func: Decorating function
+    :return: Decorated function
+    """
+
+    def inner(*args, **kwargs):
+        if type(args[1]) != CpuVector:
+            other = np.ascontiguousarray(np.atleast_2d(args[1]), dtype=args[0].dtype)
+            other = CpuVector({axis: other for axis in args[0].basis})
+            return func(args[0], other, **kwargs)
+        return func(*args, **kwargs)
+
+    return inner
+
+
+def output_shape(A: np.ndarray, B: np.ndarray) -> tuple:
+    return max(A.shape[0], B.shape[0]), max(A.shape[1], B.shape[1])
+
+
+class CpuOperations(object):
+    """The kernels broadcast the operands with one row or one column like numpy does"""
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_addition(A, B, C):
+        a_rows, a_columns = min(A.shape[0] - 1, 1), min(A.shape[1] - 1, 1)
+        b_rows, b_columns = min(B.shape[0] - 1, 1), min(B.shape[1] - 1, 1)
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row * a_rows, column * a_columns] + B[row * b_rows, column * b_columns]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_substraction(A, B, C):
+        a_rows, a_columns = min(A.shape[0] - 1, 1), min(A.shape[1] - 1, 1)
+        b_rows, b_columns = min(B.shape[0] - 1, 1), min(B.shape[1] - 1, 1)
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row * a_rows, column * a_columns] - B[row * b_rows, column * b_columns]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_multiplication(A, B, C):
+        a_rows, a_columns = min(A.shape[0] - 1, 1), min(A.shape[1] - 1, 1)
+        b_rows, b_columns = min(B.shape[0] - 1, 1), min(B.shape[1] - 1, 1)
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row * a_rows, column * a_columns] * B[row * b_rows, column * b_columns]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_divide(A, B, C):
+        a_rows, a_columns = min(A.shape[0] - 1, 1), min(A.shape[1] - 1, 1)
+        b_rows, b_columns = min(B.shape[0] - 1, 1), min(B.shape[1] - 1, 1)
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row * a_rows, column * a_columns] / B[row * b_rows, column * b_columns]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_floor_divide(A, B, C):
+        a_rows, a_columns = min(A.shape[0] - 1, 1), min(A.shape[1] - 1, 1)
+        b_rows, b_columns = min(B.shape[0] - 1, 1), min(B.shape[1] - 1, 1)
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row * a_rows, column * a_columns] // B[row * b_rows, column * b_columns]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_power(A, B, C):
+        for row in prange(C.shape[0]):
+            for column in range(C.shape[1]):
+                C[row, column] = A[row, column] ** B
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_matrix_mul(A, B, C):
+        for row in prange(A.shape[0]):
+            for column in range(B.shape[1]):
+                temp = 0.0
+                for k in range(A.shape[1]):
+                    temp += A[row, k] * B[k, column]
+                C[row, column] = temp
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_differences(A, C):
+        for row in prange(A.shape[0]):
+            for column in range(A.shape[0]):
+                C[row, column] = A[row, 0] - A[column, 0]
+            C[row, row] += 1
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_sum(A):
+        temp = 0.0
+        for row in prange(A.shape[0]):
+            for column in range(A.shape[1]):
+                temp += A[row, column]
+        return temp
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_sum_columns(A, B):
+        for row in prange(A.shape[0]):
+            temp = 0.0
+            for column in range(A.shape[1]):
+                temp += A[row, column]
+            B[row, 0] = temp
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cpu_add_square(A, B):
+        for row in prange(A.shape[0]):
+            for column in range(A.shape[1]):
+                B[row, column] += A[row, column] ** 2
+
+
+class CpuVector(CpuOperations):
+    """This class realise the GpuVector operations by the multithreaded numba kernels on the CPU"""
+
+    def __init__(self, vector: dict):
+        self.vector = vector
+        self.basis = [axis for axis in list(vector.keys())]
+        self.dimension = len(self.basis)
+        self.size = self.vector[self.basis[0]].size
+
+    @classmethod
+    def create_vector_from_dict(cls, vector: dict):
+        """
+        This method creates the CpuVector from dictionary
+        :param vector: The dictionary with numpy arrays
+        :return: CpuVector
+        """
+        return cls({axis: np.ascontiguousarray(vector[axis], dtype=floating_dtype(vector[axis])) for axis in vector})
+
+    @classmethod
+    def create_vector_from_views(cls, vector: dict):
+        """
+        This method creates the CpuVector sharing the memory with the column views of ParticleState
+        :param vector: The dictionary with numpy views
+        :return: CpuVector
+        """
+        return cls(vector)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Type of the arrays, the results of the operations keep it"""
+        return self.vector[self.basis[0]].dtype
+
+    def _binary_operation(self, kernel, A: dict, B: dict):
+        answer = {}
+        for axis in self.basis:
+            answer[axis] = np.empty(output_shape(A[axis], B[axis]), dtype=np.result_type(A[axis], B[axis]))
+            kernel(A[axis], B[axis], answer[axis])
+        return CpuVector(answer)
+
+    @types
+    def __add__(self, other):
+        return self._binary_operation(self.cpu_addition, self.vector, other.vector)
+
+    __radd__ = __add__
+
+    @types
+    def __iadd__(self, other):
+        for axis in self.basis:
+            self.cpu_addition(self.vector[axis], other.vector[axis], self.vector[axis])
+        return self
+
+    @types
+    def __sub__(self, other):
+        return self._binary_operation(self.cpu_substraction, self.vector, other.vector)
+
+    @types
+    def __rsub__(self, other):
+        return self._binary_operation(self.cpu_substraction, other.vector, self.vector)
+
+    @types
+    def __isub__(self, other):
+        for axis in self.basis:
+            self.cpu_substraction(self.vector[axis], other.vector[axis], self.vector[axis])
+        return self
+
+    @types
+    def __mul__(self, other):
+        return self._binary_operation(self.cpu_multiplication, self.vector, other.vector)
+
+    __rmul__ = __mul__
+
+    @types
+    def __imul__(self, other):
+        for axis in self.basis:
+            self.cpu_multiplication(self.vector[axis], other.vector[axis], self.vector[axis])
+        return self
+
+    @types
+    def __matmul__(self, other):
+        answer = {axis: np.empty((self.vector[axis].shape[0], other.vector[axis].shape[1]),
+                                 dtype=np.result_type(self.vector[axis], other.vector[axis])) for axis in self.basis}
+        for axis in self.basis:
+            self.cpu_matrix_mul(self.vector[axis], other.vector[axis], answer[axis])
+        return CpuVector(answer)
+
+    @types
+    def __rmatmul__(self, other):
+        answer = {axis: np.empty((other.vector[axis].shape[0], self.vector[axis].shape[1]),
+                                 dtype=np.result_type(self.vector[axis], other.vector[axis])) for axis in self.basis}
+        for axis in self.basis:
+            self.cpu_matrix_mul(other.vector[axis], self.vector[axis], answer[axis])
+        return CpuVector(answer)
+
+    @types
+    def __truediv__(self, other):
+        return self._binary_operation(self.cpu_divide, self.vector, other.vector)
+
+    @types
+    def __rtruediv__(self, other):
+        return self._binary_operation(self.cpu_divide, other.vector, self.vector)
+
+    @types
+    def __floordiv__(self, other):
+        return self._binary_operation(self.cpu_floor_divide, self.vector, other.vector)
+
+    @types
+    def __rfloordiv__(self, other):
+        return self._binary_operation(self.cpu_floor_divide, other.vector, self.vector)
+
+    def __pow__(self, power):
+        answer = {axis: np.empty_like(self.vector[axis]) for axis in self.basis}
+        for axis in self.basis:
+            self.cpu_power(self.vector[axis], float(power), answer[axis])
+        return CpuVector(answer)
+
+    def __str__(self):
+        return str(self.to_dict())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __abs__(self) -> np.ndarray:
+        temp = np.zeros_like(self.vector[self.basis[0]])
+        for axis in self.basis:
+            self.cpu_add_square(self.vector[axis], temp)
+        return np.sqrt(temp)
+
+    def to_dict(self) -> dict:
+        return self.vector
+
+    def to_array(self) -> np.ndarray:
+        """This method converts the column CpuVector to array with shape (rows, dimension)"""
+        return np.hstack([self.vector[axis] for axis in self.basis])
+
+    @property
+    def T(self):
+        """This property method trasponse the CpuVector"""
+        return CpuVector({axis: np.ascontiguousarray(self.vector[axis].T) for axis in self.basis})
+
+    def differences(self):
+        differences = {axis: np.empty((self.size, self.size), dtype=self.dtype) for axis in self.basis}
+        for axis in self.basis:
+            self.cpu_differences(self.vector[axis], differences[axis])
+        return CpuVector(differences)
+
+    def lazy(self):
+        """This method returns the LazyVector with the deferred evaluation of the CpuVector arithmetic"""
+        from classes.LazyVector import LazyVector
+        return LazyVector.create_vector_from_dict(self.vector, CpuVector, 'cpu')
+
+    def get_keys(self) -> list:
+        return self.basis
+
+    def sum(self) -> float:
+        temp = 0
+        for axis in self.basis:
+            temp += self.cpu_sum(self.vector[axis])
+        return temp
+
+    def sum_columns(self):
+        answer = {axis: np.empty((self.vector[axis].shape[0], 1), dtype=self.dtype) for axis in self.basis}
+        for axis in self.basis:
+            self.cpu_sum_columns(self.vector[axis], answer[axis])
+        return CpuVector(answer)
+
+
+if __name__ == '__main__':
+    a = CpuVector.create_vector_from_dict({axis: np.ones((1024, 1)) for axis in 'xyz'})
+    b = 2
+    print(a + b)
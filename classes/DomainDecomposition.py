@@ -0,0 +1,231 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from classes.LJKernels import LJOperations
+from classes.NeighborList import NeighborList
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+# Commands of the control array
+SWEEP, REBUILD, STOP = range(3)
+
+
+def create_shared_array(shape: tuple, dtype=np.float64) -> tuple:
+    """
+    This function allocates the array in the shared memory
+    :param shape: Shape of the array
+    :param dtype: Type of the array
+    :return: SharedMemory block and the array viewing it
+    """
+
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+class Domain(LJOperations):
+    """
+    This class realise the slab of the periodic box along the first axis, it is evaluated by one worker process.
+    The domain owns the particles inside of the slab and sees the halo of the particles closer than
+    the list radius to the slab. The owned particles and the halo are chosen again (migration) when the Verlet list
+    of the domain is rebuilt, between the rebuilds the owned particles may leave the slab
+    """
+
+    def __init__(self, rank: int, number_of_domains: int, sigma: float, eps: float, cutoff: float, skin: float,
+                 box_length: float) -> None:
+        self.rank = rank
+        self.sigma = sigma
+        self.eps = eps
+        self.box_length = box_length
+        self.lower = rank * box_length / number_of_domains
+        self.upper = (rank + 1) * box_length / number_of_domains
+        self.neighbor_list = NeighborList(cutoff, skin, box_length)
+        self.owned = np.empty(0, dtype=np.int64)
+        self.local = np.empty(0, dtype=np.int64)
+
+    def rebuild(self, positions: np.ndarray) -> None:
+        """
+        This method chooses the owned particles and the halo and builds the Verlet list of them
+
+        :param positions: Array of all positions with shape (N, dimension)
+        """
+
+        x = np.mod(positions[:, 0], self.box_length)
+        inside = (x >= self.lower) & (x < self.upper)
+        # The periodic distances from the particle to the lower and from the upper boundary of the slab
+        below = np.mod(self.lower - x, self.box_length)
+        above = np.mod(x - self.upper, self.box_length)
+        halo = ~inside & (np.minimum(below, above) < self.neighbor_list.list_radius)
+
+        self.owned = np.flatnonzero(inside)
+        self.local = np.concatenate((self.owned, np.flatnonzero(halo)))
+        self.neighbor_list.build(positions[self.local])
+
+    def sweep(self, positions: np.ndarray, forces: np.ndarray) -> tuple:
+        """
+        This method writes the forces of the owned particles
+
+        :param positions: Array of all positions with shape (N, dimension)
+        :param forces: Array of all forces with shape (N, dimension)
+        :return: Potential energy and virial of the domain
+        """
+
+        local = positions[self.local]
+        local_forces = np.empty((len(self.owned), positions.shape[1]), dtype=forces.dtype)
+        potential, virial = self.lj_domain_pairs(local, self.neighbor_list.pairs, len(self.owned), self.sigma,
+                                                 self.eps, self.neighbor_list.cutoff ** 2, self.box_length,
+                                                 local_forces)
+        forces[self.owned] = local_forces
+        return potential, virial
+
+
+def domain_worker(rank: int, number_of_domains: int, names: dict, shape: tuple, parameters: dict, barrier) -> None:
+    """
+    This function evaluates one domain in the worker process.
+    The worker waits on the barrier for the command, evaluates the domain and waits on the barrier again
+    :param rank: Number of the domain
+    :param number_of_domains: Number of the domains
+    :param names: Names of the shared memory blocks
+    :param shape: Shape and type of the positions
+    :param parameters: Parameters of the interactions (sigma, eps, cutoff, skin, box_length)
+    :param barrier: Barrier of the workers and the coordinator
+    """
+
+    blocks = {name: shared_memory.SharedMemory(name=block) for name, block in names.items()}
+    try:
+        shape, dtype = shape
+        positions = np.ndarray(shape, dtype=dtype, buffer=blocks['positions'].buf)
+        forces = np.ndarray(shape, dtype=dtype, buffer=blocks['forces'].buf)
+        results = np.ndarray((number_of_domains, 2), dtype=np.float64, buffer=blocks['results'].buf)
+        control = np.ndarray(1, dtype=np.int64, buffer=blocks['control'].buf)
+        domain = Domain(rank, number_of_domains, **parameters)
+        while True:
+            barrier.wait()
+            if control[0] == STOP:
+                break
+            if control[0] == REBUILD:
+                domain.rebuild(positions)
+            results[rank] = domain.sweep(positions, forces)
+            barrier.wait()
+    except Exception:
+        barrier.abort()
+        raise
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+class DomainDecomposition(object):
+    """
+    This class splits the periodic box of the system into the slabs evaluated by the worker processes.
+    The positions and the forces of the system are moved to the shared memory, so the workers read the positions
+    and write the forces of their particles without any copies between the processes. The coordinator decides
+    when the particles have moved more than a half of the skin, then all domains take their particles again
+    """
+
+    def __init__(self, system: 'System', number_of_domains: int = None, cutoff: float = None,
+                 skin: float = None) -> None:
+        """
+        :param system: Decomposed system
+        :param number_of_domains: Number of the worker processes, the number of CPUs is used if it is None
+        :param cutoff: Cutoff radius, the cutoff of the neighbor list of the system is used if it is None
+        :param skin: Skin of the Verlet lists of the domains
+        """
+
+        neighbor_list = system.neighbor_list
+        if cutoff is None and neighbor_list is None:
+            raise ValueError('The domain decomposition needs the cutoff radius')
+        if system.tabulated is not None:
+            raise ValueError('The domain decomposition evaluates the LJ pairs only')
+        self.system = system
+        self.number_of_domains = multiprocessing.cpu_count() if number_of_domains is None else number_of_domains
+        self.cutoff = neighbor_list.cutoff if cutoff is None else cutoff
+        self.skin = (neighbor_list.skin if neighbor_list is not None else 0.3 * system.sigma) if skin is None else skin
+        self.box_length = system.cube_length
+        self.reference = None
+        self.number_of_builds = 0
+
+        state = system.state
+        shape = state.positions.shape
+        self.blocks = {}
+        self.blocks['positions'], positions = create_shared_array(shape, state.dtype)
+        self.blocks['forces'], forces = create_shared_array(shape, state.dtype)
+        self.blocks['results'], self.results = create_shared_array((self.number_of_domains, 2))
+        self.blocks['control'], self.control = create_shared_array((1,), np.int64)
+        positions[...] = state.positions
+        forces[...] = state.forces
+        state.positions, state.forces = positions, forces
+
+        parameters = {'sigma': system.sigma, 'eps': system.eps, 'cutoff': self.cutoff, 'skin': self.skin,
+                      'box_length': self.box_length}
+        shape = (shape, state.dtype.str)
+        names = {name: block.name for name, block in self.blocks.items()}
+        # The forked workers would inherit the threading layer of the numba kernels run before, which hangs
+        # the processes at the exit, so the workers are spawned
+        context = multiprocessing.get_context('spawn')
+        self.barrier = context.Barrier(self.number_of_domains + 1)
+        self.workers = [context.Process(target=domain_worker, daemon=True,
+                                        args=(rank, self.number_of_domains, names, shape, parameters, self.barrier))
+                        for rank in range(self.number_of_domains)]
+        for worker in self.workers:
+            worker.start()
+
+        system.domains = self
+        system.positions_changed()
+
+    def sweep(self, positions: np.ndarray, forces: np.ndarray) -> tuple:
+        """
+        This method evaluates the forces of all domains, the arrays are the state arrays in the shared memory
+
+        :param positions: Array of positions with shape (N, dimension)
+        :param forces: Array of forces with shape (N, dimension)
+        :return: Potential energy and virial
+        """
+
+        if self.reference is None or NeighborList.max_displacement2(positions, self.reference, self.box_length) > \
+                (self.skin / 2) ** 2:
+            self.control[0] = REBUILD
+            self.reference = positions.copy()
+            self.number_of_builds += 1
+        else:
+            self.control[0] = SWEEP
+        self.barrier.wait()
+        self.barrier.wait()
+        potential, virial = self.results.sum(axis=0)
+        return potential, virial
+
+    def close(self) -> None:
+        """This method stops the workers and moves the state of the system back to the private memory"""
+        if not self.workers:
+            return
+        if not self.barrier.broken:
+            self.control[0] = STOP
+            self.barrier.wait()
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+        # The views of the shared memory kept by the cache and the integrator are dropped before it is closed
+        state = self.system.state
+        state.positions, state.forces = state.positions.copy(), state.forces.copy()
+        self.system.domains = None
+        self.system.cache.clear()
+        self.system.integrator.reset()
+        self.system.positions_changed()
+        self.results, self.control = None, None
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+if __name__ == '__main__':
+    pass
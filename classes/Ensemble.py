@@ -0,0 +1,405 @@
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numba import njit, prange
+
+from classes.ParticleState import ParticleState, counter_normal
+from classes.Profiler import profiler
+from classes.StateCache import StateCache
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+# The replicas with more particles are advanced in the process pool by default
+BATCH_PARTICLES = 2048
+
+
+class EnsembleOperations(object):
+    """The kernels take the replicas stacked to the arrays with shape (R, N, dimension)"""
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def lj_batched_pairs(positions, sigma, eps, box_lengths, forces, energies, virials):
+        replicas, number_of_particles, dimension = positions.shape
+        sigma2 = sigma * sigma
+        # Every row of every replica is visited by one iteration, its pair terms are summed in the rows buffers
+        for q in prange(replicas * number_of_particles):
+            r, i = q // number_of_particles, q % number_of_particles
+            box_length = box_lengths[r]
+            energy, virial = 0.0, 0.0
+            for k in range(dimension):
+                forces[r, i, k] = 0.0
+            for j in range(number_of_particles):
+                if i == j:
+                    continue
+                r2 = 0.0
+                for k in range(dimension):
+                    d = positions[r, i, k] - positions[r, j, k]
+                    d -= box_length * np.round(d / box_length)
+                    r2 += d * d
+                temp = (sigma2 / r2) ** 3
+                energy += 4 * eps * (temp * temp - temp)
+                w = 24 * eps * (2 * temp * temp - temp)
+                virial += w
+                w /= r2
+                for k in range(dimension):
+                    d = positions[r, i, k] - positions[r, j, k]
+                    d -= box_length * np.round(d / box_length)
+                    forces[r, i, k] += w * d
+            energies[r, i] = energy
+            virials[r, i] = virial
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def batch_scale(velocities, coefficients):
+        for q in prange(velocities.shape[0] * velocities.shape[1]):
+            r, i = q // velocities.shape[1], q % velocities.shape[1]
+            for k in range(velocities.shape[2]):
+                velocities[r, i, k] *= coefficients[r]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def batch_wrap(positions, box_lengths):
+        for q in prange(positions.shape[0] * positions.shape[1]):
+            r, i = q // positions.shape[1], q % positions.shape[1]
+            for k in range(positions.shape[2]):
+                positions[r, i, k] -= np.floor(positions[r, i, k] / box_lengths[r]) * box_lengths[r]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def batch_thermostat_kick(velocities, forces, scales, coefficient, noises, key):
+        sums = np.zeros(velocities.shape[0])
+        for r in prange(velocities.shape[0]):
+            temp = 0.0
+            for i in range(velocities.shape[1]):
+                for k in range(velocities.shape[2]):
+                    v = scales[r] * velocities[r, i, k] + coefficient * forces[r, i, k]
+                    if noises[r] != 0.0:
+                        v += noises[r] * counter_normal(key, (r * velocities.shape[1] + i) * velocities.shape[2] + k)
+                    velocities[r, i, k] = v
+                    temp += np.float64(v) * v
+            sums[r] = temp
+        return sums
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def batch_sum_squares(velocities):
+        sums = np.zeros(velocities.shape[0])
+        for r in prange(velocities.shape[0]):
+            temp = 0.0
+            for i in range(velocities.shape[1]):
+                for k in range(velocities.shape[2]):
+                    v = np.float64(velocities[r, i, k])
+                    temp += v * v
+            sums[r] = temp
+        return sums
+
+
+class BatchState(ParticleState):
+    """
+    This class keeps the states of the replicas stacked to the arrays with shape (R, N, dimension).
+    The inherited attributes are the (R * N, dimension) views of them, so kick and drift cover all replicas at once,
+    the velocities are scaled and the positions are wrapped with the coefficient and the box of every replica
+    """
+
+    __slots__ = ('replicas',)
+
+    def __init__(self, positions: np.ndarray, velocities: np.ndarray, basis: list) -> None:
+        self.replicas = positions.shape[0]
+        super().__init__(positions.reshape(-1, positions.shape[2]), velocities.reshape(-1, velocities.shape[2]),
+                         basis)
+
+    def stacked(self, name: str) -> np.ndarray:
+        """
+        This method returns the stacked view of the array
+
+        :param name: Name of the array ('positions', 'velocities' or 'forces')
+        :return: View with shape (R, N, dimension)
+        """
+
+        array = getattr(self, name)
+        return array.reshape(self.replicas, -1, array.shape[1])
+
+    def scale_velocities(self, coefficients: np.ndarray) -> None:
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        EnsembleOperations.batch_scale(self.stacked('velocities'), np.broadcast_to(coefficients, self.replicas))
+
+    def wrap(self, box_lengths: np.ndarray) -> None:
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        EnsembleOperations.batch_wrap(self.stacked('positions'), np.broadcast_to(box_lengths, self.replicas))
+
+    def kick_sum_squares(self, coefficient: float, scale=1.0, noise=0.0, forces: np.ndarray = None,
+                         key: np.uint64 = np.uint64(0)) -> np.ndarray:
+        """This method realise the kick of ParticleState with the scale and the noise of every replica"""
+        forces = self.forces if forces is None else forces
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        return EnsembleOperations.batch_thermostat_kick(
+            self.stacked('velocities'), forces.reshape(self.replicas, -1, forces.shape[1]),
+            np.broadcast_to(np.asarray(scale, dtype=np.float64), self.replicas),
+            coefficient, np.broadcast_to(np.asarray(noise, dtype=np.float64), self.replicas), key)
+
+    def sum_squares(self) -> np.ndarray:
+        """Sums of the squared velocities of every replica"""
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        return EnsembleOperations.batch_sum_squares(self.stacked('velocities'))
+
+
+class ReplicaBatch(EnsembleOperations):
+    """
+    This class advances the LJ systems with the same particles and interactions as one system.
+    It gives the integrator the same interface as the System, the energies and the velocity coefficients
+    are the arrays with the value of every replica. The states of the systems become the views of the batch,
+    so the systems see the batched steps without copies
+    """
+
+    def __init__(self, systems: list, integrator=None) -> None:
+        first = systems[0]
+        for system in systems:
+            if not self.compatible(first, system):
+                raise ValueError('The batched replicas need the same particles, interactions, the half pair mode '
+                                 'and no neighbor list')
+
+        self.systems = systems
+        self.sigma, self.eps, self.mass = first.sigma, first.eps, first.mass
+        self.boltsman = first.boltsman
+        self.number_of_particles = first.number_of_particles
+        self.box_lengths = np.array([system.cube_length for system in systems], dtype=np.float64)
+        self.integrator = copy.deepcopy(first.integrator) if integrator is None else integrator
+        self.integrator.reset()
+        self.cache = StateCache()
+        self.positions_version = 0
+        self.velocities_version = 0
+
+        self.state = BatchState(np.stack([system.state.positions for system in systems]),
+                                np.stack([system.state.velocities for system in systems]), first.basis)
+        for r, system in enumerate(systems):
+            for name in ('positions', 'velocities', 'forces'):
+                setattr(system.state, name, self.state.stacked(name)[r])
+            system.positions_changed()
+            system.velocities_changed()
+
+    @staticmethod
+    def compatible(first: 'System', system: 'System') -> bool:
+        """
+        This method checks that the system can be batched with the first one.
+        The batched kernel uses the minimum image convention, so only the 'half' systems in the periodic box are batched
+        """
+        return system.state.positions.shape == first.state.positions.shape and system.neighbor_list is None and \
+            system.tabulated is None and system.pair_mode == 'half' and system.cube_length is not None and \
+            (system.sigma, system.eps, system.mass) == (first.sigma, first.eps, first.mass)
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return np.array([system.temperature for system in self.systems])
+
+    @property
+    def temperature(self) -> np.ndarray:
+        """Target temperatures of the replicas for the thermostats"""
+        return self.temperatures
+
+    @property
+    def interactions(self) -> tuple:
+        """Forces with shape (R * N, dimension), potential energies and virials of the replicas"""
+        return self.cache.get('interactions', self.positions_version, self._pair_sweep)
+
+    @property
+    def potential(self) -> np.ndarray:
+        return self.interactions[1]
+
+    @property
+    def kinetic(self) -> np.ndarray:
+        return self.cache.get('kinetic', self.velocities_version,
+                              lambda: 0.5 * self.mass * self.state.sum_squares())
+
+    @property
+    def velocity_coef(self) -> np.ndarray:
+        momentum_temperatures = 2 * self.kinetic / (3 * self.boltsman * self.number_of_particles)
+        for system, momentum_temperature in zip(self.systems, momentum_temperatures):
+            system.momentum_temperature = momentum_temperature
+        return (self.temperatures / momentum_temperatures) ** (1 / 2)
+
+    def positions_changed(self) -> None:
+        self.positions_version += 1
+        for system in self.systems:
+            system.positions_changed()
+
+    def velocities_changed(self) -> None:
+        self.velocities_version += 1
+        for system in self.systems:
+            system.velocities_changed()
+
+    def periodic_boundary_conditions(self) -> None:
+        self.state.wrap(self.box_lengths)
+        self.positions_changed()
+
+    def next_time_turn(self, delta_time: float) -> None:
+        self.integrator.step(self, delta_time)
+        # The energies of the batched sweep are given to the systems, so their observables do not sweep again
+        interactions = self.cache.peek('interactions', self.positions_version)
+        if interactions is not None:
+            _, energies, virials = interactions
+            for r, system in enumerate(self.systems):
+                system.cache.get('interactions', system.positions_version,
+                                 lambda: (system.state.forces, energies[r], virials[r]))
+        kinetic = self.cache.peek('kinetic', self.velocities_version)
+        if kinetic is not None:
+            for r, system in enumerate(self.systems):
+                system.cache.get('kinetic', system.velocities_version, lambda: kinetic[r])
+
+    def _pair_sweep(self) -> tuple:
+        positions, forces = self.state.stacked('positions'), self.state.stacked('forces')
+        energies, virials = np.empty(positions.shape[:2]), np.empty(positions.shape[:2])
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        self.lj_batched_pairs(positions, self.sigma, self.eps, self.box_lengths, forces, energies, virials)
+        # Every pair is visited from both particles
+        return self.state.forces, 0.5 * energies.sum(axis=1), 0.5 * virials.sum(axis=1)
+
+
+def advance(system: 'System', steps: int, delta_time: float) -> 'System':
+    """
+    This function advances the system in the worker process
+    :param system: Advanced system
+    :param steps: Number of the time steps
+    :param delta_time: Time step
+    :return: Advanced system
+    """
+
+    for _ in range(steps):
+        system.next_time_turn(delta_time)
+    system.potential
+    return system
+
+
+class Ensemble(object):
+    """
+    This class advances the independent replicas of the system together.
+    The small replicas are batched to one stacked array, so one kernel call covers all of them,
+    the large ones are advanced in the process pool. The replicas at the neighbouring temperatures
+    can exchange their temperatures by the Metropolis criterion (replica exchange)
+    """
+
+    def __init__(self, systems: list, mode: str = None, processes: int = None, seed: int = None) -> None:
+        """
+        :param systems: Replicas
+        :param mode: 'batch', 'process' or 'serial', the batch is used for the small compatible replicas if it is None
+        :param processes: Number of the worker processes for the process mode
+        :param seed: Seed of the exchange acceptance
+        """
+
+        if mode is None:
+            batchable = all(ReplicaBatch.compatible(systems[0], system) for system in systems)
+            mode = 'batch' if batchable and systems[0].number_of_particles <= BATCH_PARTICLES else 'process'
+        if mode not in ('batch', 'process', 'serial'):
+            raise ValueError(f'Unknown ensemble mode {mode}, use batch, process or serial')
+
+        self.systems = list(systems)
+        self.mode = mode
+        self.processes = processes
+        self.batch = ReplicaBatch(self.systems) if mode == 'batch' else None
+        # The workers are kept between the runs, so they import and compile the kernels once
+        self.executor = None
+        self.random = np.random.default_rng(seed)
+        self.number_of_steps = 0
+        self.number_of_exchanges = 0
+        self.attempted = np.zeros(max(len(systems) - 1, 0), dtype=np.int64)
+        self.accepted = np.zeros(max(len(systems) - 1, 0), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return np.array([system.temperature for system in self.systems])
+
+    @property
+    def potentials(self) -> np.ndarray:
+        return np.array([system.potential for system in self.systems])
+
+    def run(self, steps: int, delta_time: float, exchange_every: int = None, callback=None) -> None:
+        """
+        This method advances all replicas
+
+        :param steps: Number of the time steps
+        :param delta_time: Time step
+        :param exchange_every: Number of steps between the replica exchanges, there are no exchanges if it is None
+        :param callback: Function of the ensemble and the step number called after every exchange period
+        """
+
+        period = steps if exchange_every is None else exchange_every
+        if self.mode == 'process' and self.executor is None:
+            # The forked workers would inherit the threading layer of the numba kernels run before, which hangs
+            # the processes at the exit, so the workers are spawned
+            self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+        done = 0
+        while done < steps:
+            chunk = min(period, steps - done)
+            self._advance(chunk, delta_time)
+            done += chunk
+            self.number_of_steps += chunk
+            if exchange_every is not None and chunk == period:
+                self.exchange()
+            if callback is not None:
+                callback(self, self.number_of_steps)
+
+    def close(self) -> None:
+        """This method stops the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def exchange(self) -> None:
+        """
+        This method attempts the exchanges between the neighbouring temperatures, the even and the odd pairs
+        of the temperature ladder alternate. The accepted replicas swap the temperatures and rescale the velocities
+        """
+
+        potentials = self.potentials
+        order = np.argsort(self.temperatures)
+        for k in range(self.number_of_exchanges % 2, len(order) - 1, 2):
+            i, j = order[k], order[k + 1]
+            first, second = self.systems[i], self.systems[j]
+            delta = (1 / first.temperature - 1 / second.temperature) / first.boltsman * (potentials[i] - potentials[j])
+            self.attempted[k] += 1
+            if delta >= 0 or self.random.random() < np.exp(delta):
+                self.accepted[k] += 1
+                for system, temperature in ((first, second.temperature), (second, first.temperature)):
+                    system.state.scale_velocities((temperature / system.temperature) ** (1 / 2))
+                    system.velocities_changed()
+                    system.temperature = temperature
+        if self.batch is not None:
+            self.batch.velocities_changed()
+        self.number_of_exchanges += 1
+
+    @property
+    def acceptance(self) -> np.ndarray:
+        """Acceptance ratio of the exchanges between the neighbouring temperatures of the ladder"""
+        return self.accepted / np.maximum(self.attempted, 1)
+
+    def _advance(self, steps: int, delta_time: float) -> None:
+        if self.mode == 'batch':
+            for _ in range(steps):
+                self.batch.next_time_turn(delta_time)
+        elif self.mode == 'process':
+            futures = [self.executor.submit(advance, system, steps, delta_time) for system in self.systems]
+            self.systems = [future.result() for future in futures]
+        else:
+            for system in self.systems:
+                advance(system, steps, delta_time)
+
+
+if __name__ == '__main__':
+    pass
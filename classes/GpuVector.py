@@ -1,26 +1,54 @@
 import numpy as np
 from numba import cuda
 
+from classes.BufferPool import BufferPool
+from classes.Profiler import profiler
+
+# The results of the operations are taken from the pool and returned to it when the GpuVector is deleted
+pool = BufferPool(cuda.device_array)
+
+ADDITION, SUBSTRACTION, MULTIPLICATION, DIVIDE, FLOOR_DIVIDE = range(5)
+
 
 def types(func):
     """
-    This decorator looking for types and uses the special math operations to create the GpuVector from them
+    This decorator looking for types and uses the special math operations to create the GpuVector from them.
+    The numbers are passed to the scalar kernel as they are, so they are never copied to the device
     :param func: Decorating function
     :return: Decorated function
     """
 
     def inner(*args, **kwargs):
-        if type(args[1]) != GpuVector:
-            rows = args[0].vector[args[0].basis[0]].shape[0]
-            columns = args[0].vector[args[0].basis[0]].shape[1]
-            other = GpuVector.create_vector_from_dict(
-                {axis: np.ones((rows, columns)) * args[1] for axis in args[0].basis})
-            return func(args[0], other, **kwargs)
-        return func(*args, **kwargs)
+        if type(args[1]) == GpuVector or isinstance(args[1], (int, float, np.number)):
+            return func(*args, **kwargs)
+        if isinstance(args[1], np.ndarray):
+            shape = args[0].vector[args[0].basis[0]].shape
+            other = cuda.to_device(np.ascontiguousarray(np.broadcast_to(args[1], shape), dtype=args[0].dtype))
+            if profiler.enabled:
+                record(transfers=1, nbytes=other.nbytes)
+        else:
+            other = args[1]
+        other = GpuVector({axis: other for axis in args[0].basis})
+        return func(args[0], other, **kwargs)
 
     return inner
 
 
+def record(launches: int = 0, transfers: int = 0, nbytes: int = 0) -> None:
+    """
+    This function counts the kernel launches and the host / device transfers, it is called if the profiler is enabled
+    :param launches: Number of the kernel launches
+    :param transfers: Number of the transfers
+    :param nbytes: Number of the transferred bytes
+    """
+
+    if launches:
+        profiler.count('kernel_launches', launches)
+    if transfers:
+        profiler.count('transfers', transfers)
+        profiler.count('transferred_bytes', nbytes)
+
+
 class GpuOperations(object):
     @staticmethod
     @cuda.jit(fastmath=True)
@@ -57,6 +85,25 @@ class GpuOperations(object):
         if row < C.shape[0] and column < C.shape[1]:
             C[row, column] = A[row, column] // B[row, column]
 
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_scalar_operation(A, b, C, operation, inverse):
+        row, column = cuda.grid(2)
+        if row < C.shape[0] and column < C.shape[1]:
+            a = A[row, column]
+            if inverse:
+                a, b = b, a
+            if operation == 0:
+                C[row, column] = a + b
+            elif operation == 1:
+                C[row, column] = a - b
+            elif operation == 2:
+                C[row, column] = a * b
+            elif operation == 3:
+                C[row, column] = a / b
+            else:
+                C[row, column] = a // b
+
     @staticmethod
     @cuda.jit(fastmath=True)
     def cuda_power(A, B, C):
@@ -78,38 +125,85 @@ class GpuOperations(object):
     @cuda.jit(fastmath=True)
     def cuda_sum(A, B):
         row, column = cuda.grid(2)
-        temp = 0
         if row < A.shape[0] and column < A.shape[1]:
-            temp += A[row, column]
-        B = temp
+            cuda.atomic.add(B, (0, 0), A[row, column])
 
     @staticmethod
     @cuda.jit(fastmath=True)
     def cuda_sum_columns(A, B):
         row, column = cuda.grid(2)
         temp = 0
-        if row < A.shape[0]:
+        if row < A.shape[0] and column == 0:
             for j in range(A.shape[1]):
                 temp += A[row, j]
             B[row, 0] = temp
 
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_differences(A, C):
+        row, column = cuda.grid(2)
+        if row < C.shape[0] and column < C.shape[1]:
+            C[row, column] = A[row, 0] - A[column, 0]
+            if row == column:
+                C[row, column] += 1
+
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_transpose(A, C):
+        row, column = cuda.grid(2)
+        if row < C.shape[0] and column < C.shape[1]:
+            C[row, column] = A[column, row]
+
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_fill(A, b):
+        row, column = cuda.grid(2)
+        if row < A.shape[0] and column < A.shape[1]:
+            A[row, column] = b
+
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_add_square(A, B):
+        row, column = cuda.grid(2)
+        if row < B.shape[0] and column < B.shape[1]:
+            B[row, column] += A[row, column] ** 2
+
+    @staticmethod
+    @cuda.jit(fastmath=True)
+    def cuda_sqrt(A):
+        row, column = cuda.grid(2)
+        if row < A.shape[0] and column < A.shape[1]:
+            A[row, column] = A[row, column] ** 0.5
+
 
 class GpuVector(GpuOperations):
-    def __init__(self, vector: dict):
+    warp_size = None
+
+    def __init__(self, vector: dict, owned: bool = False):
+        """
+        :param vector: The dictionary with device arrays
+        :param owned: Are the arrays taken from the pool, they are returned to it when the GpuVector is deleted
+        """
         self.vector = vector
+        self.owned = owned
         self.basis = [axis for axis in list(vector.keys())]
         self.dimension = len(self.basis)
         self.size = self.vector[self.basis[0]].size
 
-        # Creating the answer GpuArray
-        self.answer = {axis: cuda.device_array_like(self.vector[self.basis[0]]) for axis in self.basis}
+        # Getting the information from VideoCard once and getting the threads per block (tpb) and blocks per grid(bpg)
+        if GpuVector.warp_size is None:
+            GpuVector.warp_size = cuda.get_current_device().WARP_SIZE
+        self.tpb = (self.warp_size, self.warp_size)
+        self.bpg = self.grid(self.vector[self.basis[0]].shape)
+
+    def __del__(self):
+        if getattr(self, 'owned', False):
+            for axis in self.basis:
+                pool.release(self.vector[axis])
 
-        # Getting the information from VideoCard and getting the threads per block (tpb) and blocks per grid(bpg)
-        self.device = cuda.get_current_device()
-        self.tpb = (self.device.WARP_SIZE, self.device.WARP_SIZE)
-        bpg_1 = int(np.ceil(self.vector[self.basis[0]].shape[0] / self.tpb[0]))
-        bpg_2 = int(np.ceil(self.vector[self.basis[0]].shape[1] / self.tpb[1]))
-        self.bpg = (bpg_1, bpg_2)
+    def grid(self, shape: tuple) -> tuple:
+        """This method returns the blocks per grid covering the array with the shape"""
+        return int(np.ceil(shape[0] / self.tpb[0])), int(np.ceil(shape[1] / self.tpb[1]))
 
     @classmethod
     def create_vector_from_dict(cls, vector: dict):
@@ -121,85 +215,140 @@ class GpuVector(GpuOperations):
         basis = list(vector.keys())
         for axis in basis:
             vector[axis] = cuda.to_device(vector[axis])
+        if profiler.enabled:
+            record(transfers=len(basis), nbytes=sum(vector[axis].nbytes for axis in basis))
         return cls(vector)
 
+    @classmethod
+    def create_vector_from_views(cls, vector: dict):
+        """
+        This method copies the column views of ParticleState to the device
+        :param vector: The dictionary with numpy views
+        :return: GpuVector
+        """
+        return cls.create_vector_from_dict({axis: np.ascontiguousarray(vector[axis]) for axis in vector})
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Type of the arrays, the results of the operations keep it"""
+        return self.vector[self.basis[0]].dtype
+
+    def _empty(self, shape: tuple = None) -> dict:
+        shape = self.vector[self.basis[0]].shape if shape is None else shape
+        return {axis: pool.acquire(shape, self.dtype) for axis in self.basis}
+
+    def _operation(self, other, operation: int, inverse: bool = False, answer: dict = None):
+        """
+        This method launches the element-wise kernels
+
+        :param other: GpuVector or number
+        :param operation: Code of the operation
+        :param inverse: Is the other operand the left one
+        :param answer: The dictionary with the output arrays, the pooled arrays are used if it is None
+        :return: GpuVector
+        """
+
+        owned = answer is None
+        answer = self._empty() if owned else answer
+        kernels = (self.cuda_addition, self.cuda_substraction, self.cuda_multiplication, self.cuda_divide,
+                   self.cuda_floor_divide)
+        for axis in self.basis:
+            if type(other) == GpuVector:
+                A, B = (other.vector[axis], self.vector[axis]) if inverse else (self.vector[axis], other.vector[axis])
+                kernels[operation][self.bpg, self.tpb](A, B, answer[axis])
+            else:
+                self.cuda_scalar_operation[self.bpg, self.tpb](self.vector[axis], float(other), answer[axis],
+                                                               operation, inverse)
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned) if owned else self
+
     @types
     def __add__(self, other):
-        for axis in self.basis:
-            self.cuda_addition[self.bpg, self.tpb](self.vector[axis], other.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, ADDITION)
 
     __radd__ = __add__
 
-    __iadd__ = __add__
+    @types
+    def __iadd__(self, other):
+        return self._operation(other, ADDITION, answer=self.vector)
 
     @types
     def __sub__(self, other):
-        for axis in self.basis:
-            self.cuda_substraction[self.bpg, self.tpb](self.vector[axis], other.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, SUBSTRACTION)
 
     @types
     def __rsub__(self, other):
-        for axis in self.basis:
-            self.cuda_substraction[self.bpg, self.tpb](other.vector[axis], self.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, SUBSTRACTION, inverse=True)
 
-    __isub__ = __sub__
+    @types
+    def __isub__(self, other):
+        return self._operation(other, SUBSTRACTION, answer=self.vector)
 
     @types
     def __mul__(self, other):
-        for axis in self.basis:
-            self.cuda_multiplication[self.bpg, self.tpb](self.vector[axis], other.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, MULTIPLICATION)
 
     __rmul__ = __mul__
 
-    __imul__ = __mul__
+    @types
+    def __imul__(self, other):
+        return self._operation(other, MULTIPLICATION, answer=self.vector)
 
     @types
     def __matmul__(self, other):
-        answer = {axis: cuda.to_device(np.zeros((self.vector[axis].shape[0], other.vector[axis].shape[1]))) for axis in
-                  self.basis}
+        shape = (self.vector[self.basis[0]].shape[0], other.vector[other.basis[0]].shape[1])
+        answer = self._empty(shape)
         for axis in self.basis:
-            self.cuda_matrix_mul[self.bpg, self.tpb](self.vector[axis], other.vector[axis], answer[axis])
-        return GpuVector(answer)
+            self.cuda_matrix_mul[self.grid(shape), self.tpb](self.vector[axis], other.vector[axis], answer[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned=True)
 
     @types
     def __rmatmul__(self, other):
-        answer = {axis: cuda.to_device(np.zeros((self.size, self.size))) for axis in self.basis}
+        shape = (other.vector[other.basis[0]].shape[0], self.vector[self.basis[0]].shape[1])
+        answer = self._empty(shape)
         for axis in self.basis:
-            self.cuda_matrix_mul[self.bpg, self.tpb](other.vector[axis], self.vector[axis], answer[axis])
-        return GpuVector(answer)
+            self.cuda_matrix_mul[self.grid(shape), self.tpb](other.vector[axis], self.vector[axis], answer[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned=True)
 
     @types
     def __truediv__(self, other):
-        for axis in self.basis:
-            self.cuda_divide[self.bpg, self.tpb](self.vector[axis], other.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, DIVIDE)
 
     @types
     def __rtruediv__(self, other):
-        for axis in self.basis:
-            self.cuda_divide[self.bpg, self.tpb](other.vector[axis], self.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, DIVIDE, inverse=True)
+
+    @types
+    def __itruediv__(self, other):
+        return self._operation(other, DIVIDE, answer=self.vector)
 
     @types
     def __floordiv__(self, other):
-        for axis in self.basis:
-            self.cuda_floor_divide[self.bpg, self.tpb](self.vector[axis], other.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, FLOOR_DIVIDE)
 
     @types
     def __rfloordiv__(self, other):
-        for axis in self.basis:
-            self.cuda_floor_divide[self.bpg, self.tpb](other.vector[axis], self.vector[axis], self.answer[axis])
-        return GpuVector(self.answer)
+        return self._operation(other, FLOOR_DIVIDE, inverse=True)
 
     def __pow__(self, power):
+        answer = self._empty()
         for axis in self.basis:
-            self.cuda_power[self.bpg, self.tpb](self.vector[axis], power, self.answer[axis])
-        return GpuVector(self.answer)
+            self.cuda_power[self.bpg, self.tpb](self.vector[axis], power, answer[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned=True)
+
+    def __ipow__(self, power):
+        for axis in self.basis:
+            self.cuda_power[self.bpg, self.tpb](self.vector[axis], power, self.vector[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return self
 
     def __str__(self):
         return str(self.to_dict())
@@ -207,53 +356,79 @@ class GpuVector(GpuOperations):
     def __len__(self) -> int:
         return self.size
 
-    def __abs__(self):
-        temp = cuda.device_array_like(self.vector[self.basis[0]])
+    def __abs__(self) -> np.ndarray:
+        temp = pool.acquire(self.vector[self.basis[0]].shape, self.dtype)
+        self.cuda_fill[self.bpg, self.tpb](temp, 0.0)
         for axis in self.basis:
-            self.cuda_power[self.bpg, self.tpb](self.vector[axis], 2, self.answer[axis])
-            self.cuda_addition[self.bpg, self.tpb](temp, self.vector[axis], temp)
-        return temp.copy_to_host()
-
-    def to_dict(self):
-        """This method is converting the GpuVector to dictionary"""
-        for axis in self.basis:
-            self.vector[axis] = self.vector[axis].copy_to_host()
-        return self.vector
+            self.cuda_add_square[self.bpg, self.tpb](self.vector[axis], temp)
+        self.cuda_sqrt[self.bpg, self.tpb](temp)
+        answer = temp.copy_to_host()
+        pool.release(temp)
+        if profiler.enabled:
+            record(launches=self.dimension + 2, transfers=1, nbytes=answer.nbytes)
+        return answer
+
+    def to_array(self) -> np.ndarray:
+        """This method copies the column GpuVector to the host as array with shape (rows, dimension)"""
+        if profiler.enabled:
+            record(transfers=self.dimension, nbytes=sum(self.vector[axis].nbytes for axis in self.basis))
+        return np.hstack([self.vector[axis].copy_to_host() for axis in self.basis])
+
+    def to_dict(self) -> dict:
+        """This method copies the GpuVector to the dictionary of host arrays"""
+        if profiler.enabled:
+            record(transfers=self.dimension, nbytes=sum(self.vector[axis].nbytes for axis in self.basis))
+        return {axis: self.vector[axis].copy_to_host() for axis in self.basis}
 
     @property
     def T(self):
         """This property method trasponse the GpuVector"""
-        self.vector = self.to_dict()
-        self.vector = {axis: cuda.to_device(self.vector[axis].T) for axis in self.basis}
-        return GpuVector(self.vector)
+        rows, columns = self.vector[self.basis[0]].shape
+        answer = self._empty((columns, rows))
+        for axis in self.basis:
+            self.cuda_transpose[self.grid((columns, rows)), self.tpb](self.vector[axis], answer[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned=True)
 
     def differences(self):
-        ones_matrix = cuda.to_device(np.ones((1, self.size)))
-        e = cuda.to_device(np.eye(self.size))
-        mat_mul_1, mat_mul_2 = cuda.device_array_like(e), cuda.device_array_like(e)
-        differences = {axis: cuda.device_array_like(e) for axis in self.basis}
-
+        shape = (self.size, self.size)
+        differences = self._empty(shape)
         for axis in self.basis:
-            self.cuda_matrix_mul[self.bpg, self.tpb](self.vector[axis], ones_matrix, mat_mul_1)
-            self.cuda_matrix_mul[self.bpg, self.tpb](ones_matrix.T, self.vector[axis].T, mat_mul_2)
-            self.cuda_substraction[self.bpg, self.tpb](mat_mul_1, mat_mul_2, differences[axis])
-            self.cuda_addition[self.bpg, self.tpb](differences[axis], e, differences[axis])
-        return GpuVector(differences)
+            self.cuda_differences[self.grid(shape), self.tpb](self.vector[axis], differences[axis])
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(differences, owned=True)
+
+    def lazy(self):
+        """This method returns the LazyVector with the deferred evaluation of the GpuVector arithmetic"""
+        from classes.LazyVector import LazyVector
+        # The arrays are held by the expression now, so they must not return to the pool
+        self.owned = False
+        return LazyVector.create_vector_from_dict(self.vector, GpuVector, 'gpu')
 
     def get_keys(self) -> list:
         return self.basis
 
     def sum(self) -> float:
-        temp = 0
+        temp = pool.acquire((1, 1))
+        self.cuda_fill[(1, 1), (1, 1)](temp, 0.0)
         for axis in self.basis:
-            temp += self.vector[axis].copy_to_host().sum()
-        return temp
+            self.cuda_sum[self.bpg, self.tpb](self.vector[axis], temp)
+        answer = temp.copy_to_host()[0, 0]
+        pool.release(temp)
+        if profiler.enabled:
+            record(launches=self.dimension + 1, transfers=1, nbytes=temp.nbytes)
+        return answer
 
     def sum_columns(self):
-        answer = {axis: cuda.to_device(np.zeros((self.vector[self.basis[0]].shape[0], 1))) for axis in self.basis}
+        shape = (self.vector[self.basis[0]].shape[0], 1)
+        answer = self._empty(shape)
         for axis in self.basis:
             self.cuda_sum_columns[self.bpg, self.tpb](self.vector[axis], answer[axis])
-        return GpuVector(answer)
+        if profiler.enabled:
+            record(launches=self.dimension)
+        return GpuVector(answer, owned=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+import itertools
+
+import numpy as np
+from numba import njit
+
+
+class ConfigurationOperations(object):
+    @staticmethod
+    @njit(cache=True)
+    def seed(seed):
+        np.random.seed(seed)
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def insert_particles(number_of_particles, dimension, box_length, min_distance, cells_per_side, stencil,
+                         max_attempts):
+        positions = np.empty((number_of_particles, dimension))
+        # Linked cells: the first particle of the cell and the next particle of the same cell
+        head = -np.ones(cells_per_side ** dimension, dtype=np.int64)
+        following = -np.ones(number_of_particles, dtype=np.int64)
+        cell_length = box_length / cells_per_side
+        min_distance2 = min_distance * min_distance
+        candidate = np.empty(dimension)
+        coordinates = np.empty(dimension, dtype=np.int64)
+
+        attempts = 0
+        inserted = 0
+        while inserted < number_of_particles:
+            attempts += 1
+            if attempts > max_attempts:
+                return positions[:inserted]
+            for k in range(dimension):
+                candidate[k] = np.random.random() * box_length
+                coordinates[k] = min(int(candidate[k] / cell_length), cells_per_side - 1)
+
+            overlap = False
+            for s in range(stencil.shape[0]):
+                flat = 0
+                for k in range(dimension - 1, -1, -1):
+                    flat = flat * cells_per_side + (coordinates[k] + stencil[s, k]) % cells_per_side
+                j = head[flat]
+                while j >= 0 and not overlap:
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = candidate[k] - positions[j, k]
+                        d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    overlap = r2 < min_distance2
+                    j = following[j]
+                if overlap:
+                    break
+            if overlap:
+                continue
+
+            flat = 0
+            for k in range(dimension - 1, -1, -1):
+                flat = flat * cells_per_side + coordinates[k]
+            positions[inserted] = candidate
+            following[inserted] = head[flat]
+            head[flat] = inserted
+            inserted += 1
+        return positions
+
+
+class InitialConfiguration(ConfigurationOperations):
+    """This class places the particles into the periodic cube without the overlaps"""
+
+    @staticmethod
+    def simple_cubic(number_of_particles: int, box_length: float, dimension: int = 3) -> np.ndarray:
+        """
+        This method places the particles to the sites of the simple cubic (square in 2D) lattice
+
+        :param number_of_particles: Number of particles
+        :param box_length: Length of the periodic cube
+        :param dimension: Dimension of the system
+        :return: Array of positions with shape (N, dimension)
+        """
+
+        sites_per_side = int(np.ceil(number_of_particles ** (1 / dimension) - 1e-9))
+        spacing = box_length / sites_per_side
+        sites = np.indices((sites_per_side,) * dimension).reshape(dimension, -1).T[:number_of_particles]
+        return (sites + 0.5) * spacing
+
+    @staticmethod
+    def fcc(number_of_particles: int, box_length: float, dimension: int = 3) -> np.ndarray:
+        """
+        This method places the particles to the sites of the face-centered cubic lattice
+
+        :param number_of_particles: Number of particles
+        :param box_length: Length of the periodic cube
+        :param dimension: Dimension of the system (3 only)
+        :return: Array of positions with shape (N, 3)
+        """
+
+        if dimension != 3:
+            raise ValueError('The fcc lattice is defined for the 3D system only')
+        cells_per_side = int(np.ceil((number_of_particles / 4) ** (1 / 3) - 1e-9))
+        spacing = box_length / cells_per_side
+        basis = np.array([[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]])
+        cells = np.indices((cells_per_side,) * 3).reshape(3, -1).T
+        sites = (cells[:, None, :] + basis[None, :, :]).reshape(-1, 3)[:number_of_particles]
+        return (sites + 0.25) * spacing
+
+    @classmethod
+    def random_sequential_insertion(cls, number_of_particles: int, box_length: float, min_distance: float,
+                                    dimension: int = 3, seed: int = None, max_attempts: int = None) -> np.ndarray:
+        """
+        This method inserts the particles at the random positions one by one, the candidate is rejected
+        if it is closer than min_distance to any inserted particle. The candidate is compared with the particles of
+        the neighbouring cells only, so the insertion is O(N) for the densities far from jamming
+
+        :param number_of_particles: Number of particles
+        :param box_length: Length of the periodic cube
+        :param min_distance: Minimum distance between the particles
+        :param dimension: Dimension of the system
+        :param seed: Seed of the random generator, it is taken from numpy.random if it is None
+        :param max_attempts: Maximum number of candidates (1000 * N by default)
+        :return: Array of positions with shape (N, dimension)
+        """
+
+        cells_per_side = max(int(box_length // min_distance), 1)
+        stencil = np.array(list(itertools.product((-1, 0, 1), repeat=dimension)), dtype=np.int64)
+        max_attempts = 1000 * number_of_particles if max_attempts is None else max_attempts
+        cls.seed(np.random.randint(2 ** 31) if seed is None else seed)
+
+        positions = cls.insert_particles(number_of_particles, dimension, box_length, min_distance, cells_per_side,
+                                         stencil, max_attempts)
+        if len(positions) < number_of_particles:
+            raise RuntimeError(f'Only {len(positions)} of {number_of_particles} particles were inserted, '
+                               f'the density is too high for the random insertion, use the lattice placement')
+        return positions
+
+    @classmethod
+    def create_positions(cls, placement: str, number_of_particles: int, box_length: float, min_distance: float,
+                         dimension: int = 3) -> np.ndarray:
+        """
+        This method creates the positions by the placement name
+
+        :param placement: 'random', 'sc' or 'fcc'
+        :param number_of_particles: Number of particles
+        :param box_length: Length of the periodic cube
+        :param min_distance: Minimum distance between the particles for the random placement
+        :param dimension: Dimension of the system
+        :return: Array of positions with shape (N, dimension)
+        """
+
+        if placement == 'random':
+            return cls.random_sequential_insertion(number_of_particles, box_length, min_distance, dimension)
+        if placement == 'sc':
+            return cls.simple_cubic(number_of_particles, box_length, dimension)
+        if placement == 'fcc':
+            return cls.fcc(number_of_particles, box_length, dimension)
+        raise ValueError(f'Unknown placement {placement}, use random, sc or fcc')
+
+
+if __name__ == '__main__':
+    pass
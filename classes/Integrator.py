@@ -0,0 +1,401 @@
+import importlib
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from classes.LJKernels import LJOperations
+from classes.NeighborList import NeighborList
+from classes.Profiler import profiler
+from classes.Thermostat import Rescaling, Thermostat
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+
+class Integrator(object):
+    """
+    This superclass describes the integrator of the equations of motion.
+    It keeps the forces and the potential energy of the last evaluation, so the next step and the Hamiltonian reuse
+    them. The thermostat is applied in the first kick of the step and the last kick sums the squared velocities,
+    so the kinetic energy is known without any other pass over the particles
+    """
+
+    def __init__(self, thermostat: Thermostat = None) -> None:
+        """
+        :param thermostat: Thermostat, the energy is conserved if it is None
+        """
+        self.thermostat = thermostat
+        self.forces = None
+        self.potential = None
+        self._interactions = None
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        """
+        This method moves the system on the one time step
+
+        :param system: Integrated system
+        :param delta_time: Time step
+        """
+
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """This method forgets the kept forces"""
+        self.forces = None
+        self.potential = None
+        self._interactions = None
+
+    def parameters(self) -> dict:
+        """Parameters of the constructor, they are JSON values or the descriptions of the nested objects"""
+        return {'thermostat': None if self.thermostat is None else self.thermostat.to_dict()}
+
+    def to_dict(self) -> dict:
+        """This method describes the integrator by its class and the parameters of the constructor"""
+        return {'class': [type(self).__module__, type(self).__qualname__], 'parameters': self.parameters()}
+
+    @staticmethod
+    def from_dict(description: dict) -> 'Integrator':
+        """
+        This method creates the integrator from the description of to_dict
+
+        :param description: Description of the integrator
+        :return: Integrator
+        """
+
+        module, name = description['class']
+        parameters = dict(description['parameters'])
+        if 'integrator' in parameters:
+            parameters['integrator'] = Integrator.from_dict(parameters['integrator'])
+        if parameters.get('thermostat') is not None:
+            parameters['thermostat'] = Thermostat.from_dict(parameters['thermostat'])
+        return getattr(importlib.import_module(module), name)(**parameters)
+
+    def current_forces(self, system: 'System') -> np.ndarray:
+        """
+        This method returns the forces of the current positions which the integrator evaluates anyway,
+        so the controllers of the step do not sweep the pairs again
+
+        :param system: Integrated system
+        :return: Array of forces with shape (N, dimension)
+        """
+
+        return self._forces(system)
+
+    def _forces(self, system: 'System') -> np.ndarray:
+        """
+        This method returns the forces in the current positions of the system, they are kept in the state forces.
+        The pair sweep is done only if the positions were changed since the last evaluation
+
+        :param system: Integrated system
+        :return: Array of forces with shape (N, dimension)
+        """
+
+        with profiler.phase('forces'):
+            interactions = system.interactions
+        if interactions is not self._interactions:
+            self._interactions = interactions
+            self.forces, self.potential = interactions[0], interactions[1]
+        return self.forces
+
+    def _thermostat(self, system: 'System', delta_time: float) -> tuple:
+        """
+        This method moves the thermostat on the time step
+
+        :param system: Integrated system
+        :param delta_time: Time step
+        :return: Scale of the velocities, standard deviation of the random kicks and key of their stream
+        """
+
+        if self.thermostat is None:
+            return 1.0, 0.0, np.uint64(0)
+        with profiler.phase('thermostat'):
+            return self.thermostat.coefficients(system, delta_time)
+
+    @staticmethod
+    def _kinetic(system: 'System', sum_squares) -> None:
+        """
+        This method gives the sum of the squared velocities of the last kick to the cache of the system
+
+        :param system: Integrated system
+        :param sum_squares: Sum of the squared velocities
+        """
+
+        system.velocities_changed()
+        system.cache.get('kinetic', system.velocities_version, lambda: 0.5 * system.mass * sum_squares)
+
+
+class SemiImplicitEuler(Integrator):
+    """This class realise the semi-implicit Euler scheme, by default with the rescaling to the system temperature"""
+
+    def __init__(self, thermostat: Thermostat = None) -> None:
+        super().__init__(Rescaling() if thermostat is None else thermostat)
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        state = system.state
+        scale, noise, key = self._thermostat(system, delta_time)
+        self._forces(system)
+        with profiler.phase('integration'):
+            self._kinetic(system, state.kick_sum_squares(delta_time / system.mass, scale, noise, key=key))
+            state.drift(delta_time)
+            system.positions_changed()
+
+        with profiler.phase('boundary'):
+            system.periodic_boundary_conditions()
+
+
+class VelocityVerlet(Integrator):
+    """This class realise the symplectic velocity Verlet scheme (microcanonical ensemble)"""
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        state = system.state
+        half_kick = delta_time / (2 * system.mass)
+
+        scale, noise, key = self._thermostat(system, delta_time)
+        self._forces(system)
+        with profiler.phase('integration'):
+            state.kick_sum_squares(half_kick, scale, noise, key=key)
+            state.drift(delta_time)
+            system.positions_changed()
+        with profiler.phase('boundary'):
+            system.periodic_boundary_conditions()
+
+        # The forces in the new positions are kept for the next step
+        self._forces(system)
+        with profiler.phase('integration'):
+            self._kinetic(system, state.kick_sum_squares(half_kick))
+
+
+class Leapfrog(Integrator):
+    """
+    This class realise the leapfrog scheme.
+    The velocities of the system are kept on the half steps, so they are half step behind the radiuses
+    """
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        state = system.state
+        scale, noise, key = self._thermostat(system, delta_time)
+        self._forces(system)
+        with profiler.phase('integration'):
+            self._kinetic(system, state.kick_sum_squares(delta_time / system.mass, scale, noise, key=key))
+            state.drift(delta_time)
+            system.positions_changed()
+
+        with profiler.phase('boundary'):
+            system.periodic_boundary_conditions()
+
+
+class RESPA(Integrator, LJOperations):
+    """
+    This class realise the reversible multiple time step scheme (r-RESPA) of the periodic LJ system.
+    The LJ potential is split by the smooth switching function between the inner and the outer radius:
+    the short range part moves the particles by the velocity Verlet on the substeps of the time step,
+    the long range part kicks the velocities at the ends of the time step only, so its pairs up to the cutoff
+    are swept once per time step. The short and the long range pairs are kept in their own Verlet lists
+    """
+
+    def __init__(self, inner: float, outer: float, substeps: int = 4, cutoff: float = None,
+                 skin: float = None, thermostat: Thermostat = None) -> None:
+        """
+        :param inner: Radius where the switching of the short range part begins
+        :param outer: Radius where the short range part vanishes
+        :param substeps: Number of the short range steps in the time step
+        :param cutoff: Cutoff radius of the long range part, the cutoff of the neighbor list of the system is used
+            if it is None
+        :param skin: Skin of the Verlet lists, the skin of the neighbor list of the system or 0.3 sigma is used
+            if it is None
+        :param thermostat: Thermostat applied in the long range kick, the energy is conserved if it is None
+        """
+        super().__init__(thermostat)
+        if not 0 < inner < outer:
+            raise ValueError('The switching radiuses have to be 0 < inner < outer')
+        if substeps < 1:
+            raise ValueError('The number of the substeps has to be positive')
+        self.inner = inner
+        self.outer = outer
+        self.substeps = substeps
+        self.cutoff = cutoff
+        self.skin = skin
+        self.lists = None
+        self.parts = None
+
+    def reset(self) -> None:
+        super().reset()
+        self.lists = None
+        self.parts = None
+
+    def parameters(self) -> dict:
+        return dict(super().parameters(), inner=self.inner, outer=self.outer, substeps=self.substeps,
+                    cutoff=self.cutoff, skin=self.skin)
+
+    def current_forces(self, system: 'System') -> np.ndarray:
+        # The sum of the parts is the whole force, both parts are reused by the next step
+        if self.lists is None:
+            self._prepare(system)
+        self._part(system, 0)
+        self._part(system, 1)
+        self._share(system)
+        return self.forces
+
+    def _prepare(self, system: 'System') -> None:
+        """
+        This method creates the Verlet lists and the force arrays of the parts
+
+        :param system: Integrated system
+        """
+
+        neighbor_list = system.neighbor_list
+        cutoff = self.cutoff if self.cutoff is not None else getattr(neighbor_list, 'cutoff', None)
+        if cutoff is None or system.cube_length is None:
+            raise ValueError('RESPA needs the periodic box and the cutoff radius')
+        if system.tabulated is not None:
+            raise ValueError('RESPA splits the LJ potential only')
+        if cutoff <= self.outer:
+            raise ValueError('The cutoff has to be larger than the outer switching radius')
+        skin = self.skin if self.skin is not None else getattr(neighbor_list, 'skin', 0.3 * system.sigma)
+        self.cutoff = cutoff
+        self.lists = (NeighborList(self.outer, skin, system.cube_length),
+                      NeighborList(cutoff, skin, system.cube_length))
+        # The forces, energy, virial and the positions version of the short (0) and the long (1) range part
+        self.parts = [[np.zeros_like(system.state.forces), 0.0, 0.0, None] for _ in range(2)]
+
+    def _part(self, system: 'System', part: int) -> np.ndarray:
+        """
+        This method returns the forces of the part in the current positions, they are swept once per positions version
+
+        :param system: Integrated system
+        :param part: 0 for the short range part, 1 for the long range part
+        :return: Array of forces with shape (N, dimension)
+        """
+
+        forces, _, _, version = self.parts[part]
+        if version != system.positions_version:
+            positions = system.state.positions
+            neighbor_list = self.lists[part]
+            with profiler.phase('neighbor_list'):
+                if neighbor_list.update(positions) and profiler.enabled:
+                    profiler.count('neighbor_list_builds')
+            with profiler.phase('forces'):
+                energy, virial = self.lj_switched_pairs(positions, neighbor_list.pairs, system.sigma, system.eps,
+                                                        self.inner, self.outer, neighbor_list.cutoff ** 2,
+                                                        system.cube_length, part, forces)
+            if profiler.enabled:
+                profiler.count('pair_sweeps')
+                profiler.count('kernel_launches')
+            self.parts[part][1:] = energy, virial, system.positions_version
+        return forces
+
+    def _share(self, system: 'System') -> None:
+        """
+        This method gives the sum of the parts to the cache of the system, so the Hamiltonian does not sweep the pairs
+
+        :param system: Integrated system
+        """
+
+        (short, short_energy, short_virial, _), (long, long_energy, long_virial, _) = self.parts
+        forces = system.state.forces
+        np.add(short, long, out=forces)
+        interactions = (forces, short_energy + long_energy, short_virial + long_virial)
+        system.cache.get('interactions', system.positions_version, lambda: interactions)
+        self.forces, self.potential = interactions[0], interactions[1]
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        if self.lists is None:
+            self._prepare(system)
+        state = system.state
+        fine_time = delta_time / self.substeps
+        long_kick = delta_time / (2 * system.mass)
+        short_kick = fine_time / (2 * system.mass)
+
+        scale, noise, key = self._thermostat(system, delta_time)
+        long = self._part(system, 1)
+        with profiler.phase('integration'):
+            state.kick_sum_squares(long_kick, scale, noise, long, key)
+        for _ in range(self.substeps):
+            short = self._part(system, 0)
+            with profiler.phase('integration'):
+                state.state_kick(state.velocities, short, short_kick)
+                state.drift(fine_time)
+                system.positions_changed()
+            with profiler.phase('boundary'):
+                system.periodic_boundary_conditions()
+            short = self._part(system, 0)
+            with profiler.phase('integration'):
+                state.state_kick(state.velocities, short, short_kick)
+
+        # The forces of both parts in the new positions are kept for the next step
+        long = self._part(system, 1)
+        with profiler.phase('integration'):
+            self._kinetic(system, state.kick_sum_squares(long_kick, forces=long))
+        self._share(system)
+
+
+class AdaptiveTimeStep(Integrator):
+    """
+    This class realise the adaptive time step of the velocity Verlet or RESPA integrator.
+    The time step is split into the equal substeps, so that no particle moves more than max_displacement
+    in the substep: |v| dt + |F| dt^2 / (2 m) <= max_displacement for the largest velocity and force.
+    The quiet system takes the whole time step at once and the forces are evaluated only on the hot one
+    """
+
+    def __init__(self, integrator: Integrator, max_displacement: float, min_delta_time: float = 0.0,
+                 max_delta_time: float = None) -> None:
+        """
+        :param integrator: Integrator of the substeps, its thermostat acts on every substep
+        :param max_displacement: Largest displacement of the particle in the substep
+        :param min_delta_time: Smallest substep, it is used even if the displacement is larger
+        :param max_delta_time: Largest substep
+        """
+        super().__init__(integrator.thermostat)
+        self.integrator = integrator
+        self.max_displacement = max_displacement
+        self.min_delta_time = min_delta_time
+        self.max_delta_time = max_delta_time
+        self.number_of_substeps = 0
+        self.last_delta_time = None
+
+    def reset(self) -> None:
+        super().reset()
+        self.integrator.reset()
+
+    def parameters(self) -> dict:
+        return {'integrator': self.integrator.to_dict(), 'max_displacement': self.max_displacement,
+                'min_delta_time': self.min_delta_time, 'max_delta_time': self.max_delta_time}
+
+    def current_forces(self, system: 'System') -> np.ndarray:
+        return self.integrator.current_forces(system)
+
+    def allowed_delta_time(self, system: 'System') -> float:
+        """
+        This method returns the largest substep of the current velocities and forces
+
+        :param system: Integrated system
+        :return: Substep
+        """
+
+        state = system.state
+        forces = self.integrator.current_forces(system)
+        velocity = state.max_norm('velocities')
+        acceleration = state.state_max_norm2(forces) ** (1 / 2) / system.mass
+        # The positive root of acceleration * dt^2 / 2 + velocity * dt = max_displacement
+        root = velocity + (velocity ** 2 + 2 * acceleration * self.max_displacement) ** (1 / 2)
+        delta_time = 2 * self.max_displacement / root if root > 0 else np.inf
+        if self.max_delta_time is not None:
+            delta_time = min(delta_time, self.max_delta_time)
+        return max(delta_time, self.min_delta_time)
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        remaining = delta_time
+        while remaining > 0:
+            # The rest of the time step is split equally, so the last substep is not the tiny one
+            substep = remaining / max(np.ceil(remaining / self.allowed_delta_time(system) * (1 - 1e-12)), 1)
+            self.integrator.step(system, substep)
+            self.number_of_substeps += 1
+            self.last_delta_time = substep
+            remaining -= substep
+            if remaining <= delta_time * 1e-12:
+                break
+        self.forces, self.potential = self.integrator.forces, self.integrator.potential
+
+
+if __name__ == '__main__':
+    pass
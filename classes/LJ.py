@@ -1,15 +1,55 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numba import get_num_threads
+
 from classes.Base import Base
-from classes.GpuVector import GpuVector
+from classes.BufferPool import BufferPool
+from classes.LJKernels import LJOperations
+from classes.NeighborList import NeighborList
+from classes.Profiler import profiler
+from classes.TabulatedPotential import TabulatedPotential
 
+if TYPE_CHECKING:
+    from classes.GpuVector import GpuVector
 
-class LJ(Base):
+
+class LJ(Base, LJOperations):
     """This class describes the LJ particular interactions"""
 
-    def __init__(self, radiuses: GpuVector, velocities: GpuVector, sigma: float, eps: float, mass: float) -> None:
+    def __init__(self, radiuses: 'GpuVector', velocities: 'GpuVector', sigma: float, eps: float, mass: float,
+                 neighbor_list: NeighborList = None, pair_mode: str = 'full', box_length: float = None,
+                 pair_potential: TabulatedPotential = None) -> None:
+        """
+        :param neighbor_list: Verlet list of the pairs, all pairs are evaluated if it is None
+        :param pair_mode: Evaluation of all pairs, 'full' visits the pair from both particles,
+            'half' visits the pairs i < j once and uses the minimum image convention in the box
+        :param box_length: Length of the periodic box for the 'half' mode, the box is not periodic if it is None
+        :param pair_potential: Tabulated pair potential used instead of LJ, the pairs are visited once in both modes,
+            the 'full' mode does not use the minimum image convention
+        """
         super().__init__(radiuses, velocities, mass)
 
+        if pair_mode not in ('full', 'half'):
+            raise ValueError(f'Unknown pair mode {pair_mode}, use full or half')
         self.sigma = sigma
         self.eps = eps
+        self.neighbor_list = neighbor_list
+        self.tabulated = pair_potential
+        # The DomainDecomposition evaluating the pairs in the worker processes
+        self.domains = None
+        self.pair_mode = pair_mode
+        self.box_length = box_length
+        self.buffers = BufferPool(np.empty)
+
+    @property
+    def interactions(self) -> tuple:
+        """
+        Forces with shape (N, dimension), potential energy and virial of LJ system from one sweep over the pairs.
+        The sweep is done once for every version of the positions
+        """
+
+        return self.cache.get('interactions', self.positions_version, self._pair_sweep)
 
     @property
     def potential(self) -> float:
@@ -17,34 +57,80 @@ class LJ(Base):
         Potential energy of LJ system
         """
 
-        differences = self.radius_differences
-        r = abs(differences)
-        temp = self.sigma / r
-        return 4 * self.eps * (temp ** 12 - temp ** 6).sum()
+        return self.interactions[1]
 
     @property
-    def force(self) -> GpuVector:
+    def force(self) -> 'GpuVector':
         """
-        Forces of LJ system
+        Forces of LJ system as the vector viewing the state forces
         """
 
-        differences = self.radius_differences
-        r = abs(differences)
-        temp = self.sigma / r
-        forces = differences * (8 * self.eps * (12 * temp ** 14 / self.sigma ** 2 - 6 * temp ** 8 / self.sigma ** 2))
-        return forces.sum_columns()
+        # The sweep fills the state forces
+        self.interactions
+        return self.vector_class.create_vector_from_views(self.state.axes('forces'))
 
     @property
-    def acceleration(self) -> GpuVector:
+    def virial(self) -> float:
+        """Virial of LJ system (sum of r_ij * F_ij over the pairs)"""
+        return self.interactions[2]
+
+    @property
+    def acceleration(self) -> 'GpuVector':
         """Accelerations of LJ system"""
         return self.force / self.mass
 
     @property
     def kinetic(self) -> float:
         """Kinetic energy of LJ System"""
-        return 0.5 * self.mass * (self.velocities ** 2).sum()
+        return self.cache.get('kinetic', self.velocities_version,
+                              lambda: 0.5 * self.mass * self.state.sum_squares())
 
     @property
     def hamilton(self) -> float:
         """Hamiltonian of LJ System"""
         return self.potential + self.kinetic
+
+    def _pair_sweep(self) -> tuple:
+        positions, forces = self.state.positions, self.state.forces
+        if profiler.enabled:
+            profiler.count('pair_sweeps')
+            # The workers of the domains launch their own kernels
+            if self.domains is None:
+                profiler.count('kernel_launches')
+        if self.tabulated is not None:
+            potential, virial = self._tabulated_sweep(positions, forces)
+        elif self.domains is not None:
+            potential, virial = self.domains.sweep(positions, forces)
+        elif self.neighbor_list is not None:
+            with profiler.phase('neighbor_list'):
+                if self.neighbor_list.update(positions) and profiler.enabled:
+                    profiler.count('neighbor_list_builds')
+            potential, virial = self.lj_neighbor_pairs(
+                positions, self.neighbor_list.pairs, self.sigma, self.eps, self.neighbor_list.cutoff ** 2,
+                self.neighbor_list.box_length, forces)
+        elif self.pair_mode == 'half':
+            buffer = self.buffers.acquire((min(get_num_threads(), len(positions)),) + positions.shape)
+            potential, virial = self.lj_half_pairs(positions, self.sigma, self.eps, np.inf, self.box_length or 0.0,
+                                                   buffer, forces)
+            self.buffers.release(buffer)
+        else:
+            potential, virial = self.lj_all_pairs(positions, self.sigma, self.eps, np.inf, forces)
+        return forces, potential, virial
+
+    def _tabulated_sweep(self, positions: np.ndarray, forces: np.ndarray) -> tuple:
+        table = self.tabulated
+        cutoff = table.cutoff
+        if self.neighbor_list is not None:
+            with profiler.phase('neighbor_list'):
+                if self.neighbor_list.update(positions) and profiler.enabled:
+                    profiler.count('neighbor_list_builds')
+            cutoff = min(cutoff, self.neighbor_list.cutoff)
+            return table.tabulated_neighbor_pairs(positions, self.neighbor_list.pairs, table.table, table.s_min,
+                                                  table.inverse_step, cutoff ** 2, self.neighbor_list.box_length,
+                                                  forces)
+        buffer = self.buffers.acquire((min(get_num_threads(), len(positions)),) + positions.shape)
+        result = table.tabulated_half_pairs(positions, table.table, table.s_min, table.inverse_step, cutoff ** 2,
+                                            (self.box_length or 0.0) if self.pair_mode == 'half' else 0.0, buffer,
+                                            forces)
+        self.buffers.release(buffer)
+        return result
@@ -0,0 +1,190 @@
+import numpy as np
+from numba import njit, prange
+
+
+class LJOperations(object):
+    """
+    The pair kernels write the forces to the given array and return the potential energy and the virial
+    from one sweep over the pairs
+    """
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def lj_all_pairs(positions, sigma, eps, cutoff2, forces):
+        number_of_particles, dimension = positions.shape
+        energy, virial = 0.0, 0.0
+        sigma2 = sigma * sigma
+        for i in prange(number_of_particles):
+            for k in range(dimension):
+                forces[i, k] = 0.0
+            for j in range(number_of_particles):
+                if i == j:
+                    continue
+                r2 = 0.0
+                for k in range(dimension):
+                    d = positions[i, k] - positions[j, k]
+                    r2 += d * d
+                if r2 >= cutoff2:
+                    continue
+                temp = (sigma2 / r2) ** 3
+                energy += 4 * eps * (temp * temp - temp)
+                w = 24 * eps * (2 * temp * temp - temp)
+                virial += w
+                w /= r2
+                for k in range(dimension):
+                    forces[i, k] += w * (positions[i, k] - positions[j, k])
+        # Every pair is visited from both particles
+        return 0.5 * energy, 0.5 * virial
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def lj_half_pairs(positions, sigma, eps, cutoff2, box_length, buffer, forces):
+        number_of_particles, dimension = positions.shape
+        # The minimum image convention is used for the positive box length only
+        # Every chunk takes every chunks-th row of the triangle and scatters the forces to its own buffer
+        chunks = buffer.shape[0]
+        energy, virial = 0.0, 0.0
+        sigma2 = sigma * sigma
+        for c in prange(chunks):
+            buffer[c] = 0.0
+            for i in range(c, number_of_particles, chunks):
+                for j in range(i + 1, number_of_particles):
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        if box_length > 0:
+                            d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    if r2 >= cutoff2:
+                        continue
+                    temp = (sigma2 / r2) ** 3
+                    energy += 4 * eps * (temp * temp - temp)
+                    w = 24 * eps * (2 * temp * temp - temp)
+                    virial += w
+                    w /= r2
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        if box_length > 0:
+                            d -= box_length * np.round(d / box_length)
+                        buffer[c, i, k] += w * d
+                        buffer[c, j, k] -= w * d
+        for i in prange(number_of_particles):
+            for k in range(dimension):
+                temp = 0.0
+                for c in range(chunks):
+                    temp += buffer[c, i, k]
+                forces[i, k] = temp
+        return energy, virial
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def lj_neighbor_pairs(positions, pairs, sigma, eps, cutoff2, box_length, forces):
+        dimension = positions.shape[1]
+        forces[:] = 0.0
+        energy, virial = 0.0, 0.0
+        sigma2 = sigma * sigma
+        for p in range(pairs.shape[0]):
+            i, j = pairs[p, 0], pairs[p, 1]
+            r2 = 0.0
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 >= cutoff2:
+                continue
+            temp = (sigma2 / r2) ** 3
+            energy += 4 * eps * (temp * temp - temp)
+            w = 24 * eps * (2 * temp * temp - temp)
+            virial += w
+            w /= r2
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                forces[i, k] += w * d
+                forces[j, k] -= w * d
+        return energy, virial
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def lj_domain_pairs(positions, pairs, owned, sigma, eps, cutoff2, box_length, forces):
+        # The first `owned` particles belong to the domain, the rest is the halo of the neighbouring domains.
+        # The pair with the halo particle is seen by both domains, so each of them takes a half of its energy
+        dimension = positions.shape[1]
+        forces[:] = 0.0
+        energy, virial = 0.0, 0.0
+        sigma2 = sigma * sigma
+        for p in range(pairs.shape[0]):
+            i, j = pairs[p, 0], pairs[p, 1]
+            if i >= owned and j >= owned:
+                continue
+            r2 = 0.0
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 >= cutoff2:
+                continue
+            weight = 0.5 * ((i < owned) + (j < owned))
+            temp = (sigma2 / r2) ** 3
+            energy += weight * 4 * eps * (temp * temp - temp)
+            w = 24 * eps * (2 * temp * temp - temp)
+            virial += weight * w
+            w /= r2
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                if i < owned:
+                    forces[i, k] += w * d
+                if j < owned:
+                    forces[j, k] -= w * d
+        return energy, virial
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def lj_switched_pairs(positions, pairs, sigma, eps, inner, outer, cutoff2, box_length, part, forces):
+        # The potential is split by the smooth switching function S(r), S = 1 below inner and S = 0 above outer.
+        # The part 0 is S * U (short range) and the part 1 is (1 - S) * U (long range), the parts sum to U
+        dimension = positions.shape[1]
+        forces[:] = 0.0
+        energy, virial = 0.0, 0.0
+        sigma2 = sigma * sigma
+        width = outer - inner
+        for p in range(pairs.shape[0]):
+            i, j = pairs[p, 0], pairs[p, 1]
+            r2 = 0.0
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 >= cutoff2:
+                continue
+            r = np.sqrt(r2)
+            if r <= inner:
+                switch, derivative = 1.0, 0.0
+            elif r >= outer:
+                switch, derivative = 0.0, 0.0
+            else:
+                x = (r - inner) / width
+                switch = 1 - x * x * (3 - 2 * x)
+                derivative = -6 * x * (1 - x) / width
+            if part == 1:
+                switch, derivative = 1 - switch, -derivative
+            if switch == 0.0 and derivative == 0.0:
+                continue
+            temp = (sigma2 / r2) ** 3
+            potential = 4 * eps * (temp * temp - temp)
+            # r * f(r) of the switched potential -d(S * U) / dr
+            w = switch * 24 * eps * (2 * temp * temp - temp) - derivative * potential * r
+            energy += switch * potential
+            virial += w
+            w /= r2
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                forces[i, k] += w * d
+                forces[j, k] -= w * d
+        return energy, virial
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,422 @@
+import functools
+
+import numpy as np
+from numba import njit, prange
+
+from classes.Profiler import profiler
+
+TEMPLATES = {
+    '+': '({} + {})',
+    '-': '({} - {})',
+    '*': '({} * {})',
+    '/': '({} / {})',
+    '//': '({} // {})',
+    '**': '({} ** {})',
+    'neg': '(-{})',
+    'sqrt': 'math.sqrt({})',
+}
+
+# Number of the fused kernels kept by the cache of Compiler
+MAX_KERNELS = 128
+
+CPU_SUM_COLUMNS = '''
+def kernel(rows, columns, {arguments}):
+    for i in prange(rows):
+{initialization}
+        for j in range(columns):
+{body}
+{accumulation}
+{store}
+'''
+
+CPU_ELEMENTWISE = '''
+def kernel(rows, columns, {arguments}):
+    for i in prange(rows):
+        for j in range(columns):
+{body}
+{store}
+'''
+
+GPU_SUM_COLUMNS = '''
+def kernel(rows, columns, {arguments}):
+    i = cuda.grid(1)
+    if i < rows:
+{initialization}
+        for j in range(columns):
+{body}
+{accumulation}
+{store}
+'''
+
+GPU_ELEMENTWISE = '''
+def kernel(rows, columns, {arguments}):
+    i, j = cuda.grid(2)
+    if i < rows and j < columns:
+        if True:
+{body}
+{store}
+'''
+
+
+def host(array) -> np.ndarray:
+    """This function copies the device array to the host"""
+    return array if isinstance(array, np.ndarray) else array.copy_to_host()
+
+
+def wrap(value):
+    """
+    This function converts the operand to the node of the expression tree
+    :param value: Node, number or array
+    :return: Node
+    """
+
+    if isinstance(value, Node):
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return Constant(float(value))
+    if isinstance(value, np.ndarray):
+        return Leaf(np.atleast_2d(value))
+    raise TypeError('Incompatible type use LazyVector, Node, ndarray, int or float')
+
+
+class Node(object):
+    """
+    This class describes the node of the deferred element-wise expression, the operators only build the tree.
+    The node keeps the target of its leaves, so the bare nodes (e.g. abs of LazyVector) run on their own backend
+    """
+
+    target = None
+
+    def __add__(self, other):
+        return Operation('+', self, wrap(other))
+
+    def __radd__(self, other):
+        return Operation('+', wrap(other), self)
+
+    def __sub__(self, other):
+        return Operation('-', self, wrap(other))
+
+    def __rsub__(self, other):
+        return Operation('-', wrap(other), self)
+
+    def __mul__(self, other):
+        return Operation('*', self, wrap(other))
+
+    def __rmul__(self, other):
+        return Operation('*', wrap(other), self)
+
+    def __truediv__(self, other):
+        return Operation('/', self, wrap(other))
+
+    def __rtruediv__(self, other):
+        return Operation('/', wrap(other), self)
+
+    def __floordiv__(self, other):
+        return Operation('//', self, wrap(other))
+
+    def __rfloordiv__(self, other):
+        return Operation('//', wrap(other), self)
+
+    def __pow__(self, power):
+        return Operation('**', self, Exponent(power))
+
+    def __neg__(self):
+        return Operation('neg', self)
+
+    def sqrt(self):
+        return Operation('sqrt', self)
+
+    def sum(self, target: str = None) -> float:
+        """This method evaluates the sum of all elements by the fused kernel, on the target of the leaves by default"""
+        return float(host(Compiler(target or self.target or 'cpu').sum_columns([self])[0]).sum())
+
+    def to_array(self, target: str = None) -> np.ndarray:
+        """This method evaluates the node by the fused kernel, on the target of the leaves by default"""
+        return Compiler(target or self.target or 'cpu').elementwise([self])[0]
+
+
+class Leaf(Node):
+    """The array operand, the arrays with one row or one column are broadcasted"""
+
+    def __init__(self, array, target: str = None) -> None:
+        self.array = array
+        self.shape = array.shape
+        # The device arrays are evaluated on the GPU
+        self.target = target or (None if isinstance(array, np.ndarray) else 'gpu')
+
+    def index(self) -> str:
+        return f'{"i" if self.shape[0] > 1 else "0"}, {"j" if self.shape[1] > 1 else "0"}'
+
+
+class Constant(Node):
+    """The number operand, it is passed to the kernel as argument, so the kernel does not depend on the value"""
+
+    def __init__(self, value: float) -> None:
+        self.value = value
+
+
+class Exponent(Node):
+    """The exponent of the power, it is written into the kernel, so the integer powers are unrolled by the compiler"""
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+class Identity(Node):
+    """The identity matrix, it is never allocated"""
+
+
+class Operation(Node):
+    def __init__(self, operation: str, *operands: Node) -> None:
+        self.operation = operation
+        self.operands = operands
+        self.target = next((operand.target for operand in operands if operand.target is not None), None)
+
+
+class LazyVector(object):
+    """
+    This class realise the deferred evaluation of the Vector, CpuVector and GpuVector arithmetic.
+    Every axis is the expression tree, the trees are compiled to one fused loop over all axes when
+    sum, sum_columns or to_dict is called
+    """
+
+    def __init__(self, vector: dict, vector_class, target: str = 'cpu') -> None:
+        self.vector = vector
+        self.basis = list(vector.keys())
+        self.vector_class = vector_class
+        self.target = target
+
+    @classmethod
+    def create_vector_from_dict(cls, vector: dict, vector_class, target: str = 'cpu'):
+        """
+        This method creates the LazyVector with the leaves from dictionary
+        :param vector: The dictionary with arrays (device arrays for the gpu target)
+        :param vector_class: Class of the evaluated vectors
+        :param target: 'cpu' or 'gpu'
+        :return: LazyVector
+        """
+        return cls({axis: Leaf(vector[axis], target) for axis in vector}, vector_class, target)
+
+    def _operation(self, other, operation: str, inverse: bool = False):
+        temp = {}
+        for axis in self.basis:
+            operand = other.vector[axis] if isinstance(other, LazyVector) else wrap(other)
+            if not inverse:
+                temp[axis] = Operation(operation, self.vector[axis], operand)
+            else:
+                temp[axis] = Operation(operation, operand, self.vector[axis])
+        return LazyVector(temp, self.vector_class, self.target)
+
+    def __add__(self, other):
+        return self._operation(other, '+')
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._operation(other, '-')
+
+    def __rsub__(self, other):
+        return self._operation(other, '-', inverse=True)
+
+    def __mul__(self, other):
+        return self._operation(other, '*')
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self._operation(other, '/')
+
+    def __rtruediv__(self, other):
+        return self._operation(other, '/', inverse=True)
+
+    def __floordiv__(self, other):
+        return self._operation(other, '//')
+
+    def __rfloordiv__(self, other):
+        return self._operation(other, '//', inverse=True)
+
+    def __pow__(self, power):
+        return LazyVector({axis: self.vector[axis] ** power for axis in self.basis}, self.vector_class, self.target)
+
+    def __abs__(self) -> Node:
+        temp = 0
+        for axis in self.basis:
+            temp = self.vector[axis] ** 2 + temp
+        return temp.sqrt()
+
+    def get_keys(self) -> list:
+        return self.basis
+
+    def differences(self):
+        """This method builds the differences of the column LazyVector leaves without the N x N matrices"""
+        differences = {}
+        for axis in self.basis:
+            leaf = self.vector[axis]
+            if not isinstance(leaf, Leaf) or leaf.shape[1] != 1:
+                raise ValueError('The differences are defined for the column leaves only')
+            differences[axis] = Leaf(leaf.array, self.target) - Leaf(leaf.array.T, self.target) + Identity()
+        return LazyVector(differences, self.vector_class, self.target)
+
+    def sum(self) -> float:
+        answer = Compiler(self.target).sum_columns([self.vector[axis] for axis in self.basis])
+        return float(sum(host(column).sum() for column in answer))
+
+    def sum_columns(self):
+        answer = Compiler(self.target).sum_columns([self.vector[axis] for axis in self.basis])
+        return self._evaluated(dict(zip(self.basis, answer)))
+
+    def to_dict(self) -> dict:
+        answer = Compiler(self.target).elementwise([self.vector[axis] for axis in self.basis])
+        return {axis: host(array) for axis, array in zip(self.basis, answer)}
+
+    def _evaluated(self, vector: dict):
+        if self.target == 'gpu':
+            return self.vector_class(vector)
+        return self.vector_class.create_vector_from_views(vector)
+
+
+class Compiler(object):
+    """
+    This class generates the fused kernel of the expression trees.
+    The kernels are cached by the generated source, i.e. by the structure of the trees and the broadcasting of leaves.
+    The cache keeps the MAX_KERNELS recently used kernels, so the programs building many expression shapes
+    do not keep all of their compiled kernels
+    """
+
+    def __init__(self, target: str = 'cpu') -> None:
+        if target not in ('cpu', 'gpu'):
+            raise ValueError(f'Unknown target {target}, use cpu or gpu')
+        self.target = target
+        self.arguments = []
+        self.values = []
+        self.body = []
+        self.names = {}
+        self.shape = (1, 1)
+        self.dtype = None
+
+    def sum_columns(self, outputs: list) -> list:
+        """
+        This method evaluates the sums over the columns of the trees
+        :param outputs: The expression trees
+        :return: List of arrays with shape (rows, 1)
+        """
+
+        results = [self._visit(output) for output in outputs]
+        template = GPU_SUM_COLUMNS if self.target == 'gpu' else CPU_SUM_COLUMNS
+        indent = ' ' * 12
+        source = template.format(
+            arguments=', '.join(self.arguments + [f'out{k}' for k in range(len(results))]),
+            initialization='\n'.join(f'{indent[4:]}s{k} = 0.0' for k in range(len(results))),
+            body='\n'.join(indent + line for line in self.body),
+            accumulation='\n'.join(f'{indent}s{k} += {result}' for k, result in enumerate(results)),
+            store='\n'.join(f'{indent[4:]}out{k}[i, 0] = s{k}' for k in range(len(results))))
+        answer = [self._empty((self.shape[0], 1)) for _ in results]
+        self._launch(source, answer)
+        return answer
+
+    def elementwise(self, outputs: list) -> list:
+        """
+        This method evaluates the trees element-wise
+        :param outputs: The expression trees
+        :return: List of arrays with the broadcasted shape
+        """
+
+        results = [self._visit(output) for output in outputs]
+        template = GPU_ELEMENTWISE if self.target == 'gpu' else CPU_ELEMENTWISE
+        indent = ' ' * 12
+        source = template.format(
+            arguments=', '.join(self.arguments + [f'out{k}' for k in range(len(results))]),
+            body='\n'.join(indent + line for line in self.body),
+            store='\n'.join(f'{indent}out{k}[i, j] = {result}' for k, result in enumerate(results)))
+        # The element-wise results keep the type of the leaves, the sums are float64
+        answer = [self._empty(self.shape, self.dtype) for _ in results]
+        self._launch(source, answer)
+        return answer
+
+    def _visit(self, node: Node) -> str:
+        if id(node) in self.names:
+            return self.names[id(node)]
+
+        if isinstance(node, Leaf):
+            name = self._argument(self._array(node.array))
+            self.shape = (max(self.shape[0], node.shape[0]), max(self.shape[1], node.shape[1]))
+            self.dtype = node.array.dtype if self.dtype is None else np.result_type(self.dtype, node.array.dtype)
+            expression = f'{name}[{node.index()}]'
+        elif isinstance(node, Constant):
+            expression = self._argument(node.value)
+        elif isinstance(node, Exponent):
+            expression = repr(node.value)
+        elif isinstance(node, Identity):
+            expression = '(1.0 if i == j else 0.0)'
+        elif isinstance(node, Operation):
+            operands = [self._visit(operand) for operand in node.operands]
+            expression = TEMPLATES[node.operation].format(*operands)
+        else:
+            raise TypeError(f'Unknown node {type(node).__name__}')
+
+        variable = f't{len(self.names)}'
+        self.body.append(f'{variable} = {expression}')
+        self.names[id(node)] = variable
+        return variable
+
+    def _argument(self, value) -> str:
+        name = f'a{len(self.arguments)}'
+        self.arguments.append(name)
+        self.values.append(value)
+        return name
+
+    def _array(self, array):
+        if self.target == 'gpu':
+            from numba import cuda
+            return cuda.to_device(np.ascontiguousarray(array)) if isinstance(array, np.ndarray) else array
+        return array
+
+    def _empty(self, shape: tuple, dtype=None):
+        dtype = np.float64 if dtype is None else dtype
+        if self.target == 'gpu':
+            from numba import cuda
+            return cuda.device_array(shape, dtype)
+        return np.empty(shape, dtype)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=MAX_KERNELS)
+    def kernel(target: str, source: str):
+        """
+        This method compiles the generated source, the recently used kernels are cached
+
+        :param target: 'cpu' or 'gpu'
+        :param source: Source of the kernel function
+        :return: Compiled kernel
+        """
+
+        namespace = {'math': __import__('math'), 'prange': prange}
+        if profiler.enabled:
+            profiler.count('fused_kernels_compiled')
+        if target == 'gpu':
+            from numba import cuda
+            namespace['cuda'] = cuda
+            exec(source, namespace)
+            return cuda.jit(fastmath=True)(namespace['kernel'])
+        exec(source, namespace)
+        return njit(parallel=True, fastmath=True)(namespace['kernel'])
+
+    def _launch(self, source: str, answer: list) -> None:
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        kernel = self.kernel(self.target, source)
+        rows, columns = self.shape
+        if self.target == 'gpu':
+            from numba import cuda
+            warp = cuda.get_current_device().WARP_SIZE
+            if answer[0].shape[1] == 1:
+                kernel[int(np.ceil(rows / warp)), warp](rows, columns, *self.values, *answer)
+            else:
+                tpb = (warp, warp)
+                bpg = (int(np.ceil(rows / warp)), int(np.ceil(columns / warp)))
+                kernel[bpg, tpb](rows, columns, *self.values, *answer)
+        else:
+            kernel(rows, columns, *self.values, *answer)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,276 @@
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numba import njit, prange
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+
+class MinimizerOperations(object):
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def fire_power(velocities, forces):
+        # The power F.v and the squared norms of the velocities and the forces from one pass
+        power, velocity2, force2 = 0.0, 0.0, 0.0
+        for i in prange(velocities.shape[0]):
+            for k in range(velocities.shape[1]):
+                v, f = velocities[i, k], np.float64(forces[i, k])
+                power += f * v
+                velocity2 += v * v
+                force2 += f * f
+        return power, velocity2, force2
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def fire_move(positions, velocities, forces, mixing, kick, delta_time, max_step):
+        # v = (1 - alpha) v + alpha |v| F / |F| is mixed before the kick, the move of the particle is limited
+        for i in prange(velocities.shape[0]):
+            step2 = 0.0
+            for k in range(velocities.shape[1]):
+                v = (1 - mixing[0]) * velocities[i, k] + mixing[1] * forces[i, k] + kick * forces[i, k]
+                velocities[i, k] = v
+                step2 += (v * delta_time) ** 2
+            scale = min(1.0, max_step / np.sqrt(step2)) if step2 > 0 else 1.0
+            for k in range(velocities.shape[1]):
+                positions[i, k] += scale * delta_time * velocities[i, k]
+
+
+class Minimizer(MinimizerOperations):
+    """
+    This superclass describes the minimisation of the potential energy of the system before the dynamics.
+    The forces and the energy are taken from the interactions of the system, so the minimisers work with every
+    pair evaluation (Verlet list, tabulated potential, domains). The velocities of the system are kept
+    """
+
+    def __init__(self, force_tolerance: float = None, max_iterations: int = 1000, max_step: float = None) -> None:
+        """
+        :param force_tolerance: The minimisation stops when the largest force is smaller, 1e-3 eps / sigma by default
+        :param max_iterations: Largest number of the iterations
+        :param max_step: Largest move of the particle in the iteration, 0.1 sigma by default
+        """
+        self.force_tolerance = force_tolerance
+        self.max_iterations = max_iterations
+        self.max_step = max_step
+        self.force_calls = 0
+
+    def _interactions(self, system: 'System') -> tuple:
+        """
+        This method returns the forces and the potential energy in the current positions of the system
+
+        :param system: Minimised system
+        :return: Array of forces with shape (N, dimension) and potential energy
+        """
+
+        self.force_calls += 1
+        forces, potential, _ = system.interactions
+        return forces, potential
+
+    def minimize(self, system: 'System') -> dict:
+        """
+        This method moves the particles to the local minimum of the potential energy
+
+        :param system: Minimised system
+        :return: Report with the number of the iterations and the force calls, the largest force and the energy
+        """
+
+        self.force_calls = 0
+        tolerance = 1e-3 * system.eps / system.sigma if self.force_tolerance is None else self.force_tolerance
+        max_step = 0.1 * system.sigma if self.max_step is None else self.max_step
+        iterations = self.run(system, tolerance, max_step)
+        system.periodic_boundary_conditions()
+        forces, potential = self._interactions(system)
+        max_force = system.state.max_norm('forces')
+        return {'method': type(self).__name__, 'iterations': iterations, 'force_calls': self.force_calls,
+                'max_force': max_force, 'potential': potential, 'converged': bool(max_force < tolerance)}
+
+    def run(self, system: 'System', tolerance: float, max_step: float) -> int:
+        """
+        This method iterates until the largest force is smaller than the tolerance
+
+        :return: Number of the iterations
+        """
+
+        raise NotImplementedError
+
+
+class FIRE(Minimizer):
+    """
+    This class realise the fast inertial relaxation engine (Bitzek et al. 2006).
+    The particles move by the damped dynamics with the velocities turned along the forces, the time step grows
+    while the power F.v is positive and the motion is stopped when it is uphill
+    """
+
+    def __init__(self, force_tolerance: float = None, max_iterations: int = 1000, max_step: float = None,
+                 delta_time: float = None, max_delta_time: float = None, alpha: float = 0.1, min_steps: int = 5,
+                 increase: float = 1.1, decrease: float = 0.5, alpha_decrease: float = 0.99) -> None:
+        """
+        :param delta_time: Initial time step, 0.005 of the LJ time sigma sqrt(mass / eps) by default
+        :param max_delta_time: Largest time step, 10 initial time steps by default
+        :param alpha: Initial mixing of the velocities with the forces
+        :param min_steps: Number of the downhill steps before the time step grows
+        :param increase: Growth of the time step
+        :param decrease: Reduction of the time step after the uphill step
+        :param alpha_decrease: Reduction of the mixing
+        """
+        super().__init__(force_tolerance, max_iterations, max_step)
+        self.delta_time = delta_time
+        self.max_delta_time = max_delta_time
+        self.alpha = alpha
+        self.min_steps = min_steps
+        self.increase = increase
+        self.decrease = decrease
+        self.alpha_decrease = alpha_decrease
+
+    def run(self, system: 'System', tolerance: float, max_step: float) -> int:
+        state = system.state
+        delta_time = 0.005 * system.sigma * (system.mass / system.eps) ** (1 / 2) if self.delta_time is None \
+            else self.delta_time
+        max_delta_time = 10 * delta_time if self.max_delta_time is None else self.max_delta_time
+        alpha, downhill = self.alpha, 0
+        velocities = np.zeros(state.positions.shape)
+
+        for iteration in range(self.max_iterations):
+            forces, _ = self._interactions(system)
+            if state.max_norm('forces') < tolerance:
+                return iteration
+            power, velocity2, force2 = self.fire_power(velocities, forces)
+            # The resting particles (zero power) start downhill
+            if power >= 0:
+                downhill += 1
+                if downhill > self.min_steps:
+                    delta_time = min(delta_time * self.increase, max_delta_time)
+                    alpha *= self.alpha_decrease
+                mixing = np.array([alpha, alpha * (velocity2 / force2) ** (1 / 2) if force2 > 0 else 0.0])
+            else:
+                downhill = 0
+                delta_time *= self.decrease
+                alpha = self.alpha
+                velocities[...] = 0.0
+                mixing = np.zeros(2)
+            self.fire_move(state.positions, velocities, forces, mixing, delta_time / system.mass, delta_time,
+                           max_step)
+            system.positions_changed()
+        return self.max_iterations
+
+
+class LBFGS(Minimizer):
+    """
+    This class realise the limited memory BFGS minimisation over the flattened coordinates.
+    The direction is the two-loop recursion of the last `memory` steps, the step length is found
+    by the backtracking until the Armijo condition holds. The trial positions cost one force call each,
+    so the backtracking is short: the direction which fails after `backtracking` halvings is replaced
+    by the steepest descent and the memory is dropped. The steepest descent step is halved until the largest
+    move is below min_step, if it still fails the positions are restored and the minimisation stops unconverged.
+    The energy of the truncated LJ jumps at the cutoff and fails the Armijo condition, the shifted-force
+    TabulatedPotential converges much faster
+    """
+
+    def __init__(self, force_tolerance: float = None, max_iterations: int = 1000, max_step: float = None,
+                 memory: int = 10, armijo: float = 1e-4, backtracking: int = 4, min_step: float = None) -> None:
+        """
+        :param memory: Number of the kept steps
+        :param armijo: Sufficient decrease of the energy along the direction
+        :param backtracking: Largest number of the halvings of the step along the quasi-Newton direction
+        :param min_step: Smallest largest move of the particle in the steepest descent, 1e-6 sigma by default
+        """
+        super().__init__(force_tolerance, max_iterations, max_step)
+        self.memory = memory
+        self.armijo = armijo
+        self.backtracking = backtracking
+        self.min_step = min_step
+
+    @staticmethod
+    def direction(gradient: np.ndarray, history: deque) -> np.ndarray:
+        """
+        This method applies the inverse Hessian approximation of the kept steps to the gradient
+
+        :param gradient: Gradient of the energy (minus forces)
+        :param history: Pairs of the steps and the changes of the gradient
+        :return: Descent direction
+        """
+
+        q = gradient.copy()
+        coefficients = []
+        for s, y in reversed(history):
+            rho = 1 / y.dot(s)
+            a = rho * s.dot(q)
+            q -= a * y
+            coefficients.append((rho, a))
+        if history:
+            s, y = history[-1]
+            q *= s.dot(y) / y.dot(y)
+        for (s, y), (rho, a) in zip(history, reversed(coefficients)):
+            q += (a - rho * y.dot(q)) * s
+        return -q
+
+    @staticmethod
+    def largest_move(direction: np.ndarray, shape: tuple) -> float:
+        """
+        This method returns the largest move of the particle along the direction with the unit length
+
+        :param direction: Descent direction
+        :param shape: Shape of the positions
+        :return: Largest norm of the particle components of the direction
+        """
+
+        return np.sqrt((direction.reshape(shape) ** 2).sum(axis=1).max())
+
+    def run(self, system: 'System', tolerance: float, max_step: float) -> int:
+        min_step = 1e-6 * system.sigma if self.min_step is None else self.min_step
+        state = system.state
+        shape = state.positions.shape
+        history = deque(maxlen=self.memory)
+        forces, energy = self._interactions(system)
+        gradient = -forces.ravel().astype(np.float64)
+
+        for iteration in range(self.max_iterations):
+            if state.max_norm('forces') < tolerance:
+                return iteration
+            direction = self.direction(gradient, history)
+            slope = gradient.dot(direction)
+            if slope >= 0:
+                # The approximation has lost the positive curvature, the memory is dropped
+                history.clear()
+                direction, slope = -gradient, -gradient.dot(gradient)
+            # The first trial moves no particle more than max_step
+            length = min(1.0, max_step / self.largest_move(direction, shape))
+            start = state.positions.astype(np.float64)
+            halvings = 0
+            while True:
+                state.positions[...] = start + length * direction.reshape(shape)
+                system.positions_changed()
+                forces, trial = self._interactions(system)
+                if trial <= energy + self.armijo * length * slope:
+                    break
+                if halvings < self.backtracking:
+                    halvings += 1
+                    length /= 2
+                elif history:
+                    # The quasi-Newton direction has failed, the search restarts along the forces
+                    history.clear()
+                    direction, slope = -gradient, -gradient.dot(gradient)
+                    length, halvings = min(1.0, max_step / self.largest_move(direction, shape)), 0
+                elif length * self.largest_move(direction, shape) > min_step:
+                    length /= 2
+                else:
+                    # No step along the forces decreases the energy, the failed trial is not taken
+                    state.positions[...] = start
+                    system.positions_changed()
+                    return iteration
+
+            new_gradient = -forces.ravel().astype(np.float64)
+            step, change = length * direction, new_gradient - gradient
+            if step.dot(change) > 0:
+                history.append((step, change))
+            gradient, energy = new_gradient, trial
+            system.periodic_boundary_conditions()
+        return self.max_iterations
+
+
+MINIMIZERS = {'fire': FIRE, 'lbfgs': LBFGS}
+
+
+if __name__ == '__main__':
+    pass
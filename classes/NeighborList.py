@@ -0,0 +1,157 @@
+import itertools
+
+import numpy as np
+from numba import njit, prange
+
+
+class NeighborOperations(object):
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def cell_coordinates(positions, box_length, cells_per_side):
+        coordinates = np.empty(positions.shape, dtype=np.int64)
+        cell_length = box_length / cells_per_side
+        for i in range(positions.shape[0]):
+            for k in range(positions.shape[1]):
+                c = int(np.floor(positions[i, k] / cell_length)) % cells_per_side
+                coordinates[i, k] = c
+        return coordinates
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def count_pairs(positions, order, cell_start, coordinates, stencil, cells_per_side, box_length, cutoff2):
+        n, dimension = positions.shape
+        counts = np.zeros(n, dtype=np.int64)
+        for i in prange(n):
+            temp = 0
+            for s in range(stencil.shape[0]):
+                flat = 0
+                for k in range(dimension - 1, -1, -1):
+                    flat = flat * cells_per_side + (coordinates[i, k] + stencil[s, k]) % cells_per_side
+                for m in range(cell_start[flat], cell_start[flat + 1]):
+                    j = order[m]
+                    if j <= i:
+                        continue
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    if r2 < cutoff2:
+                        temp += 1
+            counts[i] = temp
+        return counts
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def fill_pairs(positions, order, cell_start, coordinates, stencil, cells_per_side, box_length, cutoff2, offsets,
+                   pairs):
+        n, dimension = positions.shape
+        for i in prange(n):
+            position = offsets[i]
+            for s in range(stencil.shape[0]):
+                flat = 0
+                for k in range(dimension - 1, -1, -1):
+                    flat = flat * cells_per_side + (coordinates[i, k] + stencil[s, k]) % cells_per_side
+                for m in range(cell_start[flat], cell_start[flat + 1]):
+                    j = order[m]
+                    if j <= i:
+                        continue
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    if r2 < cutoff2:
+                        pairs[position, 0] = i
+                        pairs[position, 1] = j
+                        position += 1
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def max_displacement2(positions, reference, box_length):
+        temp = 0.0
+        for i in range(positions.shape[0]):
+            r2 = 0.0
+            for k in range(positions.shape[1]):
+                d = positions[i, k] - reference[i, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 > temp:
+                temp = r2
+        return temp
+
+
+class NeighborList(NeighborOperations):
+    """This class realise the linked cells and the Verlet list of the particle pairs in the periodic cube"""
+
+    def __init__(self, cutoff: float, skin: float, box_length: float) -> None:
+        self.cutoff = cutoff
+        self.skin = skin
+        self.box_length = box_length
+
+        self.pairs = np.empty((0, 2), dtype=np.int64)
+        self.reference = None
+        self.number_of_builds = 0
+
+    @property
+    def list_radius(self) -> float:
+        """Radius of the Verlet list (cutoff radius plus skin)"""
+        return self.cutoff + self.skin
+
+    def update(self, positions: np.ndarray) -> bool:
+        """
+        This method rebuilds the Verlet list if some particle has moved more than half of the skin
+
+        :param positions: Array of particles positions with shape (N, dimension)
+        :return: Was the list rebuilt (bool)
+        """
+
+        if self.reference is None or self.reference.shape != positions.shape or \
+                self.max_displacement2(positions, self.reference, self.box_length) > (self.skin / 2) ** 2:
+            self.build(positions)
+            return True
+        return False
+
+    def build(self, positions: np.ndarray) -> None:
+        """
+        This method builds the linked cells and the Verlet list from them
+
+        :param positions: Array of particles positions with shape (N, dimension)
+        """
+
+        positions = np.ascontiguousarray(positions, dtype=np.float64)
+        number_of_particles, dimension = positions.shape
+
+        # The stencil must not wrap onto the same cell twice, otherwise the pairs are counted twice
+        cells_per_side = int(self.box_length // self.list_radius)
+        if cells_per_side < 3:
+            cells_per_side = 1
+            stencil = np.zeros((1, dimension), dtype=np.int64)
+        else:
+            stencil = np.array(list(itertools.product((-1, 0, 1), repeat=dimension)), dtype=np.int64)
+
+        coordinates = self.cell_coordinates(positions, self.box_length, cells_per_side)
+        flat = np.zeros(number_of_particles, dtype=np.int64)
+        for k in range(dimension - 1, -1, -1):
+            flat = flat * cells_per_side + coordinates[:, k]
+        order = np.argsort(flat, kind='stable')
+        cell_start = np.searchsorted(flat[order], np.arange(cells_per_side ** dimension + 1))
+
+        cutoff2 = self.list_radius ** 2
+        counts = self.count_pairs(positions, order, cell_start, coordinates, stencil, cells_per_side,
+                                  self.box_length, cutoff2)
+        offsets = np.zeros(number_of_particles, dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        self.pairs = np.empty((counts.sum(), 2), dtype=np.int64)
+        self.fill_pairs(positions, order, cell_start, coordinates, stencil, cells_per_side, self.box_length, cutoff2,
+                        offsets, self.pairs)
+
+        self.reference = positions.copy()
+        self.number_of_builds += 1
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,312 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+
+class ObservableOperations(object):
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def histogram_all_pairs(positions, box_length, r_max, buffer):
+        number_of_particles, dimension = positions.shape
+        chunks, bins = buffer.shape
+        width = r_max / bins
+        r_max2 = r_max * r_max
+        for c in prange(chunks):
+            for i in range(c, number_of_particles, chunks):
+                for j in range(i + 1, number_of_particles):
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    if r2 < r_max2:
+                        buffer[c, min(int(np.sqrt(r2) / width), bins - 1)] += 1
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def histogram_pairs(positions, pairs, box_length, r_max, histogram):
+        dimension = positions.shape[1]
+        bins = histogram.shape[0]
+        width = r_max / bins
+        r_max2 = r_max * r_max
+        for p in range(pairs.shape[0]):
+            i, j = pairs[p, 0], pairs[p, 1]
+            r2 = 0.0
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 < r_max2:
+                histogram[min(int(np.sqrt(r2) / width), bins - 1)] += 1
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def unwrap(unwrapped, positions, previous, box_length):
+        for i in prange(positions.shape[0]):
+            for k in range(positions.shape[1]):
+                d = positions[i, k] - previous[i, k]
+                unwrapped[i, k] += d - box_length * np.round(d / box_length)
+                previous[i, k] = positions[i, k]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def square_displacement(positions, origin):
+        temp = 0.0
+        for i in prange(positions.shape[0]):
+            for k in range(positions.shape[1]):
+                d = positions[i, k] - origin[i, k]
+                temp += d * d
+        return temp / positions.shape[0]
+
+
+class RunningStatistics(object):
+    """This class realise the running mean and variance of the samples (Welford algorithm)"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return self.variance ** (1 / 2)
+
+    def to_dict(self) -> dict:
+        return {'mean': self.mean, 'std': self.std, 'count': self.count}
+
+
+class Observable(ObservableOperations):
+    """
+    This superclass describes the analysis of the system which is sampled every `every` steps.
+    The analyses keep the streaming accumulators only, so their memory does not depend on the length of the run
+    """
+
+    def __init__(self, every: int = 1) -> None:
+        self.every = every
+
+    def update(self, system: 'System', step: int) -> None:
+        """
+        This method samples the system if the step is the multiple of every
+
+        :param system: Analysed system
+        :param step: Number of the time step
+        """
+
+        if step % self.every == 0:
+            self.sample(system)
+
+    def sample(self, system: 'System') -> None:
+        raise NotImplementedError
+
+    def to_dict(self) -> dict:
+        raise NotImplementedError
+
+
+class Scalars(Observable):
+    """This superclass keeps the running statistics of the scalar quantities returned by the values method"""
+
+    def __init__(self, every: int = 1) -> None:
+        super().__init__(every)
+        self.statistics = {}
+
+    def values(self, system: 'System') -> dict:
+        raise NotImplementedError
+
+    def sample(self, system: 'System') -> None:
+        for name, value in self.values(system).items():
+            self.statistics.setdefault(name, RunningStatistics()).update(value)
+
+    def to_dict(self) -> dict:
+        return {name: statistics.to_dict() for name, statistics in self.statistics.items()}
+
+
+class Energy(Scalars):
+    """Potential, kinetic and total energy, the potential energy is taken from the pair sweep of the forces"""
+
+    def values(self, system: 'System') -> dict:
+        potential, kinetic = system.potential, system.kinetic
+        return {'potential': potential, 'kinetic': kinetic, 'total': potential + kinetic}
+
+
+class Temperature(Scalars):
+    """Kinetic temperature 2K / (dimension * N * k)"""
+
+    def values(self, system: 'System') -> dict:
+        return {'temperature': 2 * system.kinetic / (system.state.dimension * system.number_of_particles *
+                                                     system.boltsman)}
+
+
+class Pressure(Scalars):
+    """
+    Virial pressure (2K + sum r_ij * F_ij) / (dimension * V), the virial is taken from the pair sweep of the forces
+    """
+
+    def values(self, system: 'System') -> dict:
+        dimension = system.state.dimension
+        volume = system.cube_length ** dimension
+        return {'pressure': (2 * system.kinetic + system.virial) / (dimension * volume)}
+
+
+class RadialDistribution(Observable):
+    """
+    This class realise the radial distribution function g(r) accumulated to the histogram.
+    If r_max is not larger than the cutoff, the pairs of the Verlet list of the forces are reused,
+    otherwise all pairs are visited with the minimum image convention
+    """
+
+    def __init__(self, r_max: float, bins: int = 100, every: int = 1) -> None:
+        super().__init__(every)
+        self.r_max = r_max
+        self.bins = bins
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.samples = 0
+        self.density_sum = 0.0
+
+    def sample(self, system: 'System') -> None:
+        positions, box_length = system.state.positions, system.cube_length
+        neighbor_list = system.neighbor_list
+        if neighbor_list is not None and self.r_max <= neighbor_list.cutoff:
+            neighbor_list.update(positions)
+            self.histogram_pairs(positions, neighbor_list.pairs, box_length, self.r_max, self.histogram)
+        else:
+            buffer = np.zeros((min(get_num_threads(), len(positions)), self.bins), dtype=np.int64)
+            self.histogram_all_pairs(positions, box_length, self.r_max, buffer)
+            self.histogram += buffer.sum(axis=0)
+
+        number_of_particles, dimension = positions.shape
+        # Expected number of the pairs per unit of the shell volume for the ideal gas
+        self.density_sum += number_of_particles * (number_of_particles - 1) / (2 * box_length ** dimension)
+        self.samples += 1
+
+    @property
+    def r(self) -> np.ndarray:
+        """Centers of the histogram bins"""
+        return (np.arange(self.bins) + 0.5) * self.r_max / self.bins
+
+    def g(self, dimension: int = 3) -> np.ndarray:
+        """
+        This method normalises the histogram by the ideal gas
+
+        :param dimension: Dimension of the system
+        :return: g(r) in the centers of the bins
+        """
+
+        edges = np.linspace(0, self.r_max, self.bins + 1)
+        unit = np.pi if dimension == 2 else 4 / 3 * np.pi
+        shells = unit * (edges[1:] ** dimension - edges[:-1] ** dimension)
+        if self.density_sum == 0:
+            return np.zeros(self.bins)
+        return self.histogram / (self.density_sum * shells)
+
+    def to_dict(self) -> dict:
+        return {'r': self.r.tolist(), 'histogram': self.histogram.tolist(), 'samples': self.samples}
+
+
+class MeanSquareDisplacement(Observable):
+    """
+    This class realise the mean square displacement of the unwrapped positions.
+    The positions are unwrapped by the minimum image of the displacement between the samples, so the particles
+    have to move less than a half of the box between them. The last max_lag samples are kept as the time origins,
+    every sample adds the displacement from each origin to the accumulator of its lag. The origins take
+    (max_lag + 1) * N * dimension float64 (2.4 GB for 100 lags of 10^6 particles in 3D) and every sample passes
+    max_lag times over the particles, the longer lags are reached by the larger `every` at the same cost
+    """
+
+    def __init__(self, every: int = 1, max_lag: int = 100) -> None:
+        super().__init__(every)
+        self.max_lag = max_lag
+        self.unwrapped = None
+        self.previous = None
+        self.origins = None
+        self.samples = 0
+        self.sums = np.zeros(max_lag + 1)
+        self.counts = np.zeros(max_lag + 1, dtype=np.int64)
+
+    def sample(self, system: 'System') -> None:
+        positions = system.state.positions
+        if self.unwrapped is None:
+            self.unwrapped = positions.copy()
+            self.previous = positions.copy()
+            self.origins = np.empty((self.max_lag + 1,) + positions.shape)
+        else:
+            self.unwrap(self.unwrapped, positions, self.previous, system.cube_length)
+
+        # The origins are the ring buffer, the sample s is kept in the row s % (max_lag + 1)
+        self.origins[self.samples % (self.max_lag + 1)] = self.unwrapped
+        for lag in range(1, min(self.samples, self.max_lag) + 1):
+            origin = self.origins[(self.samples - lag) % (self.max_lag + 1)]
+            self.sums[lag] += self.square_displacement(self.unwrapped, origin)
+            self.counts[lag] += 1
+        self.counts[0] += 1
+        self.samples += 1
+
+    @property
+    def lags(self) -> np.ndarray:
+        """Lags of the displacements in the time steps"""
+        return np.arange(self.max_lag + 1) * self.every
+
+    @property
+    def msd(self) -> np.ndarray:
+        """Mean square displacement for every lag, it is NaN for the lags without the samples"""
+        with np.errstate(invalid='ignore'):
+            return np.where(self.counts > 0, self.sums / np.maximum(self.counts, 1), np.nan)
+
+    def to_dict(self) -> dict:
+        return {'lags': self.lags.tolist(), 'msd': self.msd.tolist(), 'samples': self.samples}
+
+
+class Observables(object):
+    """This class keeps the registered analyses of the system and samples them during the time loop"""
+
+    def __init__(self, system: 'System') -> None:
+        self.system = system
+        self.analyses = {}
+
+    def add(self, name: str, observable: Observable) -> Observable:
+        """
+        This method registers the analysis
+
+        :param name: Name of the analysis
+        :param observable: Analysis
+        :return: Registered analysis
+        """
+
+        self.analyses[name] = observable
+        return observable
+
+    def __getitem__(self, name: str) -> Observable:
+        return self.analyses[name]
+
+    def update(self, step: int) -> None:
+        """
+        This method samples the analyses which are due at the step, it is called after the time step
+
+        :param step: Number of the time step
+        """
+
+        for observable in self.analyses.values():
+            observable.update(self.system, step)
+
+    def to_dict(self) -> dict:
+        return {name: observable.to_dict() for name, observable in self.analyses.items()}
+
+
+if __name__ == '__main__':
+    pass
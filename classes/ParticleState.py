@@ -0,0 +1,257 @@
+import numpy as np
+from numba import njit, prange
+
+from classes.Profiler import profiler
+
+MASK = 2 ** 64 - 1
+
+
+@njit(fastmath=True, cache=True)
+def mix(x):
+    """
+    This function realise the splitmix64 finalizer, it scrambles the 64 bit counter
+    :param x: uint64 counter
+    :return: uint64 random bits
+    """
+
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+@njit(fastmath=True, cache=True)
+def counter_normal(key, index):
+    """
+    This function returns the standard normal number of the counter-based generator (Box-Muller).
+    The number depends on the key and the index only, so it does not depend on the threads
+    :param key: uint64 key of the stream (seed and step)
+    :param index: Index of the number in the stream
+    :return: Standard normal number
+    """
+
+    first = mix(key ^ mix(np.uint64(index)))
+    second = mix(first)
+    u1 = (np.float64(first >> np.uint64(11)) + 0.5) * 2.0 ** -53
+    u2 = np.float64(second >> np.uint64(11)) * 2.0 ** -53
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def stream_key(seed: int, step: int) -> np.uint64:
+    """
+    This function returns the key of the random stream of the step
+    :param seed: Seed of the generator
+    :param step: Number of the step
+    :return: uint64 key
+    """
+
+    return np.uint64((seed * 0x9E3779B97F4A7C15 + step * 0xD1B54A32D192ED03) & MASK)
+
+
+def floating_dtype(array) -> np.dtype:
+    """
+    This function returns the storage type of the array: float32 is kept, other types are stored as float64
+    :param array: Array
+    :return: Type of the stored array
+    """
+
+    return np.result_type(array, np.float32)
+
+
+class StateOperations(object):
+    """The kernels update the state arrays in place, so the time step does not allocate the temporary arrays"""
+
+    __slots__ = ()
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_kick(velocities, forces, coefficient):
+        for i in prange(velocities.shape[0]):
+            for k in range(velocities.shape[1]):
+                velocities[i, k] += coefficient * forces[i, k]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_thermostat_kick(velocities, forces, scale, coefficient, noise, key):
+        # v = scale * v + noise * xi + coefficient * F with the standard normal xi, the new squares are summed
+        # in the same pass, so the thermostat and the kinetic energy do not read the velocities again.
+        # xi is taken from the counter-based stream of the key, so the kick does not depend on the threads
+        temp = 0.0
+        dimension = velocities.shape[1]
+        for i in prange(velocities.shape[0]):
+            for k in range(dimension):
+                v = scale * velocities[i, k] + coefficient * forces[i, k]
+                if noise != 0.0:
+                    v += noise * counter_normal(key, i * dimension + k)
+                velocities[i, k] = v
+                temp += np.float64(v) * v
+        return temp
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_drift(positions, velocities, delta_time):
+        for i in prange(positions.shape[0]):
+            for k in range(positions.shape[1]):
+                positions[i, k] += delta_time * velocities[i, k]
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_scale(velocities, coefficient):
+        for i in prange(velocities.shape[0]):
+            for k in range(velocities.shape[1]):
+                velocities[i, k] *= coefficient
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_wrap(positions, box_length):
+        for i in prange(positions.shape[0]):
+            for k in range(positions.shape[1]):
+                positions[i, k] -= np.floor(positions[i, k] / box_length) * box_length
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_sum_squares(velocities):
+        # The squares are summed in float64 for the float32 velocities too
+        temp = 0.0
+        for i in prange(velocities.shape[0]):
+            for k in range(velocities.shape[1]):
+                v = np.float64(velocities[i, k])
+                temp += v * v
+        return temp
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def state_max_norm2(array):
+        temp = np.zeros(array.shape[0])
+        for i in prange(array.shape[0]):
+            for k in range(array.shape[1]):
+                temp[i] += np.float64(array[i, k]) * array[i, k]
+        return temp.max() if array.shape[0] else 0.0
+
+
+class ParticleState(StateOperations):
+    """
+    This class keeps the positions, velocities and forces as contiguous arrays with shape (N, dimension).
+    The arrays are float64 or float32, the kernels accumulate the sums in float64 for both of them
+    """
+
+    __slots__ = ('positions', 'velocities', 'forces', 'basis')
+
+    def __init__(self, positions: np.ndarray, velocities: np.ndarray, basis: list, forces: np.ndarray = None,
+                 dtype=None) -> None:
+        """
+        :param dtype: Type of the arrays, float32 positions are kept in float32 and others in float64 if it is None
+        """
+        dtype = floating_dtype(positions) if dtype is None else dtype
+        self.positions = np.ascontiguousarray(positions, dtype=dtype)
+        self.velocities = np.ascontiguousarray(velocities, dtype=dtype)
+        self.forces = np.zeros_like(self.positions) if forces is None else np.ascontiguousarray(forces, dtype=dtype)
+        self.basis = list(basis)
+
+    @classmethod
+    def create_state_from_vectors(cls, radiuses, velocities):
+        """
+        This method creates the ParticleState from the column vectors of any backend
+        :param radiuses: Vector of the radiuses
+        :param velocities: Vector of the velocities
+        :return: ParticleState
+        """
+        return cls(radiuses.to_array(), velocities.to_array(), radiuses.get_keys())
+
+    def __len__(self) -> int:
+        return self.positions.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.positions.shape[1]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.positions.dtype
+
+    def kick(self, coefficient: float) -> None:
+        """This method adds the forces multiplied by the coefficient to the velocities"""
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        self.state_kick(self.velocities, self.forces, coefficient)
+
+    def kick_sum_squares(self, coefficient: float, scale: float = 1.0, noise: float = 0.0,
+                         forces: np.ndarray = None, key: np.uint64 = np.uint64(0)) -> float:
+        """
+        This method scales the velocities, adds the random kicks and the forces multiplied by the coefficient
+        in one pass
+
+        :param coefficient: Coefficient of the forces
+        :param scale: Coefficient of the velocities
+        :param noise: Standard deviation of the random kicks
+        :param forces: Array of forces, the state forces are used if it is None
+        :param key: Key of the random stream of the kicks
+        :return: Sum of the squared new velocities
+        """
+
+        forces = self.forces if forces is None else forces
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        return self.state_thermostat_kick(self.velocities, forces, scale, coefficient, noise, key)
+
+    def drift(self, delta_time: float) -> None:
+        """This method moves the positions along the velocities"""
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        self.state_drift(self.positions, self.velocities, delta_time)
+
+    def scale_velocities(self, coefficient: float) -> None:
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        self.state_scale(self.velocities, coefficient)
+
+    def wrap(self, box_length: float) -> None:
+        """This method returns the positions to the periodic cube [0, box_length)"""
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        self.state_wrap(self.positions, box_length)
+
+    def sum_squares(self) -> float:
+        """Sum of the squared velocities"""
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        return self.state_sum_squares(self.velocities)
+
+    def max_norm(self, name: str) -> float:
+        """
+        This method returns the largest norm of the rows of the array
+
+        :param name: Name of the array ('positions', 'velocities' or 'forces')
+        :return: Largest norm
+        """
+
+        if profiler.enabled:
+            profiler.count('kernel_launches')
+        return self.state_max_norm2(getattr(self, name)) ** (1 / 2)
+
+    def axis(self, name: str, axis: str) -> np.ndarray:
+        """
+        This method returns the zero-copy column view of one axis
+
+        :param name: Name of the array ('positions', 'velocities' or 'forces')
+        :param axis: Name of the axis
+        :return: View with shape (N, 1)
+        """
+
+        k = self.basis.index(axis)
+        return getattr(self, name)[:, k:k + 1]
+
+    def axes(self, name: str) -> dict:
+        """
+        This method returns the zero-copy column views of all axes
+
+        :param name: Name of the array ('positions', 'velocities' or 'forces')
+        :return: Dictionary with the views with shape (N, 1)
+        """
+
+        array = getattr(self, name)
+        return {axis: array[:, k:k + 1] for k, axis in enumerate(self.basis)}
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,146 @@
+import time
+
+
+class Phase(object):
+    """This class measures the time of the named phase, it is used as the context manager"""
+
+    __slots__ = ('name', 'calls', 'total', 'max', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        elapsed = time.perf_counter() - self.start
+        self.calls += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def to_dict(self) -> dict:
+        return {'calls': self.calls, 'total': self.total, 'mean': self.total / max(self.calls, 1), 'max': self.max}
+
+
+class NullPhase(object):
+    """This class is returned by the disabled profiler, it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+class Profiler(object):
+    """
+    This class realise the opt-in instrumentation of the time loop: the timers of the phases of the step
+    and the counters (kernel launches, allocated bytes, host / device transfers). The kernel launches count the calls
+    of the numba kernels of the state and the pair sweeps as well as the kernels of the vector backends.
+    The disabled profiler returns the shared empty phase and the counters are guarded by the enabled flag,
+    so the instrumented code does not measure anything until the profiler is enabled
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.every = None
+        self.callback = None
+        self.phases = {}
+        self.counters = {}
+        self.steps = 0
+
+    def enable(self, every: int = None, callback=None) -> None:
+        """
+        This method starts the measurement
+
+        :param every: Number of the steps between the calls of the callback, it is never called if it is None
+        :param callback: Function of the profiler, the report is printed if it is None
+        """
+
+        self.enabled = True
+        self.every = every
+        self.callback = (lambda profiler: print(profiler.report())) if callback is None else callback
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """This method forgets the measured times and the counters"""
+        self.phases.clear()
+        self.counters.clear()
+        self.steps = 0
+
+    def phase(self, name: str):
+        """
+        This method returns the timer of the phase
+
+        :param name: Name of the phase
+        :return: Context manager measuring the time of the phase
+        """
+
+        if not self.enabled:
+            return NULL_PHASE
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(name)
+        return phase
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        This method increases the counter, the callers check the enabled flag before the call
+
+        :param name: Name of the counter
+        :param value: Increment
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def step(self) -> None:
+        """This method is called after the time step, the callback is called every `every` steps"""
+        self.steps += 1
+        if self.every and self.steps % self.every == 0:
+            self.callback(self)
+
+    def to_dict(self) -> dict:
+        return {'steps': self.steps, 'phases': {name: phase.to_dict() for name, phase in self.phases.items()},
+                'counters': dict(self.counters)}
+
+    def report(self) -> str:
+        """
+        This method returns the table of the phases and the counters. The nested phases are included
+        to the time of the outer ones, the shares are taken of the whole step
+
+        :return: Report
+        """
+
+        total = self.phases['step'].total if 'step' in self.phases else \
+            sum(phase.total for phase in self.phases.values())
+        total = total or 1.0
+        lines = [f'Profile of {self.steps} steps',
+                 f'{"phase":<20}{"calls":>10}{"total, s":>14}{"mean, ms":>14}{"share, %":>10}']
+        for name, phase in sorted(self.phases.items(), key=lambda item: -item[1].total):
+            mean = phase.total / max(phase.calls, 1) * 1e3
+            share = phase.total / total * 100
+            lines.append(f'{name:<20}{phase.calls:>10}{phase.total:>14.4f}{mean:>14.4f}{share:>10.1f}')
+        for name, value in sorted(self.counters.items()):
+            per_step = f'{value / self.steps:>14.2f} per step' if self.steps else ''
+            lines.append(f'{name:<20}{value:>24}{per_step}')
+        return '\n'.join(lines)
+
+
+# The profiler of the process, the instrumented classes use it
+profiler = Profiler()
+
+
+if __name__ == '__main__':
+    pass
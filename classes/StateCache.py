@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+
+def nbytes(value) -> int:
+    """
+    This function estimates the memory of the cached value
+    :param value: Array, vector, number or tuple of them
+    :return: Number of bytes
+    """
+
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(item) for item in value)
+    if hasattr(value, 'vector') and isinstance(value.vector, dict):
+        return sum(nbytes(item) for item in value.vector.values())
+    return int(getattr(value, 'nbytes', 0))
+
+
+class StateCache(object):
+    """
+    This class keeps the quantities derived from the particles state.
+    Every quantity is kept for one version of the state only, the least recently used quantities are evicted
+    when the cache is larger than max_bytes
+    """
+
+    def __init__(self, max_bytes: int = 2 ** 28) -> None:
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, version, compute):
+        """
+        This method returns the cached quantity or computes it
+
+        :param name: Name of the quantity
+        :param version: Version of the state the quantity depends on
+        :param compute: Function without arguments computing the quantity
+        :return: Quantity
+        """
+
+        if name in self.entries and self.entries[name][0] == version:
+            self.entries.move_to_end(name)
+            self.hits += 1
+            return self.entries[name][1]
+
+        # The stale quantity is dropped before the new one is computed, so they are never alive together
+        self.pop(name)
+        self.misses += 1
+        value = compute()
+        size = nbytes(value)
+        if size <= self.max_bytes:
+            self.entries[name] = (version, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.pop(next(iter(self.entries)))
+        return value
+
+    def peek(self, name: str, version):
+        """
+        This method returns the cached quantity of the version without computing it
+
+        :param name: Name of the quantity
+        :param version: Version of the state the quantity depends on
+        :return: Quantity or None if it is not cached
+        """
+
+        if name in self.entries and self.entries[name][0] == version:
+            return self.entries[name][1]
+        return None
+
+    def pop(self, name: str) -> None:
+        if name in self.entries:
+            self.size -= self.entries.pop(name)[2]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+if __name__ == '__main__':
+    pass
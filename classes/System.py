@@ -1,97 +1,273 @@
+from typing import TYPE_CHECKING
+
 import numpy as np
 
-from classes.GpuVector import GpuVector
+from classes.Backend import get_backend_name, get_vector_class
+from classes.Checkpoint import Checkpoint
+from classes.InitialConfiguration import InitialConfiguration
+from classes.Integrator import Integrator, SemiImplicitEuler
 from classes.LJ import LJ
+from classes.NeighborList import NeighborList
+from classes.Profiler import profiler
+from classes.TabulatedPotential import TabulatedPotential
+from classes.Units import ReducedUnits
 from classes.Vector import Vector
 
+if TYPE_CHECKING:
+    from classes.GpuVector import GpuVector
+
+# Storage types of the particles arrays, the sums are float64 for both of them
+PRECISIONS = {'double': np.float64, 'single': np.float32}
+
 
 class System(LJ):
-    """This class describes the system founded on Lenard Jones particular interactions"""
+    """
+    This class describes the system founded on Lenard Jones particular interactions.
+    The time steps, the pair sweeps and the energies run the numba CPU kernels on the ParticleState arrays
+    whatever the backend is, the backend gives the vectors of the radiuses, the velocities and the forces
+    and the dense vector quantities (radius_differences, distances). So the GPU backend does not move
+    the time stepping to the device
+    """
 
-    def __init__(self, radiuses: GpuVector, velocities: GpuVector, sigma: float, eps: float,
-                 temperature: float, mass: float, cube_length) -> None:
-        super().__init__(radiuses, velocities, sigma, eps, mass)
+    def __init__(self, radiuses: 'GpuVector', velocities: 'GpuVector', sigma: float, eps: float,
+                 temperature: float, mass: float, cube_length, neighbor_list: NeighborList = None,
+                 pair_mode: str = 'full', integrator: Integrator = None, boltsman: float = 1.38e-23,
+                 units: ReducedUnits = None, pair_potential: TabulatedPotential = None) -> None:
+        """
+        :param boltsman: Boltzmann constant in the units of the system (1 in the reduced units)
+        :param units: Reduced units of the system, the system is in SI if it is None
+        :param pair_potential: Tabulated pair potential in the units of the system, LJ of sigma and eps
+            is used if it is None
+        """
+        super().__init__(radiuses, velocities, sigma, eps, mass, neighbor_list, pair_mode, cube_length,
+                         pair_potential)
+
+        self.integrator = SemiImplicitEuler() if integrator is None else integrator
 
         self.temperature = temperature
         self.momentum_temperature = temperature
         self.cube_length = cube_length
-        self.boltsman = 1.38e-23
+        self.boltsman = boltsman
+        self.units = units
 
     @classmethod
-    def create_default_2D_system(cls, number_of_particles: int, cube_length: float, temperature: float):
-        def _particles_overlap(radiuses: Vector, sigma: float) -> Vector:
-            differences = radiuses.differences()
-            r = abs(differences)
-            if r.min() < sigma * 1.1:
-                print(f'Now the coordinates are configuring')
-                new_radiuses = Vector(
-                    {axis: np.random.sample((number_of_particles, 1), dtype=np.float32) * cube_length for axis in 'xy'})
-                _particles_overlap(new_radiuses, sigma)
-            else:
-                return radiuses
+    def create_default_2D_system(cls, number_of_particles: int, cube_length: float, temperature: float,
+                                 cutoff: float = None, skin: float = None, backend: str = None,
+                                 pair_mode: str = 'half', integrator: Integrator = None, placement: str = 'random',
+                                 precision: str = 'double', units: str = 'si',
+                                 pair_potential: TabulatedPotential = None):
+        """
+        This method creates the default Argon system
 
+        :param number_of_particles: Number of particles
+        :param cube_length: Length of the periodic cube
+        :param temperature: Temperature of the system
+        :param cutoff: Cutoff radius of the interactions, the dense differences are used if it is None
+        :param skin: Skin of the Verlet list (0.3 * sigma by default)
+        :param backend: Vector backend ('gpu', 'cpu' or 'numpy'), LJ_BACKEND environment variable is used if it is None.
+            The time steps run the CPU kernels of the state for every backend
+        :param pair_mode: Evaluation of all pairs without the cutoff ('half' uses the minimum image convention)
+        :param integrator: Integrator of the equations of motion (semi-implicit Euler with rescaling by default)
+        :param placement: Initial placement of the particles, 'random' keeps them 1.1 * sigma apart, 'sc' or 'fcc'
+        :param precision: Storage of the particles and the pair temporaries, 'double' (float64) or 'single' (float32)
+        :param units: Units of the created system, 'si' or 'reduced' (LJ units, recommended for the single precision).
+            The parameters are given in SI for both of them
+        :param pair_potential: Tabulated pair potential in SI, LJ of Argon is used if it is None
+        :return: System
+        """
         boltsman, mass = 1.38e-23, 6.69e-26
         start_velocity = np.sqrt(boltsman * temperature / mass)
+        positions = InitialConfiguration.create_positions(placement, number_of_particles, cube_length,
+                                                          3.4e-10 * 1.1, 2)
         properties = {
-            'radiuses': Vector({axis: np.random.sample((number_of_particles, 1)) * cube_length for axis in 'xy'}),
+            'radiuses': Vector({axis: positions[:, [k]] for k, axis in enumerate('xy')}),
             'velocities': Vector(
                 {axis: (2 * np.random.sample((number_of_particles, 1)) - 1) * start_velocity for axis in 'xy'}),
             'sigma': 3.4e-10,
             'eps': 119.8 * boltsman,
             'temperature': temperature,
             'mass': mass,
-            'cube_length': cube_length
+            'cube_length': cube_length,
+            'pair_mode': pair_mode,
+            'integrator': integrator,
+            'boltsman': boltsman,
+            'pair_potential': pair_potential
         }
-        properties['radiuses'] = _particles_overlap(properties['radiuses'], properties['sigma'])
-        return cls(**properties)
+        return cls._create_system(properties, cutoff, skin, backend, precision, units)
 
     @classmethod
-    def create_default_3D_system(cls, number_of_particles: int, cube_length: float, temperature: float):
-        def _particles_overlap(radiuses: Vector, sigma: float) -> Vector:
-            differences = radiuses.differences()
-            r = abs(differences)
-            if r.min() < sigma * 1.5:
-                print(f'Now the coordinates are configuring')
-                new_radiuses = Vector(
-                    {axis: np.random.sample((number_of_particles, 1)) * cube_length for axis in 'xyz'})
-                _particles_overlap(new_radiuses, sigma)
-            else:
-                return radiuses
+    def create_default_3D_system(cls, number_of_particles: int, cube_length: float, temperature: float,
+                                 cutoff: float = None, skin: float = None, backend: str = None,
+                                 pair_mode: str = 'half', integrator: Integrator = None, placement: str = 'random',
+                                 precision: str = 'double', units: str = 'si',
+                                 pair_potential: TabulatedPotential = None):
+        """
+        This method creates the default Argon system
 
+        :param number_of_particles: Number of particles
+        :param cube_length: Length of the periodic cube
+        :param temperature: Temperature of the system
+        :param cutoff: Cutoff radius of the interactions, the dense differences are used if it is None
+        :param skin: Skin of the Verlet list (0.3 * sigma by default)
+        :param backend: Vector backend ('gpu', 'cpu' or 'numpy'), LJ_BACKEND environment variable is used if it is None.
+            The time steps run the CPU kernels of the state for every backend
+        :param pair_mode: Evaluation of all pairs without the cutoff ('half' uses the minimum image convention)
+        :param integrator: Integrator of the equations of motion (semi-implicit Euler with rescaling by default)
+        :param placement: Initial placement of the particles, 'random' keeps them 1.5 * sigma apart, 'sc' or 'fcc'
+        :param precision: Storage of the particles and the pair temporaries, 'double' (float64) or 'single' (float32)
+        :param units: Units of the created system, 'si' or 'reduced' (LJ units, recommended for the single precision).
+            The parameters are given in SI for both of them
+        :param pair_potential: Tabulated pair potential in SI, LJ of Argon is used if it is None
+        :return: System
+        """
         boltsman, mass = 1.38e-23, 6.69e-26
         start_velocity = np.sqrt(boltsman * temperature / mass)
+        positions = InitialConfiguration.create_positions(placement, number_of_particles, cube_length,
+                                                          3.4e-10 * 1.5, 3)
         properties = {
-            'radiuses': Vector(
-                {axis: np.random.sample((number_of_particles, 1)) * cube_length for axis in 'xyz'}),
-            'velocities': GpuVector.create_vector_from_dict(
-                {axis: (2 * np.random.sample((number_of_particles, 1)) - 1) * start_velocity for axis in
-                 'xyz'}),
+            'radiuses': Vector({axis: positions[:, [k]] for k, axis in enumerate('xyz')}),
+            'velocities': Vector(
+                {axis: (2 * np.random.sample((number_of_particles, 1)) - 1) * start_velocity for axis in 'xyz'}),
             'sigma': 3.4e-10,
             'eps': 119.8 * boltsman,
             'temperature': temperature,
             'mass': mass,
-            'cube_length': cube_length
+            'cube_length': cube_length,
+            'pair_mode': pair_mode,
+            'integrator': integrator,
+            'boltsman': boltsman,
+            'pair_potential': pair_potential
         }
-        properties['radiuses'] = _particles_overlap(properties['radiuses'], properties['sigma'])
-        properties['radiuses'] = GpuVector.create_vector_from_dict(properties['radiuses'].vector)
+        return cls._create_system(properties, cutoff, skin, backend, precision, units)
+
+    @classmethod
+    def _create_system(cls, properties: dict, cutoff: float, skin: float, backend: str, precision: str,
+                       units: str):
+        """
+        This method converts the SI properties of the factories to the units and the precision and creates the System
+
+        :param properties: Properties of the system in SI with the Vector radiuses and velocities
+        :param cutoff: Cutoff radius of the interactions in SI
+        :param skin: Skin of the Verlet list in SI
+        :param backend: Compute backend
+        :param precision: 'double' or 'single'
+        :param units: 'si' or 'reduced'
+        :return: System
+        """
+
+        if precision not in PRECISIONS:
+            raise ValueError(f'Unknown precision {precision}, use {" or ".join(PRECISIONS)}')
+        if units not in ('si', 'reduced'):
+            raise ValueError(f'Unknown units {units}, use si or reduced')
+        skin = 0.3 * properties['sigma'] if skin is None else skin
+        scales = {'radiuses': 1.0, 'velocities': 1.0}
+        if units == 'reduced':
+            reduced = ReducedUnits(properties['sigma'], properties['eps'], properties['mass'], properties['boltsman'])
+            scales = {'radiuses': 1 / reduced.length, 'velocities': 1 / reduced.velocity}
+            cutoff = None if cutoff is None else cutoff / reduced.length
+            skin /= reduced.length
+            if properties['pair_potential'] is not None:
+                properties['pair_potential'] = properties['pair_potential'].scaled(reduced.length,
+                                                                                   reduced.energy)
+            properties.update(sigma=1.0, eps=1.0, mass=1.0, boltsman=1.0, units=reduced,
+                              temperature=properties['temperature'] / reduced.temperature,
+                              cube_length=properties['cube_length'] / reduced.length)
+        if cutoff is not None:
+            properties['neighbor_list'] = NeighborList(cutoff, skin, properties['cube_length'])
 
+        vector_class = get_vector_class(backend)
+        dtype = PRECISIONS[precision]
+        for name, scale in scales.items():
+            vector = properties[name].vector
+            properties[name] = vector_class.create_vector_from_dict(
+                {axis: (vector[axis] * scale).astype(dtype) for axis in vector})
         return cls(**properties)
 
-    def next_time_turn(self, delta_time: float) -> None:
-        self.velocities = self.velocities * self.velocity_coef
-        self.velocities = self.velocities + self.acceleration * delta_time
-        self.radiuses = self.radiuses + self.velocities * delta_time
+    def save_checkpoint(self, path: str, step: int = 0, time: float = 0.0) -> None:
+        """
+        This method saves the particles and the parameters of the system to the checkpoint file
+
+        :param path: Path of the checkpoint file
+        :param step: Number of the time step, it is kept in the header
+        :param time: Time of the system, it is kept in the header
+        """
+
+        header = {
+            'step': step, 'time': time, 'basis': list(self.basis),
+            'sigma': self.sigma, 'eps': self.eps, 'mass': self.mass, 'temperature': self.temperature,
+            'momentum_temperature': self.momentum_temperature, 'cube_length': self.cube_length,
+            'pair_mode': self.pair_mode, 'backend': get_backend_name(self.vector_class),
+            'integrator': self.integrator.to_dict(),
+            'cutoff': None if self.neighbor_list is None else self.neighbor_list.cutoff,
+            'skin': None if self.neighbor_list is None else self.neighbor_list.skin,
+            'boltsman': self.boltsman, 'dtype': self.state.dtype.str,
+            'units': None if self.units is None else self.units.to_dict(),
+            'pair_potential': None if self.tabulated is None else self.tabulated.name,
+        }
+        Checkpoint.write(path, self, header)
+
+    @classmethod
+    def load_checkpoint(cls, path: str, backend: str = None, integrator: Integrator = None,
+                        pair_potential: TabulatedPotential = None):
+        """
+        This method restores the system from the checkpoint file, the step and the time are
+        in the header of Checkpoint(path)
+
+        :param path: Path of the checkpoint file
+        :param backend: Compute backend, the saved backend is used if it is None
+        :param integrator: Integrator, the saved one is created with the saved parameters if it is None
+        :param pair_potential: Tabulated potential in SI as for the factories, the table is not in the checkpoint
+        :return: System
+        """
+
+        checkpoint = Checkpoint(path)
+        header = checkpoint.header
+        if header.get('pair_potential') is not None and pair_potential is None:
+            raise ValueError(f'The checkpoint was saved with the tabulated potential {header["pair_potential"]}, '
+                             f'pass the potential')
+        if integrator is None:
+            description = header['integrator']
+            # The old checkpoints keep the module and the name of the integrator only
+            if isinstance(description, list):
+                description = {'class': description, 'parameters': {}}
+            try:
+                integrator = Integrator.from_dict(description)
+            except TypeError as error:
+                raise ValueError(f'The integrator {description["class"][1]} can not be created from the checkpoint, '
+                                 f'pass integrator=') from error
+        neighbor_list = None
+        if header['cutoff'] is not None:
+            neighbor_list = NeighborList(header['cutoff'], header['skin'], header['cube_length'])
 
-        self.periodic_boundary_conditions()
+        vector_class = get_vector_class(header['backend'] if backend is None else backend)
+        dtype = np.dtype(header.get('dtype', '<f8'))
+        units = None if header.get('units') is None else ReducedUnits(**header['units'])
+        if units is not None and pair_potential is not None:
+            pair_potential = pair_potential.scaled(units.length, units.energy)
+        system = cls(vector_class.create_vector_from_dict(
+                         {axis: checkpoint.positions[:, [k]].astype(dtype) for k, axis in enumerate(header['basis'])}),
+                     vector_class.create_vector_from_dict(
+                         {axis: checkpoint.velocities[:, [k]].astype(dtype) for k, axis in enumerate(header['basis'])}),
+                     header['sigma'], header['eps'], header['temperature'], header['mass'], header['cube_length'],
+                     neighbor_list, header['pair_mode'], integrator, header.get('boltsman', 1.38e-23), units,
+                     pair_potential)
+        system.momentum_temperature = header['momentum_temperature']
+        return system
+
+    def next_time_turn(self, delta_time: float) -> None:
+        with profiler.phase('step'):
+            self.integrator.step(self, delta_time)
+        if profiler.enabled:
+            profiler.step()
 
     @property
     def velocity_coef(self) -> float:
-        self.momentum_temperature = (self.velocities ** 2).sum() * self.mass / (
-                3 * self.boltsman * self.number_of_particles)
+        self.momentum_temperature = 2 * self.kinetic / (3 * self.boltsman * self.number_of_particles)
         return (self.temperature / self.momentum_temperature) ** (1 / 2)
 
     def periodic_boundary_conditions(self) -> None:
-        self.radiuses -= (self.radiuses // self.cube_length) * self.cube_length
+        self.state.wrap(self.cube_length)
+        self.positions_changed()
 
     def boundary_conditions(self) -> None:
         pass
@@ -0,0 +1,247 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(fastmath=True, cache=True)
+def lookup(table, s_min, inverse_step, r2):
+    """
+    This function interpolates the energy and the force of the pair from the table in r^2
+    :return: Energy and w = -dU/dr / r, the force on the first particle is w * (r_i - r_j)
+    """
+
+    x = (r2 - s_min) * inverse_step
+    # The pairs closer than r_min take the first entry of the table
+    index = min(max(int(x), 0), table.shape[0] - 1)
+    t = min(max(x - index, 0.0), 1.0)
+    energy = table[index, 0, 0] + t * (table[index, 0, 1] + t * (table[index, 0, 2] + t * table[index, 0, 3]))
+    w = table[index, 1, 0] + t * (table[index, 1, 1] + t * (table[index, 1, 2] + t * table[index, 1, 3]))
+    return energy, w
+
+
+class TabulatedOperations(object):
+    """
+    The kernels of the tabulated potential have the signatures of the LJ kernels, the sigma and eps are replaced
+    by the table of the polynomials on the uniform grid in r^2, so the pair needs no square root and no powers
+    """
+
+    @staticmethod
+    @njit(parallel=True, fastmath=True, cache=True)
+    def tabulated_half_pairs(positions, table, s_min, inverse_step, cutoff2, box_length, buffer, forces):
+        number_of_particles, dimension = positions.shape
+        chunks = buffer.shape[0]
+        energy, virial = 0.0, 0.0
+        for c in prange(chunks):
+            buffer[c] = 0.0
+            for i in range(c, number_of_particles, chunks):
+                for j in range(i + 1, number_of_particles):
+                    r2 = 0.0
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        if box_length > 0:
+                            d -= box_length * np.round(d / box_length)
+                        r2 += d * d
+                    if r2 >= cutoff2:
+                        continue
+                    u, w = lookup(table, s_min, inverse_step, r2)
+                    energy += u
+                    virial += w * r2
+                    for k in range(dimension):
+                        d = positions[i, k] - positions[j, k]
+                        if box_length > 0:
+                            d -= box_length * np.round(d / box_length)
+                        buffer[c, i, k] += w * d
+                        buffer[c, j, k] -= w * d
+        for i in prange(number_of_particles):
+            for k in range(dimension):
+                temp = 0.0
+                for c in range(chunks):
+                    temp += buffer[c, i, k]
+                forces[i, k] = temp
+        return energy, virial
+
+    @staticmethod
+    @njit(fastmath=True, cache=True)
+    def tabulated_neighbor_pairs(positions, pairs, table, s_min, inverse_step, cutoff2, box_length, forces):
+        dimension = positions.shape[1]
+        forces[:] = 0.0
+        energy, virial = 0.0, 0.0
+        for p in range(pairs.shape[0]):
+            i, j = pairs[p, 0], pairs[p, 1]
+            r2 = 0.0
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                r2 += d * d
+            if r2 >= cutoff2:
+                continue
+            u, w = lookup(table, s_min, inverse_step, r2)
+            energy += u
+            virial += w * r2
+            for k in range(dimension):
+                d = positions[i, k] - positions[j, k]
+                d -= box_length * np.round(d / box_length)
+                forces[i, k] += w * d
+                forces[j, k] -= w * d
+        return energy, virial
+
+
+class TabulatedPotential(TabulatedOperations):
+    """
+    This class realise the pair potential tabulated from any function of the distance.
+    The energy U and w = -dU/dr / r are kept on the uniform grid in s = r^2 between r_min and the cutoff
+    as the linear or the cubic Hermite polynomials of every interval, the slope of the energy is exact (dU/ds = -w / 2).
+    The cost of the pair does not depend on the function, so the LJ system runs any potential of this form
+    """
+
+    def __init__(self, energy, cutoff: float, r_min: float, points: int = 4096, force=None, shift: str = None,
+                 interpolation: str = 'cubic', name: str = 'tabulated') -> None:
+        """
+        :param energy: Function of the array of the distances returning the pair energies
+        :param cutoff: Cutoff radius
+        :param r_min: Smallest tabulated distance, the closer pairs take its values
+        :param points: Number of the grid points
+        :param force: Function of the distances returning -dU/dr, it is differentiated numerically if it is None
+        :param shift: None, 'energy' (the energy is zero at the cutoff) or 'force' (the energy and the force are zero)
+        :param interpolation: 'linear' or 'cubic'
+        :param name: Name of the potential, it is kept in the checkpoints
+        """
+
+        if not 0 < r_min < cutoff:
+            raise ValueError('The table needs 0 < r_min < cutoff')
+        if shift not in (None, 'energy', 'force'):
+            raise ValueError(f'Unknown shift {shift}, use energy or force')
+        if interpolation not in ('linear', 'cubic'):
+            raise ValueError(f'Unknown interpolation {interpolation}, use linear or cubic')
+        if force is None:
+            def force(r):
+                h = 1e-5 * r
+                return (energy(r - h) - energy(r + h)) / (2 * h)
+
+        self.cutoff = cutoff
+        self.r_min = r_min
+        self.name = name
+        self.interpolation = interpolation
+        s = np.linspace(r_min ** 2, cutoff ** 2, points)
+        r = np.sqrt(s)
+        u, f = np.asarray(energy(r), dtype=np.float64), np.asarray(force(r), dtype=np.float64)
+        if shift is not None:
+            rc = np.array([cutoff])
+            fc = float(force(rc)[0]) if shift == 'force' else 0.0
+            u = u - float(energy(rc)[0]) + (r - cutoff) * fc
+            f = f - fc
+        w = f / r
+
+        self.s_min = s[0]
+        step = s[1] - s[0]
+        self.inverse_step = 1 / step
+        self.table = np.zeros((points - 1, 2, 4))
+        if interpolation == 'linear':
+            for q, values in enumerate((u, w)):
+                self.table[:, q, 0] = values[:-1]
+                self.table[:, q, 1] = np.diff(values)
+        else:
+            # The slopes in the local coordinate t of the interval
+            for q, (values, slopes) in enumerate(((u, -w / 2 * step), (w, np.gradient(w, s) * step))):
+                p0, p1, m0, m1 = values[:-1], values[1:], slopes[:-1], slopes[1:]
+                self.table[:, q] = np.stack((p0, m0, 3 * (p1 - p0) - 2 * m0 - m1, 2 * (p0 - p1) + m0 + m1), axis=1)
+
+    @classmethod
+    def lennard_jones(cls, sigma: float, eps: float, cutoff: float, shift: str = 'force', r_min: float = None,
+                      **kwargs) -> 'TabulatedPotential':
+        """
+        This method tabulates the LJ potential 4 eps ((sigma / r)^12 - (sigma / r)^6), shifted-force by default
+
+        :param r_min: Smallest tabulated distance, 0.5 * sigma by default
+        :return: TabulatedPotential
+        """
+
+        def energy(r):
+            temp = (sigma / r) ** 6
+            return 4 * eps * (temp * temp - temp)
+
+        def force(r):
+            temp = (sigma / r) ** 6
+            return 24 * eps * (2 * temp * temp - temp) / r
+
+        r_min = 0.5 * sigma if r_min is None else r_min
+        return cls(energy, cutoff, r_min, force=force, shift=shift, name='lennard_jones', **kwargs)
+
+    @classmethod
+    def morse(cls, depth: float, alpha: float, r0: float, cutoff: float, shift: str = 'energy', r_min: float = None,
+              **kwargs) -> 'TabulatedPotential':
+        """
+        This method tabulates the Morse potential depth ((1 - exp(-alpha (r - r0)))^2 - 1)
+
+        :param r_min: Smallest tabulated distance, 0.25 * r0 by default
+        :return: TabulatedPotential
+        """
+
+        def energy(r):
+            return depth * ((1 - np.exp(-alpha * (r - r0))) ** 2 - 1)
+
+        def force(r):
+            temp = np.exp(-alpha * (r - r0))
+            return -2 * depth * alpha * temp * (1 - temp)
+
+        r_min = 0.25 * r0 if r_min is None else r_min
+        return cls(energy, cutoff, r_min, force=force, shift=shift, name='morse', **kwargs)
+
+    @classmethod
+    def buckingham(cls, a: float, rho: float, c: float, cutoff: float, r_min: float, shift: str = 'energy',
+                   **kwargs) -> 'TabulatedPotential':
+        """
+        This method tabulates the Buckingham potential a exp(-r / rho) - c / r^6.
+        The potential falls to minus infinity at the small distances, so r_min has to be above its maximum
+
+        :return: TabulatedPotential
+        """
+
+        def energy(r):
+            return a * np.exp(-r / rho) - c / r ** 6
+
+        def force(r):
+            return a / rho * np.exp(-r / rho) - 6 * c / r ** 7
+
+        return cls(energy, cutoff, r_min, force=force, shift=shift, name='buckingham', **kwargs)
+
+    def evaluate(self, r: np.ndarray) -> tuple:
+        """
+        This method interpolates the table at the distances
+
+        :param r: Array of the distances
+        :return: Arrays of the energies and the forces -dU/dr
+        """
+
+        r2 = np.asarray(r, dtype=np.float64) ** 2
+        x = (r2 - self.s_min) * self.inverse_step
+        index = np.clip(x.astype(np.int64), 0, len(self.table) - 1)
+        t = np.clip(x - index, 0.0, 1.0)[..., None]
+        coefficients = self.table[index]
+        values = sum(coefficients[..., k] * t ** k for k in range(4))
+        inside = r2 < self.cutoff ** 2
+        return np.where(inside, values[..., 0], 0.0), np.where(inside, values[..., 1] * np.sqrt(r2), 0.0)
+
+    def scaled(self, length: float, energy: float) -> 'TabulatedPotential':
+        """
+        This method returns the table in the other units, e.g. the reduced units of the system
+
+        :param length: Length unit
+        :param energy: Energy unit
+        :return: TabulatedPotential
+        """
+
+        potential = object.__new__(type(self))
+        potential.__dict__.update(self.__dict__)
+        potential.cutoff, potential.r_min = self.cutoff / length, self.r_min / length
+        potential.s_min, potential.inverse_step = self.s_min / length ** 2, self.inverse_step * length ** 2
+        potential.table = self.table / np.array([energy, energy / length ** 2])[None, :, None]
+        return potential
+
+
+# Factories of the potentials of the run config
+POTENTIALS = {'lennard_jones': TabulatedPotential.lennard_jones, 'morse': TabulatedPotential.morse,
+              'buckingham': TabulatedPotential.buckingham}
+
+
+if __name__ == '__main__':
+    pass
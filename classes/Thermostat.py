@@ -0,0 +1,256 @@
+import importlib
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from classes.ParticleState import stream_key
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+NO_KEY = np.uint64(0)
+
+
+class Thermostat(object):
+    """
+    This superclass describes the thermostat of the integrator.
+    Once per time step the thermostat gives the scale of the velocities, the standard deviation of the random kicks
+    and the key of their random stream, the integrator applies them in the kernel of its first kick.
+    The kinetic energy is taken from the cache of the system, it is filled by the reduction of the last kick
+    of the previous step, so the thermostat does not pass over the particles itself
+    """
+
+    def __init__(self, temperature: float = None) -> None:
+        """
+        :param temperature: Target temperature, the temperature of the system is used if it is None
+        """
+        self.temperature = temperature
+
+    def target(self, system: 'System'):
+        return system.temperature if self.temperature is None else self.temperature
+
+    @staticmethod
+    def degrees_of_freedom(system: 'System') -> int:
+        return system.state.dimension * system.number_of_particles
+
+    def coefficients(self, system: 'System', delta_time: float) -> tuple:
+        """
+        This method moves the thermostat on the time step
+
+        :param system: Thermostatted system
+        :param delta_time: Time step
+        :return: Scale of the velocities, standard deviation of the random kicks and key of their stream
+        """
+
+        raise NotImplementedError
+
+    @property
+    def energy(self):
+        """Energy of the heat bath, the sum with the Hamiltonian is conserved by the deterministic thermostats"""
+        return 0.0
+
+    def parameters(self) -> dict:
+        """Parameters of the constructor, they are JSON values"""
+        return {'temperature': _to_json(self.temperature)}
+
+    def state(self) -> dict:
+        """Variables of the thermostat changed by the time steps, they are JSON values"""
+        return {}
+
+    def load_state(self, state: dict) -> None:
+        """
+        This method restores the variables of the thermostat from the description of state
+
+        :param state: Variables of the thermostat
+        """
+
+        pass
+
+    def to_dict(self) -> dict:
+        """This method describes the thermostat by its class, the parameters of the constructor and the state"""
+        return {'class': [type(self).__module__, type(self).__qualname__], 'parameters': self.parameters(),
+                'state': self.state()}
+
+    @staticmethod
+    def from_dict(description: dict) -> 'Thermostat':
+        """
+        This method creates the thermostat from the description of to_dict
+
+        :param description: Description of the thermostat
+        :return: Thermostat
+        """
+
+        module, name = description['class']
+        thermostat = getattr(importlib.import_module(module), name)(**description['parameters'])
+        thermostat.load_state(description.get('state', {}))
+        return thermostat
+
+
+def _to_json(value):
+    """The arrays of the replicas are kept as the lists"""
+    return np.asarray(value).tolist() if value is not None else None
+
+
+class Rescaling(Thermostat):
+    """This class realise the rescaling of the velocities to the exact temperature of the system on every step"""
+
+    def coefficients(self, system: 'System', delta_time: float) -> tuple:
+        return system.velocity_coef, 0.0, NO_KEY
+
+
+class Berendsen(Thermostat):
+    """
+    This class realise the Berendsen thermostat, the temperature relaxes to the target with the time constant tau.
+    It does not produce the canonical fluctuations of the kinetic energy
+    """
+
+    def __init__(self, tau: float, temperature: float = None) -> None:
+        """
+        :param tau: Relaxation time
+        """
+        super().__init__(temperature)
+        self.tau = tau
+
+    def coefficients(self, system: 'System', delta_time: float) -> tuple:
+        temperature = 2 * system.kinetic / (self.degrees_of_freedom(system) * system.boltsman)
+        return (1 + delta_time / self.tau * (self.target(system) / temperature - 1)) ** (1 / 2), 0.0, NO_KEY
+
+    def parameters(self) -> dict:
+        return dict(super().parameters(), tau=self.tau)
+
+
+class NoseHooverChain(Thermostat):
+    """
+    This class realise the Nose-Hoover chain thermostat (canonical ensemble).
+    The chain is integrated by the Trotter splitting of Martyna, Tuckerman and Klein, the first thermostat
+    scales the velocities and the others thermostat the first one, with the velocity Verlet the scheme
+    is of the second order. The masses are Q_1 = g k T tau^2 and Q_j = k T tau^2 for the g degrees of freedom
+    """
+
+    def __init__(self, tau: float, length: int = 3, temperature: float = None) -> None:
+        """
+        :param tau: Period of the oscillations of the thermostats
+        :param length: Number of the thermostats in the chain
+        """
+        super().__init__(temperature)
+        if length < 1:
+            raise ValueError('The chain needs at least one thermostat')
+        self.tau = tau
+        self.length = length
+        self.positions = None
+        self.velocities = None
+        self._energy = 0.0
+
+    def _half_step(self, kinetic, masses: list, kT, g, delta_time: float):
+        """
+        This method moves the chain on the half of the time step
+
+        :return: Scale of the velocities of the particles
+        """
+
+        v, M = self.velocities, self.length
+        quarter, eighth = delta_time / 4, delta_time / 8
+
+        def force(j, kinetic):
+            if j == 0:
+                return (2 * kinetic - g * kT) / masses[0]
+            return (masses[j - 1] * v[j - 1] ** 2 - kT) / masses[j]
+
+        v[M - 1] = v[M - 1] + quarter * force(M - 1, kinetic)
+        for j in range(M - 2, -1, -1):
+            factor = np.exp(-eighth * v[j + 1])
+            v[j] = v[j] * factor * factor + quarter * force(j, kinetic) * factor
+        scale = np.exp(-delta_time / 2 * v[0])
+        kinetic = kinetic * scale * scale
+        for j in range(M):
+            self.positions[j] = self.positions[j] + delta_time / 2 * v[j]
+        for j in range(M - 1):
+            factor = np.exp(-eighth * v[j + 1])
+            v[j] = v[j] * factor * factor + quarter * force(j, kinetic) * factor
+        v[M - 1] = v[M - 1] + quarter * force(M - 1, kinetic)
+        return scale, kinetic
+
+    def coefficients(self, system: 'System', delta_time: float) -> tuple:
+        kinetic = system.kinetic
+        kT = system.boltsman * self.target(system)
+        g = self.degrees_of_freedom(system)
+        masses = [g * kT * self.tau ** 2] + [kT * self.tau ** 2] * (self.length - 1)
+        first = self.velocities is None
+        if first:
+            self.positions = [np.zeros_like(kinetic)] * self.length
+            self.velocities = [np.zeros_like(kinetic)] * self.length
+
+        # The half step closing the previous time step needs the kinetic energy of its last kick, so it is applied
+        # here together with the half step opening this one. The steps follow the symmetric splitting
+        # exp(iL_NHC dt/2) exp(iL_Verlet dt) exp(iL_NHC dt/2), the velocities at the end of the step
+        # miss the closing half step only, as the leapfrog velocities miss the half kick
+        scale, kinetic = self._half_step(kinetic, masses, kT, g, delta_time)
+        if not first:
+            second, kinetic = self._half_step(kinetic, masses, kT, g, delta_time)
+            scale = scale * second
+        self._energy = sum(masses[j] * self.velocities[j] ** 2 / 2 for j in range(self.length)) + \
+            g * kT * self.positions[0] + kT * sum(self.positions[1:])
+        return scale, 0.0, NO_KEY
+
+    @property
+    def energy(self):
+        return self._energy
+
+    def parameters(self) -> dict:
+        return dict(super().parameters(), tau=self.tau, length=self.length)
+
+    def state(self) -> dict:
+        if self.velocities is None:
+            return {}
+        return {'positions': [_to_json(value) for value in self.positions],
+                'velocities': [_to_json(value) for value in self.velocities], 'energy': _to_json(self._energy)}
+
+    def load_state(self, state: dict) -> None:
+        if state:
+            self.positions = [np.asarray(value, dtype=np.float64) for value in state['positions']]
+            self.velocities = [np.asarray(value, dtype=np.float64) for value in state['velocities']]
+            self._energy = np.asarray(state['energy'], dtype=np.float64)
+
+
+class Langevin(Thermostat):
+    """
+    This class realise the Langevin thermostat (canonical ensemble).
+    The friction and the random kicks are the exact solution of the Ornstein-Uhlenbeck process on the time step,
+    the normal numbers are drawn by the kernel of the kick, so no array of them is allocated.
+    The numbers are taken from the counter-based stream of (seed, step, particle), so the seeded run
+    is the same for any number of the threads and continues the same after the checkpoint
+    """
+
+    def __init__(self, friction: float, temperature: float = None, seed: int = None) -> None:
+        """
+        :param friction: Friction coefficient (inverse time)
+        :param seed: Seed of the random numbers of the kernels, it is drawn by numpy if it is None
+        """
+        super().__init__(temperature)
+        self.friction = friction
+        self.seed = int(np.random.randint(2 ** 62)) if seed is None else int(seed)
+        self.step = 0
+
+    def coefficients(self, system: 'System', delta_time: float) -> tuple:
+        scale = np.exp(-self.friction * delta_time)
+        noise = ((1 - scale * scale) * system.boltsman * np.asarray(self.target(system)) / system.mass) ** (1 / 2)
+        key = stream_key(self.seed, self.step)
+        self.step += 1
+        return scale, noise, key
+
+    def parameters(self) -> dict:
+        return dict(super().parameters(), friction=self.friction, seed=self.seed)
+
+    def state(self) -> dict:
+        return {'step': self.step}
+
+    def load_state(self, state: dict) -> None:
+        self.step = state.get('step', 0)
+
+
+THERMOSTATS = {'none': None, 'rescaling': Rescaling, 'berendsen': Berendsen, 'nose_hoover': NoseHooverChain,
+               'langevin': Langevin}
+
+
+if __name__ == '__main__':
+    pass
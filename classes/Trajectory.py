@@ -0,0 +1,161 @@
+import json
+import queue
+import struct
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from classes.System import System
+
+MAGIC = b'LJTRAJ01'
+
+
+def frame_dtype(number_of_particles: int, dimension: int, forces: bool, energies: bool) -> np.dtype:
+    """
+    This function describes one frame of the trajectory file
+    :param number_of_particles: Number of particles
+    :param dimension: Dimension of the system
+    :param forces: Are the forces written
+    :param energies: Are the potential and kinetic energies written
+    :return: Structured dtype of the frame
+    """
+
+    fields = [('step', '<i8'), ('time', '<f8')]
+    if energies:
+        fields += [('potential', '<f8'), ('kinetic', '<f8')]
+    fields += [('positions', '<f8', (number_of_particles, dimension)),
+               ('velocities', '<f8', (number_of_particles, dimension))]
+    if forces:
+        fields += [('forces', '<f8', (number_of_particles, dimension))]
+    return np.dtype(fields)
+
+
+class TrajectoryWriter(object):
+    """
+    This class appends the frames to the binary trajectory file.
+    The file is the JSON header followed by the frames of the same size, so the frame k starts at
+    header_size + k * frame_size and no index is needed. The frames are copied to the preallocated records
+    and written by the background thread, the append blocks only when all max_frames records wait for the disk
+    """
+
+    def __init__(self, path: str, number_of_particles: int, dimension: int = 3, forces: bool = False,
+                 energies: bool = True, max_frames: int = 16) -> None:
+        self.path = path
+        self.dtype = frame_dtype(number_of_particles, dimension, forces, energies)
+        self.forces = forces
+        self.energies = energies
+        self.error = None
+
+        header = json.dumps({'number_of_particles': number_of_particles, 'dimension': dimension,
+                             'forces': forces, 'energies': energies}).encode()
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+
+        self.frames = queue.Queue(maxsize=max_frames)
+        self.records = queue.Queue()
+        for _ in range(max_frames):
+            self.records.put(np.empty(1, dtype=self.dtype))
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def create_writer_for_system(cls, path: str, system: 'System', **kwargs):
+        """
+        This method creates the TrajectoryWriter for the particles of the system
+        :param path: Path of the trajectory file
+        :param system: Written system
+        :return: TrajectoryWriter
+        """
+        return cls(path, len(system.state), system.state.dimension, **kwargs)
+
+    def append(self, system: 'System', step: int, time: float = 0.0) -> None:
+        """
+        This method hands the current state of the system to the writer thread
+
+        :param system: Written system
+        :param step: Number of the time step
+        :param time: Time of the frame
+        """
+
+        if self.error is not None:
+            raise self.error
+        record = self.records.get()
+        record['step'], record['time'] = step, time
+        if self.energies:
+            record['potential'], record['kinetic'] = system.potential, system.kinetic
+        record['positions'][0] = system.state.positions
+        record['velocities'][0] = system.state.velocities
+        if self.forces:
+            record['forces'][0] = system.interactions[0]
+        self.frames.put(record)
+
+    def close(self) -> None:
+        """This method waits for the written frames and closes the file"""
+        if self.file.closed:
+            return
+        self.frames.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _write(self) -> None:
+        while True:
+            record = self.frames.get()
+            if record is None:
+                break
+            try:
+                if self.error is None:
+                    self.file.write(record.tobytes())
+            except OSError as error:
+                self.error = error
+            self.records.put(record)
+        self.file.flush()
+
+
+class TrajectoryReader(object):
+    """This class memory-maps the trajectory file, the frames are read from the disk only when they are accessed"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{path} is not the trajectory file')
+            length, = struct.unpack('<Q', file.read(8))
+            self.header = json.loads(file.read(length))
+
+        self.dtype = frame_dtype(self.header['number_of_particles'], self.header['dimension'],
+                                 self.header['forces'], self.header['energies'])
+        offset = len(MAGIC) + 8 + length
+        # The frame which is not written completely is ignored
+        size = (np.memmap(path, dtype=np.uint8, mode='r').size - offset) // self.dtype.itemsize
+        self.frames = np.memmap(path, dtype=self.dtype, mode='r', offset=offset, shape=(size,)) if size else \
+            np.empty(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, item):
+        return self.frames[item]
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Positions of all frames with shape (frames, N, dimension), the view of the file"""
+        return self.frames['positions']
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Velocities of all frames with shape (frames, N, dimension), the view of the file"""
+        return self.frames['velocities']
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,49 @@
+class ReducedUnits(object):
+    """
+    This class describes the reduced LJ units: the length is sigma, the energy is eps and the mass is the particle mass.
+    In the reduced units the positions, velocities and energies are close to 1, so they are stored in float32
+    without the underflow of the SI values (1e-10 m, 1e-21 J) in the products of the kernels
+    """
+
+    def __init__(self, sigma: float, eps: float, mass: float, boltsman: float = 1.38e-23) -> None:
+        self.sigma = sigma
+        self.eps = eps
+        self.mass = mass
+        self.boltsman = boltsman
+
+    @property
+    def length(self) -> float:
+        return self.sigma
+
+    @property
+    def energy(self) -> float:
+        return self.eps
+
+    @property
+    def time(self) -> float:
+        """Time unit sigma * sqrt(mass / eps)"""
+        return self.sigma * (self.mass / self.eps) ** (1 / 2)
+
+    @property
+    def velocity(self) -> float:
+        return self.length / self.time
+
+    @property
+    def force(self) -> float:
+        return self.eps / self.sigma
+
+    @property
+    def temperature(self) -> float:
+        """Temperature unit eps / k"""
+        return self.eps / self.boltsman
+
+    @property
+    def pressure(self) -> float:
+        return self.eps / self.sigma ** 3
+
+    def to_dict(self) -> dict:
+        return {'sigma': self.sigma, 'eps': self.eps, 'mass': self.mass, 'boltsman': self.boltsman}
+
+
+if __name__ == '__main__':
+    pass
@@ -1,5 +1,4 @@
 import numpy as np
-from numba import cuda
 
 
 class Vector(object):
@@ -9,11 +8,31 @@ class Vector(object):
         temp = vector[self.basis[0]]
         self.length = len(temp) if type(temp) == np.ndarray else 1
 
+    @classmethod
+    def create_vector_from_dict(cls, vector: dict):
+        """
+        This method creates the Vector from dictionary
+        :param vector: The dictionary with numpy arrays
+        :return: Vector
+        """
+        return cls(vector)
+
+    @classmethod
+    def create_vector_from_views(cls, vector: dict):
+        """
+        This method creates the Vector sharing the memory with the column views of ParticleState
+        :param vector: The dictionary with numpy views
+        :return: Vector
+        """
+        return cls(vector)
+
     def __add__(self, other):
         return self._arithmetic_operation(other, operation='+')
 
     __radd__ = __add__
 
+    __iadd__ = __add__
+
     def __sub__(self, other):
         return self._arithmetic_operation(other, operation='-')
 
@@ -25,6 +44,12 @@ class Vector(object):
 
     __rmul__ = __mul__
 
+    def __matmul__(self, other):
+        return self._arithmetic_operation(other, operation='@')
+
+    def __rmatmul__(self, other):
+        return self._arithmetic_operation(other, operation='@', inverse=True)
+
     def __truediv__(self, other):
         return self._arithmetic_operation(other, operation='/')
 
@@ -46,6 +71,9 @@ class Vector(object):
             raise Exception(f"You cannot raise to this power ({power})")
         return Vector(temp)
 
+    def __str__(self):
+        return str(self.to_dict())
+
     def __len__(self) -> int:
         return self.length
 
@@ -56,6 +84,16 @@ class Vector(object):
         temp = np.sqrt(temp)
         return temp
 
+    @property
+    def T(self):
+        """This property method trasponse the Vector"""
+        return Vector({axis: self.vector[axis].T for axis in self.basis})
+
+    def lazy(self):
+        """This method returns the LazyVector with the deferred evaluation of the Vector arithmetic"""
+        from classes.LazyVector import LazyVector
+        return LazyVector.create_vector_from_dict(self.vector, Vector, 'cpu')
+
     def get_keys(self) -> list:
         return self.basis
 
@@ -74,19 +112,23 @@ class Vector(object):
     def sum(self) -> float:
         temp = 0
         for axis in self.basis:
-            temp += self.vector[axis].sum()
+            temp += self.vector[axis].sum(dtype=np.float64)
         return temp
 
     def to_dict(self) -> dict:
         return self.vector
 
+    def to_array(self) -> np.ndarray:
+        """This method converts the column Vector to array with shape (rows, dimension)"""
+        return np.hstack([self.vector[axis] for axis in self.basis])
+
     def get_average(self) -> float:
         return Vector(self.vector).sum() / (self.length * 3)
 
     def differences(self):
         differences = {}
-        ones_matrix = np.ones((1, self.length))
-        e = np.eye(self.length)
+        ones_matrix = np.ones((1, self.length), dtype=self.vector[self.basis[0]].dtype)
+        e = np.eye(self.length, dtype=self.vector[self.basis[0]].dtype)
         for axis in self.basis:
             differences[axis] = self.vector[axis] @ ones_matrix - ones_matrix.T @ self.vector[axis].T
             differences[axis] += e
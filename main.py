@@ -1,36 +1,260 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+import json
+import os
+import sys
+import time
 
-from classes.System import System
-
-
-def main():
-    # Creating the system
-    properties = {
+# The run config, the sections of the config file update these values
+DEFAULTS = {
+    'system': {
+        'dimension': 3,
         'number_of_particles': int(2**10),
         'cube_length': 1e-7,
         'temperature': 300,
+        'cutoff': None,
+        'skin': None,
+        # gpu, cpu or numpy, the LJ_BACKEND environment variable or the available hardware chooses it if it is None
+        'backend': None,
+        'pair_mode': 'half',
+        'placement': 'random',
+        'precision': 'double',
+        'units': 'si',
+        'integrator': 'VelocityVerlet',
+        # Keyword arguments of the integrator, e.g. {"inner": 4.8e-10, "outer": 5.8e-10, "substeps": 4} for RESPA
+        'integrator_options': {},
+        # none (the default of the integrator), rescaling, berendsen, nose_hoover or langevin
+        'thermostat': 'none',
+        # Keyword arguments of the thermostat, e.g. {"tau": 1e-13} for Berendsen or {"friction": 1e13} for Langevin
+        'thermostat_options': {},
+        # Tabulated pair potential in SI (lennard_jones, morse or buckingham), LJ of Argon is used if it is None
+        'pair_potential': None,
+        # Keyword arguments of the potential, e.g. {"depth": 3.3e-21, "alpha": 4.4e9, "r0": 3.8e-10, "cutoff": 8.5e-10}
+        'pair_potential_options': {},
+        # The time step is split adaptively, so no particle moves more than this length in one substep
+        'max_displacement': None,
+        'seed': None,
+    },
+    'run': {
+        'evolution_time': 1e-10,
+        'number_of_iterations': 1000,
+        'report_every': 0,
+        'restart': None,
+        # Energy minimisation before the time loop, fire or lbfgs
+        'minimize': None,
+        # Keyword arguments of the minimiser, e.g. {"force_tolerance": 1e-13, "max_iterations": 500}
+        'minimize_options': {},
+    },
+    'output': {
+        'report': None,
+        'plot': False,
+        'trajectory': None,
+        'trajectory_every': 10,
+        'checkpoint': None,
+        'checkpoint_every': 1000,
+        'profile': False,
+    },
+}
+
+
+def load_config(path: str = None) -> dict:
+    """
+    This function reads the run config from the JSON or TOML file, the missing values are taken from DEFAULTS
+    :param path: Path of the config, the defaults are used if it is None
+    :return: Config
+    """
+
+    config = {section: dict(values) for section, values in DEFAULTS.items()}
+    if path is None:
+        return config
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as file:
+            values = tomllib.load(file)
+    else:
+        with open(path) as file:
+            values = json.load(file)
+
+    for section, items in values.items():
+        if section not in config:
+            raise ValueError(f'Unknown section {section} of the config, use {", ".join(config)}')
+        unknown = set(items) - set(config[section])
+        if unknown:
+            raise ValueError(f'Unknown keys {", ".join(sorted(unknown))} of the section {section}')
+        config[section].update(items)
+    return config
+
+
+def create_system(config: dict):
+    """
+    This function creates the system from the system section of the config or restores it from the checkpoint
+    :param config: Config
+    :return: System
+    """
+
+    from classes import Integrator
+    from classes.System import System
+    from classes.TabulatedPotential import POTENTIALS
+    from classes.Thermostat import THERMOSTATS
+
+    properties = dict(config['system'])
+    options = dict(properties.pop('integrator_options'))
+    thermostat, thermostat_options = properties.pop('thermostat'), properties.pop('thermostat_options')
+    if thermostat not in THERMOSTATS:
+        raise ValueError(f'Unknown thermostat {thermostat}, use {", ".join(THERMOSTATS)}')
+    if THERMOSTATS[thermostat] is not None:
+        options['thermostat'] = THERMOSTATS[thermostat](**thermostat_options)
+    integrator = getattr(Integrator, properties.pop('integrator'))(**options)
+    max_displacement = properties.pop('max_displacement')
+    if max_displacement is not None:
+        integrator = Integrator.AdaptiveTimeStep(integrator, max_displacement)
+    potential, potential_options = properties.pop('pair_potential'), properties.pop('pair_potential_options')
+    if potential is not None:
+        if potential not in POTENTIALS:
+            raise ValueError(f'Unknown pair potential {potential}, use {", ".join(POTENTIALS)}')
+        potential = POTENTIALS[potential](**potential_options)
+    if config['run']['restart']:
+        return System.load_checkpoint(config['run']['restart'], properties['backend'], integrator, potential)
+
+    if properties['seed'] is not None:
+        import numpy as np
+        np.random.seed(properties['seed'])
+    dimension = properties.pop('dimension')
+    properties.pop('seed')
+    factories = {2: System.create_default_2D_system, 3: System.create_default_3D_system}
+    return factories[dimension](integrator=integrator, pair_potential=potential, **properties)
+
+
+def run(config: dict) -> dict:
+    """
+    This function runs the time loop without any windows
+    :param config: Config
+    :return: Report of the run
+    """
+
+    from classes.Observables import Energy, Observables, RunningStatistics
+    from classes.Profiler import profiler
+
+    start = time.perf_counter()
+    system = create_system(config)
+    minimization = None
+    if config['run']['minimize']:
+        from classes.Minimizer import MINIMIZERS
+        if config['run']['minimize'] not in MINIMIZERS:
+            raise ValueError(f'Unknown minimiser {config["run"]["minimize"]}, use {", ".join(MINIMIZERS)}')
+        minimization = MINIMIZERS[config['run']['minimize']](**config['run']['minimize_options']).minimize(system)
+    output = config['output']
+    if output['profile']:
+        profiler.enable(config['run']['report_every'] or None)
+
+    number_of_iterations = config['run']['number_of_iterations']
+    # The restarted run continues the steps and the time of the checkpoint
+    first_step, start_time = 0, 0.0
+    if config['run']['restart']:
+        from classes.Checkpoint import Checkpoint
+        header = Checkpoint(config['run']['restart']).header
+        first_step, start_time = header['step'], header['time']
+    # The config is in SI, the reduced system takes the time step in its units and the energies are converted back
+    time_unit, energy_unit = (1.0, 1.0) if system.units is None else (system.units.time, system.units.energy)
+    delta_time = config['run']['evolution_time'] / number_of_iterations / time_unit
+
+    observables = Observables(system)
+    observables.add('energy', Energy())
+    hamilton, maximum = RunningStatistics(), -float('inf')
+    H = [] if output['plot'] else None
+
+    writer = None
+    if output['trajectory']:
+        from classes.Trajectory import TrajectoryWriter
+        writer = TrajectoryWriter.create_writer_for_system(output['trajectory'], system)
+
+    setup = time.perf_counter() - start
+    try:
+        # Time loop
+        for i in range(first_step + 1, first_step + number_of_iterations + 1):
+            current_time = start_time + (i - first_step) * delta_time * time_unit
+            system.next_time_turn(delta_time)
+            observables.update(i)
+            value = system.hamilton * energy_unit
+            hamilton.update(value)
+            maximum = max(maximum, value)
+            if H is not None:
+                H.append(value)
+            if writer is not None and i % output['trajectory_every'] == 0:
+                writer.append(system, i, current_time)
+            if output['checkpoint'] and i % output['checkpoint_every'] == 0:
+                system.save_checkpoint(output['checkpoint'], i, current_time)
+            if config['run']['report_every'] and i % config['run']['report_every'] == 0 and not output['profile']:
+                print(f'Step {i}: H = {value:.6e}', flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    error = (maximum - hamilton.mean) / hamilton.mean
+    report = {
+        'config': config,
+        'setup_seconds': setup,
+        'run_seconds': time.perf_counter() - start - setup,
+        'error': error,
+        'hamilton': hamilton.to_dict(),
+        'observables': observables.to_dict(),
     }
-    system = System.create_default_3D_system(**properties)
+    if minimization is not None:
+        report['minimization'] = minimization
+    if output['profile']:
+        report['profile'] = profiler.to_dict()
+    if H is not None:
+        plot(config['run']['evolution_time'], H)
+    return report
 
-    evolution_time = 1e-10
-    number_of_iterations = 1000
-    delta_time = evolution_time / number_of_iterations
-    H = []
 
-    # Time loop
-    for i in range(number_of_iterations):
-        system.next_time_turn(delta_time)
-        H.append(system.hamilton)
+def plot(evolution_time: float, H: list) -> None:
+    """
+    This function shows the Hamiltonian of the run, matplotlib is imported only here
+    :param evolution_time: Time of the run
+    :param H: Hamiltonian of every step
+    """
 
-    time = np.linspace(0, evolution_time, number_of_iterations)
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    time_points = np.linspace(0, evolution_time, len(H))
     plt.figure(1)
-    plt.plot(time, H, 'r-')
+    plt.plot(time_points, H, 'r-')
     plt.show()
 
-    avg_H = sum(H) / len(H)
-    error = (max(H) - avg_H) / avg_H
-    print(f'Error: {round(error * 100, 3)} %')
+
+def main():
+    parser = argparse.ArgumentParser(description='Molecular dynamics of the Lennard-Jones particles')
+    parser.add_argument('config', nargs='?', help='Run config (JSON or TOML), the defaults are used without it')
+    parser.add_argument('--steps', type=int, help='Number of the iterations, it overrides the config')
+    parser.add_argument('--backend', help='Compute backend (gpu, cpu or numpy), it overrides the config')
+    parser.add_argument('--plot', action='store_true', help='Show the Hamiltonian after the run')
+    parser.add_argument('--report', help='Path of the JSON report, it overrides the config')
+    parser.add_argument('--cache-dir', help='Directory of the compiled kernels (NUMBA_CACHE_DIR)')
+    arguments = parser.parse_args()
+
+    # numba reads the cache directory when it is imported, so it is set before the classes are imported
+    if arguments.cache_dir:
+        os.environ['NUMBA_CACHE_DIR'] = arguments.cache_dir
+
+    config = load_config(arguments.config)
+    if arguments.steps is not None:
+        # The time step is kept, so the evolution time follows the number of the iterations
+        delta_time = config['run']['evolution_time'] / config['run']['number_of_iterations']
+        config['run']['number_of_iterations'] = arguments.steps
+        config['run']['evolution_time'] = delta_time * arguments.steps
+    if arguments.backend is not None:
+        config['system']['backend'] = arguments.backend
+    if arguments.report is not None:
+        config['output']['report'] = arguments.report
+    config['output']['plot'] = config['output']['plot'] or arguments.plot
+
+    report = run(config)
+    print(f'Error: {round(report["error"] * 100, 3)} %')
+    print(f'Setup: {report["setup_seconds"]:.2f} s, run: {report["run_seconds"]:.2f} s', file=sys.stderr)
+    if config['output']['report']:
+        with open(config['output']['report'], 'w') as file:
+            json.dump(report, file, indent=2, default=str)
 
 
 if __name__ == '__main__':
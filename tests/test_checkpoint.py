@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from classes.Checkpoint import Checkpoint
+from classes.Integrator import Leapfrog, VelocityVerlet
+from classes.System import System
+
+
+@pytest.mark.parametrize('integrator, precision, units', [(VelocityVerlet, 'double', 'si'),
+                                                          (Leapfrog, 'single', 'reduced')])
+def test_checkpoint_round_trip(tmp_path, integrator, precision, units):
+    np.random.seed(0)
+    system = System.create_default_3D_system(108, 18e-10, 100, cutoff=8.5e-10, backend='cpu', placement='fcc',
+                                             integrator=integrator(), precision=precision, units=units)
+    for _ in range(5):
+        system.next_time_turn(1e-14 if units == 'si' else 0.005)
+    path = str(tmp_path / 'checkpoint')
+    system.save_checkpoint(path, step=5, time=5e-14)
+
+    restored = System.load_checkpoint(path)
+    header = Checkpoint(path).header
+    assert (header['step'], header['time']) == (5, 5e-14)
+    assert type(restored.integrator) is integrator
+    assert restored.integrator.to_dict() == system.integrator.to_dict()
+    assert restored.state.dtype == system.state.dtype
+    np.testing.assert_array_equal(restored.state.positions, system.state.positions)
+    np.testing.assert_array_equal(restored.state.velocities, system.state.velocities)
+    assert (restored.cube_length, restored.temperature, restored.neighbor_list.cutoff) == \
+        (system.cube_length, system.temperature, system.neighbor_list.cutoff)
+    assert restored.units.to_dict() == system.units.to_dict() if units == 'reduced' else restored.units is None
+    # The cached kinetic energy of the float32 system is summed before the velocities are rounded
+    assert restored.hamilton == pytest.approx(system.hamilton, rel=1e-12 if precision == 'double' else 1e-6)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from classes.DomainDecomposition import DomainDecomposition
+from classes.Integrator import VelocityVerlet
+from classes.System import System
+
+DELTA_TIME = 1e-14
+
+
+def create() -> System:
+    np.random.seed(0)
+    return System.create_default_3D_system(256, 23e-10, 100, cutoff=8.5e-10, backend='cpu', placement='fcc',
+                                           integrator=VelocityVerlet())
+
+
+def test_decomposed_step_equals_single_process_step():
+    reference, system = create(), create()
+    # The parallel kernels run in the parent before the workers start
+    reference.next_time_turn(DELTA_TIME)
+    system.next_time_turn(DELTA_TIME)
+    reference.next_time_turn(DELTA_TIME)
+    with DomainDecomposition(system, number_of_domains=2):
+        system.next_time_turn(DELTA_TIME)
+        np.testing.assert_allclose(system.state.forces, reference.state.forces, rtol=1e-9, atol=1e-22)
+        np.testing.assert_allclose(system.state.positions, reference.state.positions, rtol=1e-12)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from classes.Ensemble import Ensemble, EnsembleOperations
+from classes.System import System
+
+DELTA_TIME = 1e-14
+TEMPERATURES = (80, 100, 120)
+
+
+def replicas() -> list:
+    np.random.seed(0)
+    return [System.create_default_3D_system(32, 12e-10, temperature, backend='cpu', placement='fcc')
+            for temperature in TEMPERATURES]
+
+
+def serial_positions(steps: int) -> np.ndarray:
+    with Ensemble(replicas(), mode='serial') as ensemble:
+        ensemble.run(steps, DELTA_TIME)
+        return np.stack([system.state.positions for system in ensemble.systems])
+
+
+@pytest.mark.parametrize('mode', ['batch', 'process'])
+def test_ensemble_mode_equals_serial_run(mode):
+    # The serial run executes the parallel kernels in the parent before the workers start
+    expected = serial_positions(10)
+    with Ensemble(replicas(), mode=mode, processes=2) as ensemble:
+        ensemble.run(10, DELTA_TIME)
+        positions = np.stack([system.state.positions for system in ensemble.systems])
+    np.testing.assert_allclose(positions, expected, rtol=1e-10)
+
+
+def test_batch_reductions_of_single_precision_are_double():
+    velocities = np.random.default_rng(0).normal(size=(2, 100000, 3)).astype(np.float32)
+    expected = (velocities.astype(np.float64) ** 2).sum(axis=(1, 2))
+    np.testing.assert_allclose(EnsembleOperations.batch_sum_squares(velocities), expected, rtol=1e-12)
+    # The kick without the forces and the thermostat keeps the velocities and sums their squares
+    sums = EnsembleOperations.batch_thermostat_kick(velocities, np.zeros_like(velocities), np.ones(2), 0.0,
+                                                    np.zeros(2), np.uint64(0))
+    np.testing.assert_allclose(sums, expected, rtol=1e-12)
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+from numba import cuda
+
+from classes.CpuVector import CpuVector
+
+SIMULATOR = os.environ.get('NUMBA_ENABLE_CUDASIM') == '1'
+
+
+def positions(seed: int = 0) -> dict:
+    random = np.random.default_rng(seed)
+    return {axis: random.random((6, 1)) for axis in 'xyz'}
+
+
+def expected(vector: dict, sigma: float) -> float:
+    # The differences have the identity on the diagonal, so the particle is sqrt(dimension) from itself
+    distances = np.sqrt(sum((vector[axis] - vector[axis].T + np.eye(6)) ** 2 for axis in vector))
+    return (sigma / distances).sum()
+
+
+def test_cpu_lazy_sum_of_inverse_distances():
+    vector = positions()
+    differences = CpuVector.create_vector_from_dict(dict(vector)).lazy().differences()
+    assert (2.0 / abs(differences)).sum() == pytest.approx(expected(vector, 2.0))
+
+
+@pytest.mark.skipif(not (SIMULATOR or cuda.is_available()), reason='needs CUDA or NUMBA_ENABLE_CUDASIM=1')
+def test_gpu_lazy_sum_of_inverse_distances(monkeypatch):
+    from classes.GpuVector import GpuVector
+    if SIMULATOR:
+        # The simulated device has no warp size
+        monkeypatch.setattr(cuda, 'get_current_device', lambda: type('Device', (), {'WARP_SIZE': 32})(),
+                            raising=False)
+    vector = positions()
+    differences = GpuVector.create_vector_from_dict(dict(vector)).lazy().differences()
+    distances = abs(differences)
+    assert distances.target == 'gpu'
+    assert (2.0 / distances).sum() == pytest.approx(expected(vector, 2.0))
+
+
+def test_compiled_kernels_are_reused_and_bounded():
+    from classes.LazyVector import MAX_KERNELS, Compiler
+    vector = CpuVector.create_vector_from_dict(positions()).lazy()
+    (vector * 3.0 + 1.0).sum()
+    misses = Compiler.kernel.cache_info().misses
+    (vector * 3.0 + 1.0).sum()
+    info = Compiler.kernel.cache_info()
+    assert info.misses == misses
+    assert info.maxsize == MAX_KERNELS and info.currsize <= MAX_KERNELS
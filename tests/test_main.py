@@ -0,0 +1,30 @@
+import numpy as np
+
+import main
+from classes.Checkpoint import Checkpoint
+from classes.Trajectory import TrajectoryReader
+
+
+def config(tmp_path, **run) -> dict:
+    values = main.load_config()
+    values['system'].update(number_of_particles=32, cube_length=12e-10, temperature=100, placement='fcc', seed=0)
+    values['run'].update(evolution_time=1e-13, number_of_iterations=10, **run)
+    values['output'].update(checkpoint=str(tmp_path / 'checkpoint'), checkpoint_every=10,
+                            trajectory=str(tmp_path / 'trajectory'), trajectory_every=5)
+    return values
+
+
+def test_restart_continues_steps_and_time(tmp_path):
+    main.run(config(tmp_path))
+    first = dict(Checkpoint(str(tmp_path / 'checkpoint')).header)
+    main.run(config(tmp_path, restart=str(tmp_path / 'checkpoint')))
+    header = Checkpoint(str(tmp_path / 'checkpoint')).header
+    assert (first['step'], header['step']) == (10, 20)
+    assert np.isclose(header['time'], 2 * first['time'])
+    np.testing.assert_array_equal(TrajectoryReader(str(tmp_path / 'trajectory')).frames['step'], [15, 20])
+
+
+def test_environment_chooses_default_backend(tmp_path, monkeypatch):
+    from classes.Vector import Vector
+    monkeypatch.setenv('LJ_BACKEND', 'numpy')
+    assert main.create_system(config(tmp_path)).vector_class is Vector
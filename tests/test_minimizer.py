@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from classes.Minimizer import FIRE, LBFGS
+from classes.System import System
+from classes.TabulatedPotential import TabulatedPotential
+
+SIGMA, EPS = 3.4e-10, 119.8 * 1.38e-23
+
+
+def perturbed_crystal(pair_potential=None) -> System:
+    # The FCC lattice near the minimum (reduced density 1) with the displacements of 0.05 sigma
+    np.random.seed(0)
+    system = System.create_default_3D_system(108, (108 / 1.0) ** (1 / 3) * SIGMA, 100, cutoff=2.5 * SIGMA,
+                                             backend='cpu', placement='fcc', pair_potential=pair_potential)
+    system.state.positions[...] += np.random.normal(0, 0.05 * SIGMA, system.state.positions.shape)
+    system.positions_changed()
+    return system
+
+
+@pytest.mark.parametrize('minimizer', [FIRE, LBFGS])
+@pytest.mark.parametrize('shifted', [True, False])
+def test_minimizers_relax_perturbed_crystal(minimizer, shifted):
+    pair_potential = TabulatedPotential.lennard_jones(SIGMA, EPS, 2.5 * SIGMA) if shifted else None
+    system = perturbed_crystal(pair_potential)
+    start = system.potential
+    report = minimizer().minimize(system)
+    assert report['potential'] < start
+    # The line search of L-BFGS stops at the energy jumps of the truncated LJ instead of going uphill
+    assert report['converged'] or (minimizer is LBFGS and not shifted)
+
+
+def test_lbfgs_never_increases_energy():
+    # The runs are deterministic, so the run of k iterations gives the energy after the k-th iteration
+    energies = [perturbed_crystal().potential]
+    for iterations in range(1, 16):
+        energies.append(LBFGS(max_iterations=iterations).minimize(perturbed_crystal())['potential'])
+    assert np.all(np.diff(energies) <= 0)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from classes.LJKernels import LJOperations
+from classes.System import System
+
+SIGMA = 3.4e-10
+BOX = (256 / 0.8) ** (1 / 3) * SIGMA
+
+
+def all_pairs(system: System) -> tuple:
+    positions = system.state.positions
+    forces = np.zeros_like(positions)
+    buffer = np.zeros((4,) + positions.shape)
+    energy, _ = LJOperations.lj_half_pairs(positions, system.sigma, system.eps, system.neighbor_list.cutoff ** 2,
+                                           BOX, buffer, forces)
+    return forces, energy
+
+
+def test_neighbor_list_forces_equal_all_pairs_after_moves():
+    np.random.seed(0)
+    system = System.create_default_3D_system(256, BOX, 100, cutoff=2.5 * SIGMA, skin=0.3 * SIGMA, backend='cpu',
+                                             placement='fcc')
+    random = np.random.default_rng(0)
+    for _ in range(5):
+        # Every move is larger than the skin, so the pairs from outside of the list radius come in
+        system.state.positions[...] += random.uniform(-0.4, 0.4, system.state.positions.shape) * SIGMA
+        system.periodic_boundary_conditions()
+        forces, potential, _ = system.interactions
+        expected_forces, expected_potential = all_pairs(system)
+        np.testing.assert_allclose(forces, expected_forces, rtol=1e-9, atol=1e-9 * np.abs(expected_forces).max())
+        assert np.isclose(potential, expected_potential, rtol=1e-12)
+    assert system.neighbor_list.number_of_builds == 5
@@ -0,0 +1,50 @@
+import numpy as np
+
+from classes.Observables import MeanSquareDisplacement, RadialDistribution, RunningStatistics
+from classes.System import System
+
+BOX = 30e-10
+
+
+def create() -> System:
+    np.random.seed(0)
+    return System.create_default_3D_system(108, BOX, 100, backend='cpu', placement='fcc')
+
+
+def test_running_statistics_match_two_pass_values():
+    values = 1e9 + np.random.default_rng(0).normal(size=1000)
+    statistics = RunningStatistics()
+    for value in values:
+        statistics.update(value)
+    assert statistics.count == len(values)
+    assert np.isclose(statistics.mean, values.mean(), rtol=1e-15)
+    assert np.isclose(statistics.variance, values.var(ddof=1), rtol=1e-9)
+
+
+def test_ideal_gas_radial_distribution_is_one():
+    system = create()
+    random = np.random.default_rng(1)
+    rdf = RadialDistribution(BOX / 2, bins=20)
+    for _ in range(20):
+        system.state.positions[...] = random.uniform(0, BOX, system.state.positions.shape)
+        system.positions_changed()
+        rdf.sample(system)
+    # The inner bins hold few pairs, so they are checked by the sum over the sphere
+    sphere = 4 / 3 * np.pi * rdf.r_max ** 3
+    assert abs(rdf.histogram.sum() / (rdf.density_sum * sphere) - 1) < 0.01
+    assert np.all(np.abs(rdf.g()[5:] - 1) < 0.1)
+
+
+def test_ballistic_mean_square_displacement():
+    system = create()
+    random = np.random.default_rng(2)
+    start = random.uniform(0, BOX, system.state.positions.shape)
+    velocities = random.normal(0, 1e-11, system.state.positions.shape)
+    msd = MeanSquareDisplacement(max_lag=10)
+    for step in range(30):
+        # The particles cross the box boundaries, the observable unwraps them
+        system.state.positions[...] = np.mod(start + velocities * step, BOX)
+        msd.sample(system)
+    lags = np.arange(11)
+    expected = (velocities ** 2).sum(axis=1).mean() * lags ** 2
+    np.testing.assert_allclose(msd.msd, expected, rtol=1e-9, atol=1e-30)
@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+
+from classes.LJKernels import LJOperations
+from classes.System import System
+
+SIGMA, EPS = 3.4e-10, 119.8 * 1.38e-23
+
+
+def test_half_pairs_with_minimum_image_equal_full_pairs_of_periodic_images():
+    random = np.random.default_rng(0)
+    box = 6 * SIGMA
+    positions = random.uniform(0, box, (64, 3))
+    cutoff2 = (box / 2) ** 2
+
+    forces = np.zeros_like(positions)
+    buffer = np.zeros((4,) + positions.shape)
+    energy, _ = LJOperations.lj_half_pairs(positions, SIGMA, EPS, cutoff2, box, buffer, forces)
+
+    # The first copy is the original box, the other 26 are its periodic images
+    shifts = sorted(itertools.product((-1, 0, 1), repeat=3), key=lambda shift: shift != (0, 0, 0))
+    images = np.concatenate([positions + box * np.array(shift) for shift in shifts])
+    image_forces = np.zeros_like(images)
+    LJOperations.lj_all_pairs(images, SIGMA, EPS, cutoff2, image_forces)
+    np.testing.assert_allclose(forces, image_forces[:len(positions)], rtol=1e-9,
+                               atol=1e-9 * np.abs(forces).max())
+
+
+def test_half_and_full_modes_agree_without_periodic_neighbours():
+    def create(pair_mode: str) -> System:
+        np.random.seed(0)
+        return System.create_default_3D_system(64, 20 * SIGMA, 100, backend='cpu', placement='fcc',
+                                               pair_mode=pair_mode)
+
+    half, full = create('half'), create('full')
+    # The cluster in the middle of the large box has no pairs across the boundaries
+    for system in (half, full):
+        system.state.positions[...] = system.state.positions * 0.3 + 7 * SIGMA
+        system.positions_changed()
+    np.testing.assert_allclose(half.interactions[0], full.interactions[0], rtol=1e-9,
+                               atol=1e-9 * np.abs(full.interactions[0]).max())
+    assert np.isclose(half.potential, full.potential, rtol=1e-12)
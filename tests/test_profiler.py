@@ -0,0 +1,24 @@
+import numpy as np
+
+from classes.Integrator import VelocityVerlet
+from classes.Profiler import profiler
+from classes.System import System
+
+
+def test_profiled_cpu_run_counts_kernel_launches():
+    np.random.seed(0)
+    system = System.create_default_3D_system(32, 12e-10, 100, backend='cpu', placement='fcc',
+                                             integrator=VelocityVerlet())
+    system.next_time_turn(1e-14)
+    profiler.reset()
+    profiler.enable()
+    try:
+        for _ in range(5):
+            system.next_time_turn(1e-14)
+    finally:
+        profiler.disable()
+    counters = profiler.to_dict()['counters']
+    profiler.reset()
+    # Two kicks, the drift and the pair sweep of every step at least
+    assert counters['pair_sweeps'] == 5
+    assert counters['kernel_launches'] >= 4 * 5
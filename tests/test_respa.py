@@ -0,0 +1,61 @@
+import numpy as np
+
+from classes.Integrator import RESPA, AdaptiveTimeStep, VelocityVerlet
+from classes.System import System
+
+SIGMA = 3.4e-10
+DELTA_TIME = 1e-14
+
+
+def create(integrator, temperature: float = 100) -> System:
+    np.random.seed(0)
+    return System.create_default_3D_system(108, 18e-10, temperature, cutoff=2.5 * SIGMA, backend='cpu',
+                                           placement='fcc', integrator=integrator)
+
+
+def test_respa_with_one_substep_is_velocity_verlet():
+    verlet = create(VelocityVerlet())
+    respa = create(RESPA(1.2 * SIGMA, 1.6 * SIGMA, substeps=1))
+    for _ in range(20):
+        verlet.next_time_turn(DELTA_TIME)
+        respa.next_time_turn(DELTA_TIME)
+    np.testing.assert_allclose(respa.state.positions, verlet.state.positions, rtol=1e-10)
+    np.testing.assert_allclose(respa.state.velocities, verlet.state.velocities, rtol=1e-7,
+                               atol=1e-9 * np.abs(verlet.state.velocities).max())
+
+
+class RecordedVerlet(VelocityVerlet):
+    """The velocity Verlet keeping the substeps and the largest displacements of them"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.substeps = []
+
+    def step(self, system: 'System', delta_time: float) -> None:
+        start = system.state.positions.copy()
+        super().step(system, delta_time)
+        move = system.state.positions - start
+        move -= system.cube_length * np.round(move / system.cube_length)
+        self.substeps.append((delta_time, np.sqrt((move ** 2).sum(axis=1).max())))
+
+
+def test_adaptive_substeps_respect_bounds():
+    max_displacement, max_delta_time = 0.005 * SIGMA, 4e-15
+    inner = RecordedVerlet()
+    system = create(AdaptiveTimeStep(inner, max_displacement, max_delta_time=max_delta_time), temperature=3000)
+    for _ in range(5):
+        system.next_time_turn(DELTA_TIME)
+        substeps = np.array(inner.substeps)
+        inner.substeps.clear()
+        assert np.isclose(substeps[:, 0].sum(), DELTA_TIME, rtol=1e-12)
+        assert np.all(substeps[:, 0] <= max_delta_time * (1 + 1e-12))
+        # The bound is taken from the velocities and the forces at the start of the substep
+        assert np.all(substeps[:, 1] <= max_displacement * 1.05)
+    assert system.integrator.number_of_substeps > 5 * 3
+
+
+def test_adaptive_step_keeps_min_delta_time():
+    inner = RecordedVerlet()
+    system = create(AdaptiveTimeStep(inner, 1e-6 * SIGMA, min_delta_time=DELTA_TIME), temperature=3000)
+    system.next_time_turn(DELTA_TIME)
+    assert [delta_time for delta_time, _ in inner.substeps] == [DELTA_TIME]
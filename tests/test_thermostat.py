@@ -0,0 +1,62 @@
+import numba
+import numpy as np
+import pytest
+
+from classes.Integrator import VelocityVerlet
+from classes.System import System
+from classes.Thermostat import Langevin, NoseHooverChain
+
+DELTA_TIME = 1e-14
+
+
+def create(thermostat) -> System:
+    # The initial velocities are drawn by numpy
+    np.random.seed(0)
+    return System.create_default_3D_system(108, 18e-10, 100, cutoff=8.5e-10, backend='cpu', placement='fcc',
+                                           integrator=VelocityVerlet(thermostat=thermostat))
+
+
+def run(system: System, steps: int) -> np.ndarray:
+    for _ in range(steps):
+        system.next_time_turn(DELTA_TIME)
+    return system.state.positions.copy()
+
+
+def test_seeded_langevin_run_is_reproducible():
+    first = run(create(Langevin(1e12, seed=7)), 20)
+    threads = numba.get_num_threads()
+    try:
+        # The random numbers do not depend on the threads of the kernel
+        numba.set_num_threads(1)
+        second = run(create(Langevin(1e12, seed=7)), 20)
+    finally:
+        numba.set_num_threads(threads)
+    other = run(create(Langevin(1e12, seed=8)), 20)
+    np.testing.assert_array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+@pytest.mark.parametrize('thermostat', [lambda: NoseHooverChain(1e-13), lambda: Langevin(1e12, seed=3)])
+def test_checkpoint_restores_thermostat(tmp_path, thermostat):
+    system = create(thermostat())
+    run(system, 10)
+    path = str(tmp_path / 'checkpoint')
+    system.save_checkpoint(path)
+    restored = System.load_checkpoint(path)
+
+    assert type(restored.integrator.thermostat) is type(system.integrator.thermostat)
+    assert restored.integrator.thermostat.to_dict() == system.integrator.thermostat.to_dict()
+    np.testing.assert_array_equal(run(restored, 10), run(system, 10))
+    assert restored.integrator.thermostat.energy == system.integrator.thermostat.energy
+
+
+def test_nose_hoover_chain_is_second_order():
+    def positions(delta_time: float) -> np.ndarray:
+        system = create(NoseHooverChain(5e-14, temperature=300))
+        for _ in range(int(round(2e-13 / delta_time))):
+            system.next_time_turn(delta_time)
+        return system.state.positions.copy()
+
+    reference = positions(5e-16)
+    coarse, fine = (np.abs(positions(delta_time) - reference).max() for delta_time in (4e-15, 2e-15))
+    assert coarse / fine > 3.5